@@ -0,0 +1,231 @@
+"""Benchmarks of the CVAT to Supervisely converters on synthetic CVAT exports.
+
+Measures throughput and peak memory of convert_labels, convert_images_annotations,
+convert_video_annotations and cvat_rle_to_binary_mask and compares results with the stored
+baseline. Baseline is machine-specific, so save it on the same machine before making changes.
+
+Usage example:
+    python benchmarks/bench_converters.py --save-baseline
+    # ...make changes in import_cvat/src/converters.py...
+    python benchmarks/bench_converters.py
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARKS_DIR), "import_cvat", "src"))
+
+import converters  # noqa: E402
+from generate_cvat_export import (  # noqa: E402
+    build_images_xml,
+    random_rle,
+    GEOMETRIES,
+)
+
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, "baseline.json")
+
+# * Relative deviation from the baseline, which is considered as a regression.
+DEFAULT_TOLERANCE = 0.2
+
+# A benchmark case is a function, which takes the size multiplier and returns
+# a callable to measure and the number of items it processes.
+Case = Callable[[int], Tuple[Callable[[], None], int]]
+
+
+def case_convert_labels(scale: int) -> Tuple[Callable[[], None], int]:
+    """Converts all labels of the images with mixed geometries one image at a time."""
+    images_et = _images_et("images", images_count=10 * scale, labels_per_image=20)
+    labels_count = sum(
+        1 for image_et in images_et for child in image_et if child.tag != "tag"
+    )
+
+    def run():
+        for image_et in images_et:
+            converters.convert_labels(image_et, image_et.attrib["name"], "imageset")
+
+    return run, labels_count
+
+
+def case_convert_images_annotations(scale: int) -> Tuple[Callable[[], None], int]:
+    """Converts the whole images task with mixed geometries and tags."""
+    images_et = _images_et("images", images_count=50 * scale, labels_per_image=10)
+    images_paths = [image_et.attrib["name"] for image_et in images_et]
+
+    def run():
+        converters.convert_images_annotations(images_et, images_paths)
+
+    return run, len(images_et)
+
+
+def case_convert_video_annotations(scale: int) -> Tuple[Callable[[], None], int]:
+    """Converts the whole video task (exported as images) with mixed geometries and tags."""
+    images_et = _images_et("video", images_count=100 * scale, labels_per_image=5)
+    images_paths = [image_et.attrib["name"] for image_et in images_et]
+
+    def run():
+        converters.convert_video_annotations(images_et, images_paths)
+
+    return run, len(images_et)
+
+
+def case_cvat_rle_to_binary_mask(scale: int) -> Tuple[Callable[[], None], int]:
+    """Decodes random CVAT RLE masks to binary masks of the image size."""
+    rng = random.Random(42)
+    masks = []
+    for _ in range(20 * scale):
+        width, height = rng.randint(50, 200), rng.randint(50, 200)
+        masks.append((random_rle(rng, width * height), width))
+
+    def run():
+        for rle_values, width in masks:
+            converters.cvat_rle_to_binary_mask(rle_values, 0, 0, width, 480, 640)
+
+    return run, len(masks)
+
+
+CASES: Dict[str, Case] = {
+    "convert_labels": case_convert_labels,
+    "convert_images_annotations": case_convert_images_annotations,
+    "convert_video_annotations": case_convert_video_annotations,
+    "cvat_rle_to_binary_mask": case_cvat_rle_to_binary_mask,
+}
+
+
+def _images_et(kind: str, images_count: int, labels_per_image: int) -> List[ET.Element]:
+    """Generates the CVAT task in memory and returns the list of <image> elements.
+
+    :return: list of image elements
+    :rtype: List[ET.Element]
+    """
+    root = build_images_xml(
+        random.Random(42),
+        kind,
+        images_count,
+        labels_per_image,
+        {geometry: 1.0 for geometry in GEOMETRIES},
+        tags_per_image=1,
+        image_size=(480, 640),
+        polygon_vertices=32,
+    )
+    return root.findall("image")
+
+
+def measure(case: Case, scale: int, repeats: int) -> Dict[str, float]:
+    """Measures the best wall time of the case over several repeats
+    and peak memory allocated during one separate run.
+
+    :return: dictionary with results of the case
+    :rtype: Dict[str, float]
+    """
+    run, items = case(scale)
+
+    timings = []
+    for _ in range(repeats):
+        start = perf_counter()
+        run()
+        timings.append(perf_counter() - start)
+    seconds = min(timings)
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "items": items,
+        "seconds": round(seconds, 6),
+        "items_per_second": round(items / seconds, 3),
+        "peak_mb": round(peak / 1024 / 1024, 3),
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    """Compares results with the baseline and returns the list of regressions.
+    Throughput regression is a drop of items per second, memory regression is a growth of peak memory,
+    both more than the tolerance.
+
+    :return: list of regression messages
+    :rtype: List[str]
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result["items_per_second"] < base["items_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {result['items_per_second']} items/s "
+                f"is lower than baseline {base['items_per_second']} items/s"
+            )
+        if result["peak_mb"] > base["peak_mb"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: peak memory {result['peak_mb']} MB "
+                f"is higher than baseline {base['peak_mb']} MB"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CVAT converters.")
+    parser.add_argument("--cases", nargs="*", choices=list(CASES), default=list(CASES))
+    parser.add_argument(
+        "--scale", type=int, default=1, help="Size multiplier of the data."
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--output", help="Path to save results as JSON.")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.cases:
+        results[name] = measure(CASES[name], args.scale, args.repeats)
+        result = results[name]
+        print(
+            f"{name:<30} {result['items']:>8} items {result['seconds']:>10.4f} s "
+            f"{result['items_per_second']:>12.1f} items/s {result['peak_mb']:>8.2f} MB peak"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(
+            f"Baseline {args.baseline} not found, run with --save-baseline to create it."
+        )
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+    print("No regressions compared to the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+"""Generator of synthetic CVAT exports for benchmarks and load tests.
+
+Produces tasks in "CVAT for images 1.1" format (both for images and videos, as the apps
+download them from CVAT) and in "CVAT for video 1.1" format (with tracks), with placeholder
+images in the "images" directory next to the annotations.xml file.
+
+Usage example:
+    python benchmarks/generate_cvat_export.py /tmp/cvat_export --images 1000 --labels 20
+    python benchmarks/generate_cvat_export.py /tmp/cvat_export --kind video --images 300
+"""
+
+import os
+import copy
+import random
+import argparse
+import xml.etree.ElementTree as ET
+
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# * Geometries, which can be generated, with the names of CVAT XML elements.
+GEOMETRIES = ["box", "polygon", "polyline", "points", "mask", "skeleton"]
+
+# * Available kinds of the generated tasks.
+# images - CVAT for images 1.1 export of the task with images.
+# video - CVAT for images 1.1 export of the task with video (frames as <image> elements).
+# tracks - CVAT for video 1.1 export of the task with video (objects as <track> elements).
+KINDS = ["images", "video", "tracks"]
+
+SKELETON_NODES = ["head", "neck", "left_hand", "right_hand", "left_foot", "right_foot"]
+
+
+def generate_task(
+    output_dir: str,
+    kind: str = "images",
+    images_count: int = 100,
+    labels_per_image: int = 10,
+    geometries: Optional[Dict[str, float]] = None,
+    tags_per_image: int = 1,
+    image_size: Tuple[int, int] = (480, 640),
+    polygon_vertices: int = 16,
+    write_images: bool = True,
+    seed: int = 42,
+) -> str:
+    """Generates the CVAT task in the output directory: annotations.xml and images directory.
+    Returns the path to the generated annotations.xml file.
+
+    :param output_dir: directory, where the task will be generated
+    :type output_dir: str
+    :param kind: kind of the task, one of KINDS, defaults to "images"
+    :type kind: str, optional
+    :param images_count: number of images (or frames) in the task, defaults to 100
+    :type images_count: int, optional
+    :param labels_per_image: number of labels on each image (or tracks for "tracks" kind), defaults to 10
+    :type labels_per_image: int, optional
+    :param geometries: dictionary with geometry names as keys and their weights as values,
+        if not provided all geometries will be generated with equal weights, defaults to None
+    :type geometries: Optional[Dict[str, float]], optional
+    :param tags_per_image: number of tags on each image, defaults to 1
+    :type tags_per_image: int, optional
+    :param image_size: size of the images (height, width), defaults to (480, 640)
+    :type image_size: Tuple[int, int], optional
+    :param polygon_vertices: number of vertices in polygons and polylines, defaults to 16
+    :type polygon_vertices: int, optional
+    :param write_images: if False, only annotations.xml will be generated, defaults to True
+    :type write_images: bool, optional
+    :param seed: seed for the random generator, defaults to 42
+    :type seed: int, optional
+    :return: path to the generated annotations.xml file
+    :rtype: str
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown kind of the task: {kind}, available kinds: {KINDS}")
+
+    rng = random.Random(seed)
+    geometries = geometries or {geometry: 1.0 for geometry in GEOMETRIES}
+    unknown = set(geometries) - set(GEOMETRIES)
+    if unknown:
+        raise ValueError(f"Unknown geometries: {unknown}, available: {GEOMETRIES}")
+
+    if kind == "tracks":
+        root = build_tracks_xml(
+            rng,
+            images_count,
+            labels_per_image,
+            geometries,
+            image_size,
+            polygon_vertices,
+        )
+    else:
+        root = build_images_xml(
+            rng,
+            kind,
+            images_count,
+            labels_per_image,
+            geometries,
+            tags_per_image,
+            image_size,
+            polygon_vertices,
+        )
+
+    os.makedirs(output_dir, exist_ok=True)
+    annotations_xml_path = os.path.join(output_dir, "annotations.xml")
+    ET.ElementTree(root).write(annotations_xml_path, encoding="utf-8")
+
+    if write_images:
+        write_placeholder_images(
+            os.path.join(output_dir, "images"),
+            image_names(kind, images_count),
+            image_size,
+        )
+
+    return annotations_xml_path
+
+
+def build_images_xml(
+    rng: random.Random,
+    kind: str,
+    images_count: int,
+    labels_per_image: int,
+    geometries: Dict[str, float],
+    tags_per_image: int,
+    image_size: Tuple[int, int],
+    polygon_vertices: int,
+) -> ET.Element:
+    """Builds the root element of the "CVAT for images 1.1" annotations.xml.
+
+    :return: root element of the XML tree
+    :rtype: ET.Element
+    """
+    root = ET.Element("annotations")
+    ET.SubElement(root, "version").text = "1.1"
+    root.append(build_meta(kind, images_count, image_size))
+
+    height, width = image_size
+    names = image_names(kind, images_count)
+    for image_id, name in enumerate(names):
+        image_et = ET.SubElement(
+            root,
+            "image",
+            id=str(image_id),
+            name=name,
+            width=str(width),
+            height=str(height),
+        )
+        for tag_idx in range(tags_per_image):
+            ET.SubElement(image_et, "tag", label=f"tag_{tag_idx}", source="manual")
+        for _ in range(labels_per_image):
+            geometry = choose_geometry(rng, geometries)
+            image_et.append(build_shape(rng, geometry, image_size, polygon_vertices))
+
+    return root
+
+
+def build_tracks_xml(
+    rng: random.Random,
+    frames_count: int,
+    tracks_count: int,
+    geometries: Dict[str, float],
+    image_size: Tuple[int, int],
+    polygon_vertices: int,
+) -> ET.Element:
+    """Builds the root element of the "CVAT for video 1.1" annotations.xml.
+    Each track lives on a random range of frames, every 10th frame is a keyframe
+    and the last shape of the track is marked as outside.
+
+    :return: root element of the XML tree
+    :rtype: ET.Element
+    """
+    root = ET.Element("annotations")
+    ET.SubElement(root, "version").text = "1.1"
+    root.append(build_meta("tracks", frames_count, image_size))
+
+    for track_id in range(tracks_count):
+        geometry = choose_geometry(rng, geometries)
+        if geometry == "mask":
+            # * CVAT doesn't export masks as tracks, replace them with boxes.
+            geometry = "box"
+        start = rng.randrange(frames_count)
+        stop = rng.randint(start, frames_count - 1)
+        shape = build_shape(rng, geometry, image_size, polygon_vertices)
+        label = shape.attrib.pop("label")
+        track_et = ET.SubElement(
+            root, "track", id=str(track_id), label=label, source="manual"
+        )
+        for frame in range(start, stop + 1):
+            frame_shape = copy.copy(shape)
+            frame_shape.attrib = dict(shape.attrib)
+            frame_shape.set("frame", str(frame))
+            frame_shape.set("keyframe", "1" if (frame - start) % 10 == 0 else "0")
+            frame_shape.set("outside", "1" if frame == stop and stop != start else "0")
+            frame_shape.set("occluded", "0")
+            track_et.append(frame_shape)
+
+    return root
+
+
+def build_meta(kind: str, size: int, image_size: Tuple[int, int]) -> ET.Element:
+    """Builds the meta element with the task information.
+    For video tasks contains the "source" element with the name of the original video.
+
+    :return: meta element
+    :rtype: ET.Element
+    """
+    height, width = image_size
+    meta = ET.Element("meta")
+    task = ET.SubElement(meta, "task")
+    ET.SubElement(task, "id").text = "1"
+    ET.SubElement(task, "name").text = f"synthetic_{kind}"
+    ET.SubElement(task, "size").text = str(size)
+    ET.SubElement(task, "mode").text = (
+        "annotation" if kind == "images" else "interpolation"
+    )
+    ET.SubElement(task, "start_frame").text = "0"
+    ET.SubElement(task, "stop_frame").text = str(size - 1)
+    if kind != "images":
+        original_size = ET.SubElement(task, "original_size")
+        ET.SubElement(original_size, "width").text = str(width)
+        ET.SubElement(original_size, "height").text = str(height)
+        ET.SubElement(task, "source").text = "synthetic.mp4"
+    return meta
+
+
+def build_shape(
+    rng: random.Random,
+    geometry: str,
+    image_size: Tuple[int, int],
+    polygon_vertices: int,
+) -> ET.Element:
+    """Builds the XML element of the shape with given geometry in random place of the image.
+
+    :return: shape element
+    :rtype: ET.Element
+    """
+    height, width = image_size
+    label = f"{geometry}_label_{rng.randrange(5)}"
+    attrib = {"label": label, "occluded": "0", "source": "manual", "z_order": "0"}
+
+    if geometry == "box":
+        xtl, xbr = sorted(rng.uniform(0, width - 1) for _ in range(2))
+        ytl, ybr = sorted(rng.uniform(0, height - 1) for _ in range(2))
+        attrib.update(
+            xtl=f"{xtl:.2f}", ytl=f"{ytl:.2f}", xbr=f"{xbr:.2f}", ybr=f"{ybr:.2f}"
+        )
+        return ET.Element("box", attrib)
+
+    if geometry in ("polygon", "polyline", "points"):
+        count = (
+            polygon_vertices if geometry != "points" else max(1, polygon_vertices // 4)
+        )
+        attrib["points"] = random_points(rng, count, image_size)
+        return ET.Element(geometry, attrib)
+
+    if geometry == "mask":
+        mask_width = rng.randint(1, max(1, width // 4))
+        mask_height = rng.randint(1, max(1, height // 4))
+        left = rng.randrange(width - mask_width + 1)
+        top = rng.randrange(height - mask_height + 1)
+        attrib.update(
+            rle=", ".join(
+                str(value) for value in random_rle(rng, mask_width * mask_height)
+            ),
+            left=str(left),
+            top=str(top),
+            width=str(mask_width),
+            height=str(mask_height),
+        )
+        return ET.Element("mask", attrib)
+
+    # skeleton
+    del attrib["occluded"]
+    skeleton = ET.Element("skeleton", attrib)
+    for node in SKELETON_NODES:
+        ET.SubElement(
+            skeleton,
+            "points",
+            label=node,
+            outside="0",
+            occluded="0",
+            points=random_points(rng, 1, image_size),
+        )
+    return skeleton
+
+
+def random_points(rng: random.Random, count: int, image_size: Tuple[int, int]) -> str:
+    """Returns the string with random points in CVAT format, e.g. "10.00,20.00;30.00,40.00".
+
+    :return: points in CVAT format
+    :rtype: str
+    """
+    height, width = image_size
+    return ";".join(
+        f"{rng.uniform(0, width - 1):.2f},{rng.uniform(0, height - 1):.2f}"
+        for _ in range(count)
+    )
+
+
+def random_rle(rng: random.Random, area: int) -> List[int]:
+    """Returns random CVAT RLE values (alternating counts of background and foreground pixels),
+    which sum up to the given area.
+
+    :return: list of RLE values
+    :rtype: List[int]
+    """
+    values = []
+    left = area
+    while left > 0:
+        value = min(left, rng.randint(1, max(1, area // 8)))
+        values.append(value)
+        left -= value
+    return values
+
+
+def choose_geometry(rng: random.Random, geometries: Dict[str, float]) -> str:
+    """Returns random geometry name using the weights from the dictionary.
+
+    :return: name of the geometry
+    :rtype: str
+    """
+    names = list(geometries)
+    return rng.choices(names, weights=[geometries[name] for name in names])[0]
+
+
+def image_names(kind: str, images_count: int) -> List[str]:
+    """Returns names of the images as they are stored in annotations.xml.
+    For video tasks CVAT uses "frame_000000" names without extension.
+
+    :return: list of image names
+    :rtype: List[str]
+    """
+    if kind == "images":
+        return [f"image_{idx:06d}.jpg" for idx in range(images_count)]
+    return [f"frame_{idx:06d}" for idx in range(images_count)]
+
+
+def write_placeholder_images(
+    images_dir: str, names: List[str], image_size: Tuple[int, int]
+) -> None:
+    """Writes black placeholder images with given names and size to the directory.
+    Frames of the video tasks are saved with ".PNG" extension, as CVAT does.
+
+    :param images_dir: directory, where images will be saved
+    :type images_dir: str
+    :param names: names of the images
+    :type names: List[str]
+    :param image_size: size of the images (height, width)
+    :type image_size: Tuple[int, int]
+    """
+    os.makedirs(images_dir, exist_ok=True)
+    image = np.zeros((*image_size, 3), dtype=np.uint8)
+    _, jpg_bytes = cv2.imencode(".jpg", image)
+    _, png_bytes = cv2.imencode(".png", image)
+    for name in names:
+        data = jpg_bytes if os.path.splitext(name)[1] else png_bytes
+        file_name = name if os.path.splitext(name)[1] else f"{name}.PNG"
+        with open(os.path.join(images_dir, file_name), "wb") as f:
+            f.write(data.tobytes())
+
+
+def parse_geometries(value: str) -> Dict[str, float]:
+    """Parses geometries mix from the command line, e.g. "box=3,polygon=1,mask=0.5".
+
+    :return: dictionary with geometry names and weights
+    :rtype: Dict[str, float]
+    """
+    geometries = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        geometries[name.strip()] = float(weight) if weight else 1.0
+    return geometries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic CVAT export.")
+    parser.add_argument(
+        "output_dir", help="Directory, where the task will be generated."
+    )
+    parser.add_argument("--kind", choices=KINDS, default="images")
+    parser.add_argument(
+        "--images", type=int, default=100, help="Number of images or frames."
+    )
+    parser.add_argument(
+        "--labels", type=int, default=10, help="Labels per image or tracks."
+    )
+    parser.add_argument("--tags", type=int, default=1, help="Tags per image.")
+    parser.add_argument(
+        "--geometries",
+        type=parse_geometries,
+        default=None,
+        help=f"Geometry mix with weights, e.g. box=3,polygon=1. Available: {GEOMETRIES}.",
+    )
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument(
+        "--vertices", type=int, default=16, help="Vertices in polygons."
+    )
+    parser.add_argument("--no-images", action="store_true", help="Don't write images.")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    annotations_xml_path = generate_task(
+        args.output_dir,
+        kind=args.kind,
+        images_count=args.images,
+        labels_per_image=args.labels,
+        geometries=args.geometries,
+        tags_per_image=args.tags,
+        image_size=(args.height, args.width),
+        polygon_vertices=args.vertices,
+        write_images=not args.no_images,
+        seed=args.seed,
+    )
+    print(f"Generated {annotations_xml_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,524 @@
+"""Local stand-in for the CVAT REST API for migration tool load tests.
+
+Serves the endpoints, which are used by migration_tool/src/cvat_api.py: server info, paginated
+lists of projects and tasks and asynchronous export of the task dataset (202 while the export
+is in progress, 200 with the archive after it). Archives are generated on the fly with
+generate_cvat_export.py on the first export request and cached on the disk.
+Latency and export delays are configurable, so the concurrency, retries and pipelining of the
+migration can be benchmarked without a real CVAT instance.
+
+Usage example:
+    python benchmarks/mock_cvat_server.py --port 8200 --projects 5 --tasks 10 --export-delay 3
+    # cvat.env: CVAT_SERVER_ADDRESS="http://127.0.0.1:8200" CVAT_USERNAME="mock" CVAT_PASSWORD="mock"
+"""
+
+import os
+import json
+import random
+import shutil
+import zipfile
+import argparse
+import tempfile
+import threading
+
+from time import sleep, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from generate_cvat_export import generate_task
+
+# * Version of CVAT, which is reported by the server/about endpoint.
+CVAT_VERSION = "2.7.0"
+
+# * Default page size of the CVAT list endpoints.
+DEFAULT_PAGE_SIZE = 10
+
+# * Export formats, which are supported by the mock, with the kinds of the generated tasks.
+# "CVAT for video 1.1" is exported with tracks for video tasks and as images for image tasks.
+EXPORT_FORMATS = {
+    "CVAT for images 1.1": {"imageset": "images", "video": "video"},
+    "CVAT for video 1.1": {"imageset": "images", "video": "tracks"},
+}
+
+TIMESTAMP = "2023-01-01T00:00:00.000000Z"
+
+
+class MockCVAT:
+    """In-memory state of the mock CVAT instance: deterministically generated projects and tasks
+    and the state of the dataset exports. Archives are generated on demand and saved
+    to the temporary directory. All methods are thread-safe.
+
+    :param projects_count: number of projects, defaults to 3
+    :type projects_count: int, optional
+    :param tasks_per_project: number of tasks in each project, defaults to 5
+    :type tasks_per_project: int, optional
+    :param images_per_task: number of images (or frames) in each task, defaults to 20
+    :type images_per_task: int, optional
+    :param labels_per_image: number of labels on each image, defaults to 5
+    :type labels_per_image: int, optional
+    :param image_size: size of the images (height, width), defaults to (480, 640)
+    :type image_size: Tuple[int, int], optional
+    :param video_ratio: share of the video tasks, defaults to 0.2
+    :type video_ratio: float, optional
+    :param padding_mb: size of the incompressible file with random bytes, which is added
+        to each archive to emulate heavy images, defaults to 0
+    :type padding_mb: float, optional
+    :param seed: seed for the random generator, defaults to 42
+    :type seed: int, optional
+    """
+
+    def __init__(
+        self,
+        projects_count: int = 3,
+        tasks_per_project: int = 5,
+        images_per_task: int = 20,
+        labels_per_image: int = 5,
+        image_size: Tuple[int, int] = (480, 640),
+        video_ratio: float = 0.2,
+        padding_mb: float = 0.0,
+        seed: int = 42,
+    ):
+        self.images_per_task = images_per_task
+        self.labels_per_image = labels_per_image
+        self.image_size = image_size
+        self.padding_mb = padding_mb
+        self.seed = seed
+
+        self._lock = threading.Lock()
+        self._archives_dir = tempfile.mkdtemp(prefix="mock_cvat_")
+
+        # Dictionary with (task ID, format) as keys and time of the export request as values.
+        self._exports_started: Dict[Tuple[int, str], float] = {}
+
+        # Dictionary with (task ID, format) as keys and paths to generated archives as values.
+        self._archives: Dict[Tuple[int, str], str] = {}
+        self._archive_locks: Dict[Tuple[int, str], threading.Lock] = {}
+
+        # Number of the requests for each endpoint.
+        self.calls: Dict[str, int] = {}
+
+        rng = random.Random(seed)
+        self.projects: List[Dict] = []
+        self.tasks: List[Dict] = []
+        for project_idx in range(projects_count):
+            project_id = project_idx + 1
+            self.projects.append({"id": project_id, "name": f"project_{project_id}"})
+            for task_idx in range(tasks_per_project):
+                task_id = project_idx * tasks_per_project + task_idx + 1
+                data_type = "video" if rng.random() < video_ratio else "imageset"
+                self.tasks.append(
+                    {
+                        "id": task_id,
+                        "name": f"task_{task_id}",
+                        "project_id": project_id,
+                        "data_type": data_type,
+                    }
+                )
+
+    def count_call(self, endpoint: str) -> None:
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+    def project_read(self, project: Dict, base_url: str) -> Dict:
+        """Returns the project in the format of CVAT ProjectRead model.
+
+        :return: project data
+        :rtype: Dict
+        """
+        url = f"{base_url}/api/projects/{project['id']}"
+        tasks_count = sum(
+            1 for task in self.tasks if task["project_id"] == project["id"]
+        )
+        return {
+            "url": url,
+            "id": project["id"],
+            "name": project["name"],
+            "labels": {
+                "url": f"{base_url}/api/labels?project_id={project['id']}",
+                "count": 6,
+            },
+            "tasks": {
+                "url": f"{base_url}/api/tasks?project_id={project['id']}",
+                "count": tasks_count,
+            },
+            "owner": owner(base_url),
+            "assignee": None,
+            "guide_id": None,
+            "bug_tracker": "",
+            "task_subsets": [],
+            "created_date": TIMESTAMP,
+            "updated_date": TIMESTAMP,
+            "status": "annotation",
+            "dimension": "2d",
+            "organization": None,
+            "target_storage": None,
+            "source_storage": None,
+        }
+
+    def task_read(self, task: Dict, base_url: str) -> Dict:
+        """Returns the task in the format of CVAT TaskRead model.
+
+        :return: task data
+        :rtype: Dict
+        """
+        return {
+            "url": f"{base_url}/api/tasks/{task['id']}",
+            "id": task["id"],
+            "name": task["name"],
+            "project_id": task["project_id"],
+            "mode": "interpolation" if task["data_type"] == "video" else "annotation",
+            "owner": owner(base_url),
+            "assignee": None,
+            "bug_tracker": "",
+            "created_date": TIMESTAMP,
+            "updated_date": TIMESTAMP,
+            "overlap": 0,
+            "segment_size": self.images_per_task,
+            "status": "annotation",
+            "labels": {
+                "url": f"{base_url}/api/labels?task_id={task['id']}",
+                "count": 6,
+            },
+            "jobs": {
+                "count": 1,
+                "completed": 0,
+                "validation": 0,
+                "url": f"{base_url}/api/jobs?task_id={task['id']}",
+            },
+            "data_chunk_size": 36,
+            "data_compressed_chunk_type": "imageset",
+            "data_original_chunk_type": task["data_type"],
+            "size": self.images_per_task,
+            "image_quality": 70,
+            "data": task["id"],
+            "dimension": "2d",
+            "subset": "",
+            "organization": None,
+            "target_storage": None,
+            "source_storage": None,
+        }
+
+    def get_task(self, task_id: int) -> Optional[Dict]:
+        for task in self.tasks:
+            if task["id"] == task_id:
+                return task
+        return None
+
+    def export_status(
+        self, task_id: int, export_format: str, export_delay: float
+    ) -> bool:
+        """Starts the export on the first request and returns True if the export is finished.
+
+        :return: True if the archive is ready for download
+        :rtype: bool
+        """
+        key = (task_id, export_format)
+        with self._lock:
+            started_at = self._exports_started.setdefault(key, time())
+        return time() - started_at >= export_delay
+
+    def archive_path(self, task: Dict, export_format: str) -> str:
+        """Returns the path to the archive with the exported task, generates it on the first call.
+
+        :return: path to the zip archive
+        :rtype: str
+        """
+        key = (task["id"], export_format)
+        with self._lock:
+            archive_lock = self._archive_locks.setdefault(key, threading.Lock())
+
+        with archive_lock:
+            if key in self._archives:
+                return self._archives[key]
+
+            kind = EXPORT_FORMATS[export_format][task["data_type"]]
+            task_dir = os.path.join(self._archives_dir, f"task_{task['id']}_{kind}")
+            generate_task(
+                task_dir,
+                kind=kind,
+                images_count=self.images_per_task,
+                labels_per_image=self.labels_per_image,
+                image_size=self.image_size,
+                seed=self.seed + task["id"],
+            )
+            archive_path = shutil.make_archive(task_dir, "zip", task_dir)
+            shutil.rmtree(task_dir)
+            if self.padding_mb:
+                with zipfile.ZipFile(archive_path, "a", zipfile.ZIP_STORED) as archive:
+                    archive.writestr(
+                        "padding.bin", os.urandom(int(self.padding_mb * 1024 * 1024))
+                    )
+            self._archives[key] = archive_path
+            return archive_path
+
+    def cleanup(self) -> None:
+        """Removes the temporary directory with generated archives."""
+        shutil.rmtree(self._archives_dir, ignore_errors=True)
+
+
+def owner(base_url: str) -> Dict:
+    return {
+        "url": f"{base_url}/api/users/1",
+        "id": 1,
+        "username": "admin",
+        "first_name": "",
+        "last_name": "",
+    }
+
+
+def paginate(
+    items: List[Dict], query: Dict[str, List[str]], base_url: str, path: str
+) -> Dict:
+    """Returns the page of items in the format of CVAT paginated list endpoints.
+    The page and page_size query parameters are supported.
+
+    :return: page of the items with count, next and previous links
+    :rtype: Dict
+    """
+    page = int(query.get("page", ["1"])[0])
+    page_size = int(query.get("page_size", [str(DEFAULT_PAGE_SIZE)])[0])
+    start = (page - 1) * page_size
+    end = start + page_size
+    results = items[start:end]
+
+    def page_url(page_number: int) -> str:
+        params = {key: values[0] for key, values in query.items()}
+        params["page"] = page_number
+        return f"{base_url}{path}?{urlencode(params)}"
+
+    return {
+        "count": len(items),
+        "next": page_url(page + 1) if end < len(items) else None,
+        "previous": page_url(page - 1) if page > 1 else None,
+        "results": results,
+    }
+
+
+class MockCVATServer(ThreadingHTTPServer):
+    """HTTP server, which serves the mock CVAT API.
+
+    :param address: host and port to listen on
+    :type address: Tuple[str, int]
+    :param cvat: state of the mock CVAT instance
+    :type cvat: MockCVAT
+    :param latency: latency of every response in seconds, defaults to 0
+    :type latency: float, optional
+    :param export_delay: seconds between the first export request of the task
+        and the moment, when the archive is ready, defaults to 0
+    :type export_delay: float, optional
+    :param download_speed: speed of archive downloads in megabytes per second,
+        0 means no limit, defaults to 0
+    :type download_speed: float, optional
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        cvat: MockCVAT,
+        latency: float = 0.0,
+        export_delay: float = 0.0,
+        download_speed: float = 0.0,
+    ):
+        super().__init__(address, MockCVATHandler)
+        self.cvat = cvat
+        self.latency = latency
+        self.export_delay = export_delay
+        self.download_speed = download_speed
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class MockCVATHandler(BaseHTTPRequestHandler):
+    server: MockCVATServer
+
+    def log_message(self, format, *args):
+        # * Don't print every request to stderr, statistics are available with cvat.calls.
+        pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        path = parsed.path.rstrip("/")
+        query = parse_qs(parsed.query)
+        cvat = self.server.cvat
+        base_url = (
+            f"http://{self.headers.get('Host', self.server.url[len('http://'):])}"
+        )
+
+        if self.server.latency:
+            sleep(self.server.latency)
+
+        parts = path.split("/")
+        if path == "/api/server/about":
+            cvat.count_call("server/about")
+            self.send_json(
+                200,
+                {
+                    "name": "Computer Vision Annotation Tool",
+                    "description": "Mock CVAT server for load tests.",
+                    "version": CVAT_VERSION,
+                },
+            )
+        elif path == "/api/projects":
+            cvat.count_call("projects")
+            projects = [
+                cvat.project_read(project, base_url) for project in cvat.projects
+            ]
+            self.send_json(200, paginate(projects, query, base_url, path))
+        elif path == "/api/tasks":
+            cvat.count_call("tasks")
+            tasks = cvat.tasks
+            if "project_id" in query:
+                project_id = int(query["project_id"][0])
+                tasks = [task for task in tasks if task["project_id"] == project_id]
+            tasks = [cvat.task_read(task, base_url) for task in tasks]
+            self.send_json(200, paginate(tasks, query, base_url, path))
+        elif len(parts) == 5 and parts[2] == "tasks" and parts[4] == "dataset":
+            cvat.count_call("tasks/dataset")
+            self.export_dataset(int(parts[3]), query)
+        else:
+            self.send_json(404, {"detail": "Not found."})
+
+    def export_dataset(self, task_id: int, query: Dict[str, List[str]]) -> None:
+        """Emulates asynchronous export of the task dataset: responds with 202 while
+        the export is in progress, with 201 when the archive is ready and with 200 and
+        the archive when it's ready and the action is "download".
+        """
+        cvat = self.server.cvat
+        task = cvat.get_task(task_id)
+        if task is None:
+            self.send_json(404, {"detail": "Not found."})
+            return
+
+        export_format = query.get("format", [""])[0]
+        if export_format not in EXPORT_FORMATS:
+            self.send_json(
+                400,
+                {
+                    "detail": f"Unknown format specified for the request: {export_format}"
+                },
+            )
+            return
+
+        if not cvat.export_status(task_id, export_format, self.server.export_delay):
+            self.send_json(202, None)
+            return
+
+        archive_path = cvat.archive_path(task, export_format)
+        if query.get("action", [""])[0] != "download":
+            self.send_json(201, None)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(os.path.getsize(archive_path)))
+        self.send_header(
+            "Content-Disposition",
+            f'attachment; filename="{task["name"]}.zip"',
+        )
+        self.end_headers()
+        self.send_file(archive_path)
+
+    def send_file(self, path: str, chunk_size: int = 1024 * 1024) -> None:
+        """Sends the file in chunks, limiting the speed if download_speed is set."""
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                if self.server.download_speed:
+                    sleep(len(chunk) / 1024 / 1024 / self.server.download_speed)
+
+    def send_json(self, status: int, data: Any) -> None:
+        content = json.dumps(data).encode("utf-8") if data is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def start_in_thread(
+    cvat: Optional[MockCVAT] = None, host: str = "127.0.0.1", port: int = 0, **kwargs
+) -> MockCVATServer:
+    """Starts the mock server in the background thread and returns it.
+    With port 0 a free port will be selected, use server.url to get the address.
+
+    :return: running mock server
+    :rtype: MockCVATServer
+    """
+    server = MockCVATServer((host, port), cvat or MockCVAT(), **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run mock CVAT API server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--projects", type=int, default=3)
+    parser.add_argument("--tasks", type=int, default=5, help="Tasks per project.")
+    parser.add_argument("--images", type=int, default=20, help="Images per task.")
+    parser.add_argument("--labels", type=int, default=5, help="Labels per image.")
+    parser.add_argument(
+        "--image-size",
+        type=int,
+        nargs=2,
+        default=[480, 640],
+        metavar=("HEIGHT", "WIDTH"),
+    )
+    parser.add_argument(
+        "--video-ratio", type=float, default=0.2, help="Share of video tasks."
+    )
+    parser.add_argument(
+        "--padding-mb", type=float, default=0.0, help="Extra MB per archive."
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds per request."
+    )
+    parser.add_argument(
+        "--export-delay", type=float, default=0.0, help="Seconds until export is ready."
+    )
+    parser.add_argument(
+        "--download-speed", type=float, default=0.0, help="Download limit in MB/s."
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    cvat = MockCVAT(
+        projects_count=args.projects,
+        tasks_per_project=args.tasks,
+        images_per_task=args.images,
+        labels_per_image=args.labels,
+        image_size=tuple(args.image_size),
+        video_ratio=args.video_ratio,
+        padding_mb=args.padding_mb,
+        seed=args.seed,
+    )
+    server = MockCVATServer(
+        (args.host, args.port),
+        cvat,
+        latency=args.latency,
+        export_delay=args.export_delay,
+        download_speed=args.download_speed,
+    )
+    print(f"Mock CVAT API is running on {server.url}, press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(cvat.calls, indent=4))
+        server.server_close()
+        cvat.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,680 @@
+"""Local stand-in for the Supervisely public API for end-to-end throughput tests.
+
+Implements the endpoints, which are used by the apps to create projects and datasets, update
+project meta, upload images, videos, annotations and tags. All data is kept in memory, uploaded
+files are only hashed and counted. Latency, failure rate and throttling are configurable,
+so the upload code can be profiled and load-tested offline.
+
+Usage example:
+    python benchmarks/mock_sly_server.py --port 8100 --latency 0.05 --failure-rate 0.01
+    export SERVER_ADDRESS="http://127.0.0.1:8100" API_TOKEN="mock"
+"""
+
+import re
+import json
+import base64
+import random
+import socket
+import hashlib
+import argparse
+import threading
+
+from time import sleep, time
+from collections import defaultdict
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+API_PREFIX = "/public/api/v3/"
+
+# * Format of the timestamps in the responses.
+TIMESTAMP = "2023-01-01T00:00:00.000Z"
+
+
+class NameConflictError(Exception):
+    """Raised when the project or dataset with the same name already exists,
+    the real server responds with 400 error in this case."""
+
+
+class MockSupervisely:
+    """In-memory state of the mock Supervisely instance: projects, datasets, images, videos,
+    annotations and statistics of the API calls. All methods are thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+        # Makes the check of the name and the creation of the project or dataset atomic.
+        self._names_lock = threading.Lock()
+
+        self.projects: Dict[int, Dict] = {}
+        self.metas: Dict[int, Dict] = {}
+        self.datasets: Dict[int, Dict] = {}
+        self.images: Dict[int, Dict] = {}
+        self.videos: Dict[int, Dict] = {}
+        self.annotations: Dict[int, Dict] = {}
+
+        # Hashes of the uploaded files with their sizes in bytes.
+        self.files: Dict[str, int] = {}
+
+        self.objects_count = 0
+        self.figures_count = 0
+        self.tags_count = 0
+
+        # Number of calls and total size of the request bodies for each API method.
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.bytes_received: Dict[str, int] = defaultdict(int)
+
+    def new_id(self) -> int:
+        with self._lock:
+            new_id = self._next_id
+            self._next_id += 1
+            return new_id
+
+    def new_ids(self, count: int) -> List[int]:
+        return [self.new_id() for _ in range(count)]
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns statistics of the stored data and the API calls.
+
+        :return: dictionary with statistics
+        :rtype: Dict[str, Any]
+        """
+        with self._lock:
+            return {
+                "projects": len(self.projects),
+                "datasets": len(self.datasets),
+                "images": len(self.images),
+                "videos": len(self.videos),
+                "annotations": len(self.annotations),
+                "objects": self.objects_count,
+                "figures": self.figures_count,
+                "tags": self.tags_count,
+                "files_bytes": sum(self.files.values()),
+                "calls": dict(self.calls),
+                "bytes_received": dict(self.bytes_received),
+            }
+
+    # ------------------------------------------------------------------ projects
+
+    def project_info(self, project_id: int) -> Dict:
+        project = self.projects[project_id]
+        datasets = [
+            ds for ds in self.datasets.values() if ds["projectId"] == project_id
+        ]
+        items = sum(ds["itemsCount"] for ds in datasets)
+        return {
+            **project,
+            "imagesCount": items,
+            "itemsCount": items,
+            "datasetsCount": len(datasets),
+        }
+
+    def projects_add(self, data: Dict) -> Dict:
+        with self._names_lock:
+            for project in self.projects.values():
+                if (
+                    project["name"] == data["name"]
+                    and project["workspaceId"] == data["workspaceId"]
+                ):
+                    raise NameConflictError(
+                        f"Project with name {data['name']} already exists"
+                    )
+            return self._add_project(data)
+
+    def _add_project(self, data: Dict) -> Dict:
+        project_id = self.new_id()
+        self.projects[project_id] = {
+            "id": project_id,
+            "name": data["name"],
+            "description": data.get("description", ""),
+            "size": 0,
+            "readme": "",
+            "workspaceId": data["workspaceId"],
+            "createdAt": TIMESTAMP,
+            "updatedAt": TIMESTAMP,
+            "type": data.get("type", "images"),
+            "referenceImageUrl": None,
+            "customData": {},
+            "backupArchive": None,
+        }
+        self.metas[project_id] = {
+            "classes": [],
+            "tags": [],
+            "projectType": data.get("type", "images"),
+        }
+        return self.project_info(project_id)
+
+    def projects_list(self, data: Dict) -> Dict:
+        projects = [
+            self.project_info(project["id"])
+            for project in self.projects.values()
+            if project["workspaceId"] == data.get("workspaceId", project["workspaceId"])
+        ]
+        return paginate(apply_filters(projects, data.get("filter")))
+
+    def projects_info(self, data: Dict) -> Dict:
+        return self.project_info(data["id"])
+
+    def projects_meta(self, data: Dict) -> Dict:
+        return self.metas[data["id"]]
+
+    def projects_meta_update(self, data: Dict) -> Dict:
+        """Saves the new meta of the project, assigns IDs to new classes and tags,
+        as the real server does."""
+        meta = data["meta"]
+        for key in ("classes", "tags"):
+            for item in meta.get(key, []):
+                if item.get("id") is None:
+                    item["id"] = self.new_id()
+        self.metas[data["id"]] = meta
+        return {"success": True}
+
+    def object_classes_list(self, data: Dict) -> Dict:
+        classes = [
+            {
+                "id": obj_class["id"],
+                "name": obj_class["title"],
+                "description": obj_class.get("description", ""),
+                "shape": obj_class["shape"],
+                "color": obj_class.get("color"),
+                "settings": {},
+                "createdAt": TIMESTAMP,
+                "updatedAt": TIMESTAMP,
+            }
+            for obj_class in self.metas[data["projectId"]].get("classes", [])
+        ]
+        return paginate(apply_filters(classes, data.get("filter")))
+
+    def tags_list(self, data: Dict) -> Dict:
+        tags = [
+            {
+                "id": tag["id"],
+                "projectId": data["projectId"],
+                "name": tag["name"],
+                "settings": {"type": tag.get("value_type")},
+                "color": tag.get("color"),
+                "createdAt": TIMESTAMP,
+                "updatedAt": TIMESTAMP,
+            }
+            for tag in self.metas[data["projectId"]].get("tags", [])
+        ]
+        return paginate(apply_filters(tags, data.get("filter")))
+
+    # ------------------------------------------------------------------ datasets
+
+    def datasets_add(self, data: Dict) -> Dict:
+        with self._names_lock:
+            for dataset in self.datasets.values():
+                if (
+                    dataset["name"] == data["name"]
+                    and dataset["projectId"] == data["projectId"]
+                ):
+                    raise NameConflictError(
+                        f"Dataset with name {data['name']} already exists"
+                    )
+            return self._add_dataset(data)
+
+    def _add_dataset(self, data: Dict) -> Dict:
+        dataset_id = self.new_id()
+        self.datasets[dataset_id] = {
+            "id": dataset_id,
+            "name": data["name"],
+            "description": data.get("description", ""),
+            "size": 0,
+            "projectId": data["projectId"],
+            "imagesCount": 0,
+            "itemsCount": 0,
+            "createdAt": TIMESTAMP,
+            "updatedAt": TIMESTAMP,
+            "referenceImageUrl": None,
+        }
+        return self.datasets[dataset_id]
+
+    def datasets_list(self, data: Dict) -> Dict:
+        datasets = [
+            ds for ds in self.datasets.values() if ds["projectId"] == data["projectId"]
+        ]
+        return paginate(apply_filters(datasets, data.get("filter")))
+
+    def datasets_info(self, data: Dict) -> Dict:
+        return self.datasets[data["id"]]
+
+    # ------------------------------------------------------------------ images
+
+    def bulk_upload(self, files: List[bytes]) -> List[Dict]:
+        """Saves hashes of the uploaded files in the same format as Supervisely SDK computes them."""
+        results = []
+        for content in files:
+            file_hash = base64.b64encode(hashlib.sha256(content).digest()).decode(
+                "utf-8"
+            )
+            with self._lock:
+                self.files[file_hash] = len(content)
+            results.append({"hash": file_hash})
+        return results
+
+    def hashes_list(self, data: List[str]) -> List[str]:
+        return [file_hash for file_hash in data if file_hash in self.files]
+
+    def images_bulk_add(self, data: Dict) -> List[Dict]:
+        dataset = self.datasets[data["datasetId"]]
+        results = []
+        for image in data["images"]:
+            image_id = self.new_id()
+            info = {
+                "id": image_id,
+                "name": image["title"],
+                "link": image.get("link"),
+                "hash": image.get("hash"),
+                "mime": "image/jpeg",
+                "ext": "jpeg",
+                "size": self.files.get(image.get("hash"), 0),
+                "width": 640,
+                "height": 480,
+                "labelsCount": 0,
+                "datasetId": dataset["id"],
+                "createdAt": TIMESTAMP,
+                "updatedAt": TIMESTAMP,
+                "meta": image.get("meta", {}),
+                "pathOriginal": f"/images/{image_id}",
+                "fullStorageUrl": f"/images/{image_id}",
+                "tags": [],
+            }
+            self.images[image_id] = info
+            results.append(info)
+        with self._lock:
+            dataset["imagesCount"] += len(results)
+            dataset["itemsCount"] += len(results)
+        return results
+
+    def images_info(self, data: Dict) -> Dict:
+        return self.images[data["id"]]
+
+    def annotations_bulk_add(self, data: Dict) -> Dict:
+        for item in data["annotations"]:
+            self.annotations[item["imageId"]] = item["annotation"]
+        return {"success": True}
+
+    def image_tags_bulk_add(self, data: Dict) -> Dict:
+        with self._lock:
+            self.tags_count += len(data["ids"])
+        return {"success": True}
+
+    # ------------------------------------------------------------------ videos
+
+    def import_storage_meta_list(self, data: Dict) -> List[Dict]:
+        """Returns the file meta for the uploaded videos with a single video stream,
+        as the real server does after processing the video with ffprobe."""
+        return [
+            {
+                "hash": file_hash,
+                "meta": {
+                    "streams": [
+                        {
+                            "index": 0,
+                            "codecType": "video",
+                            "codecName": "h264",
+                            "width": 640,
+                            "height": 480,
+                        }
+                    ]
+                },
+            }
+            for file_hash in data["hashes"]
+        ]
+
+    def videos_bulk_add(self, data: Dict) -> List[Dict]:
+        dataset = self.datasets[data["datasetId"]]
+        project = self.projects[dataset["projectId"]]
+        results = []
+        for video in data["videos"]:
+            video_id = self.new_id()
+            info = {
+                "id": video_id,
+                "name": video.get("title") or video.get("name"),
+                "hash": video.get("hash"),
+                "link": video.get("link"),
+                "teamId": 1,
+                "workspaceId": project["workspaceId"],
+                "projectId": project["id"],
+                "datasetId": dataset["id"],
+                "pathOriginal": f"/videos/{video_id}",
+                "fileMeta": {
+                    "framesToTimecodes": [],
+                    "framesCount": 0,
+                    "width": 640,
+                    "height": 480,
+                },
+                "createdAt": TIMESTAMP,
+                "updatedAt": TIMESTAMP,
+                "tags": [],
+                "meta": video.get("meta", {}),
+                "customData": {},
+                "processingPath": None,
+            }
+            self.videos[video_id] = info
+            results.append(info)
+        with self._lock:
+            dataset["itemsCount"] += len(results)
+        return results
+
+    def videos_info(self, data: Dict) -> Dict:
+        return self.videos[data["id"]]
+
+    def videos_list(self, data: Dict) -> Dict:
+        videos = [
+            video
+            for video in self.videos.values()
+            if video["datasetId"] == data["datasetId"]
+        ]
+        return paginate(apply_filters(videos, data.get("filter")))
+
+    def ids_for(self, items: List, counter: str) -> List[Dict]:
+        """Returns new IDs for the bulk-added entities and increases the given counter."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + len(items))
+        return [{"id": new_id} for new_id in self.new_ids(len(items))]
+
+    def annotation_objects_bulk_add(self, data: Dict) -> List[Dict]:
+        return self.ids_for(data["annotationObjects"], "objects_count")
+
+    def figures_bulk_add(self, data: Dict) -> List[Dict]:
+        return self.ids_for(data["figures"], "figures_count")
+
+    def entity_tags_bulk_add(self, data: Dict) -> List[Dict]:
+        return self.ids_for(data["tags"], "tags_count")
+
+
+def paginate(entities: List[Dict]) -> Dict:
+    """Returns the response in the format of the paginated Supervisely list methods.
+    All entities are returned on the first page.
+
+    :return: paginated response
+    :rtype: Dict
+    """
+    return {
+        "total": len(entities),
+        "pagesCount": 1,
+        "perPage": len(entities),
+        "entities": entities,
+    }
+
+
+def apply_filters(entities: List[Dict], filters: Optional[List[Dict]]) -> List[Dict]:
+    """Applies Supervisely list filters with "=" and "in" operators to the entities.
+
+    :return: filtered entities
+    :rtype: List[Dict]
+    """
+    for item in filters or []:
+        field, operator, value = item["field"], item["operator"], item["value"]
+        if operator == "=":
+            entities = [entity for entity in entities if entity.get(field) == value]
+        elif operator == "in":
+            entities = [entity for entity in entities if entity.get(field) in value]
+    return entities
+
+
+class MockSuperviselyServer(ThreadingHTTPServer):
+    """HTTP server, which serves the mock Supervisely API.
+
+    :param address: host and port to listen on
+    :type address: Tuple[str, int]
+    :param latency: base latency of every response in seconds, defaults to 0
+    :type latency: float, optional
+    :param jitter: maximum random addition to the latency in seconds, defaults to 0
+    :type jitter: float, optional
+    :param failure_rate: share of requests, which will fail with 500 error, defaults to 0
+    :type failure_rate: float, optional
+    :param rate_limit: maximum number of requests per second, others will get 429 error,
+        0 means no limit, defaults to 0
+    :type rate_limit: float, optional
+    :param fail_uploads: if True, random failures are applied to the multipart file uploads too.
+        Supervisely SDK can't resend a consumed multipart body on retry, so such failures
+        break the upload, defaults to False
+    :type fail_uploads: bool, optional
+    :param seed: seed for the random generator of failures and jitter, defaults to None
+    :type seed: Optional[int], optional
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        rate_limit: float = 0.0,
+        fail_uploads: bool = False,
+        seed: Optional[int] = None,
+    ):
+        super().__init__(address, MockSuperviselyHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rate_limit = rate_limit
+        self.fail_uploads = fail_uploads
+        self.state = MockSupervisely()
+
+        self._random = random.Random(seed)
+        self._throttle_lock = threading.Lock()
+        self._window_start = time()
+        self._window_requests = 0
+
+        self.handlers: Dict[str, Callable[[Any], Any]] = {
+            "projects.add": self.state.projects_add,
+            "projects.list": self.state.projects_list,
+            "projects.info": self.state.projects_info,
+            "projects.meta": self.state.projects_meta,
+            "projects.meta.update": self.state.projects_meta_update,
+            "advanced.object_classes.list": self.state.object_classes_list,
+            "tags.list": self.state.tags_list,
+            "datasets.add": self.state.datasets_add,
+            "datasets.list": self.state.datasets_list,
+            "datasets.info": self.state.datasets_info,
+            "images.internal.hashes.list": self.state.hashes_list,
+            "images.bulk.upload": self.state.bulk_upload,
+            "images.bulk.add": self.state.images_bulk_add,
+            "images.info": self.state.images_info,
+            "annotations.bulk.add": self.state.annotations_bulk_add,
+            "image-tags.bulk.add-to-image": self.state.image_tags_bulk_add,
+            "videos.bulk.upload": self.state.bulk_upload,
+            "import-storage.internal.meta.list": self.state.import_storage_meta_list,
+            "videos.bulk.add": self.state.videos_bulk_add,
+            "videos.info": self.state.videos_info,
+            "videos.list": self.state.videos_list,
+            "videos.tags.bulk.add": self.state.entity_tags_bulk_add,
+            "annotation-objects.bulk.add": self.state.annotation_objects_bulk_add,
+            "annotation-objects.tags.bulk.add": self.state.entity_tags_bulk_add,
+            "figures.bulk.add": self.state.figures_bulk_add,
+        }
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def delay(self) -> None:
+        """Sleeps for the configured latency with random jitter."""
+        delay = self.latency
+        if self.jitter:
+            delay += self._random.uniform(0, self.jitter)
+        if delay:
+            sleep(delay)
+
+    def should_fail(self, is_upload: bool) -> bool:
+        """Returns True if the current request should fail with the configured probability."""
+        if is_upload and not self.fail_uploads:
+            return False
+        return self.failure_rate > 0 and self._random.random() < self.failure_rate
+
+    def is_throttled(self) -> bool:
+        """Returns True if the request exceeds the rate limit in the current one-second window."""
+        if not self.rate_limit:
+            return False
+        with self._throttle_lock:
+            now = time()
+            if now - self._window_start >= 1:
+                self._window_start = now
+                self._window_requests = 0
+            self._window_requests += 1
+            return self._window_requests > self.rate_limit
+
+
+class MockSuperviselyHandler(BaseHTTPRequestHandler):
+    server: MockSuperviselyServer
+
+    # * Seconds to wait for the request body, after that the connection is closed.
+    timeout = 30
+
+    def do_POST(self):
+        self.handle_api_call()
+
+    def do_GET(self):
+        self.handle_api_call()
+
+    def log_message(self, format, *args):
+        # * Don't print every request to stderr, statistics are available with stats().
+        pass
+
+    def handle_api_call(self) -> None:
+        method = self.path.split("?")[0]
+        if not method.startswith(API_PREFIX):
+            self.send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        method = method.replace(API_PREFIX, "", 1)
+
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        except socket.timeout:
+            self.send_json(408, {"error": "Request body was not received in time"})
+            self.close_connection = True
+            return
+        content_type = self.headers.get("Content-Type", "")
+        is_upload = content_type.startswith("multipart/form-data")
+
+        state = self.server.state
+        with state._lock:
+            state.calls[method] += 1
+            state.bytes_received[method] += len(body)
+
+        self.server.delay()
+        if self.server.is_throttled():
+            self.send_json(429, {"error": "Too many requests"})
+            return
+        if self.server.should_fail(is_upload):
+            self.send_json(500, {"error": "Mock failure"})
+            return
+
+        handler = self.server.handlers.get(method)
+        if handler is None:
+            self.send_json(
+                404, {"error": f"Method {method} is not implemented in mock"}
+            )
+            return
+
+        try:
+            if is_upload:
+                data = parse_multipart(content_type, body)
+            else:
+                data = json.loads(body) if body else {}
+            result = handler(data)
+        except KeyError as e:
+            self.send_json(400, {"error": f"Not found or missing field: {e}"})
+            return
+        except NameConflictError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+
+        self.send_json(200, result)
+
+    def send_json(self, status: int, data: Any) -> None:
+        content = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def parse_multipart(content_type: str, body: bytes) -> List[bytes]:
+    """Returns contents of the files from the multipart/form-data body in the order of the fields.
+
+    :return: list of files contents
+    :rtype: List[bytes]
+    """
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + body
+    )
+    parts = [part for part in message.iter_parts()]
+    index = re.compile(r"^(\d+)")
+    parts.sort(
+        key=lambda part: int(
+            index.match(part.get_param("name", header="content-disposition")).group(1)
+        )
+    )
+    return [part.get_payload(decode=True) for part in parts]
+
+
+def start_in_thread(
+    host: str = "127.0.0.1", port: int = 0, **kwargs
+) -> MockSuperviselyServer:
+    """Starts the mock server in the background thread and returns it.
+    With port 0 a free port will be selected, use server.url to get the address.
+
+    :return: running mock server
+    :rtype: MockSuperviselyServer
+    """
+    server = MockSuperviselyServer((host, port), **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run mock Supervisely API server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds per request."
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="Random extra seconds."
+    )
+    parser.add_argument(
+        "--failure-rate", type=float, default=0.0, help="Share of 500s."
+    )
+    parser.add_argument(
+        "--rate-limit", type=float, default=0.0, help="Requests per second."
+    )
+    parser.add_argument(
+        "--fail-uploads", action="store_true", help="Apply failures to file uploads."
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = MockSuperviselyServer(
+        (args.host, args.port),
+        latency=args.latency,
+        jitter=args.jitter,
+        failure_rate=args.failure_rate,
+        rate_limit=args.rate_limit,
+        fail_uploads=args.fail_uploads,
+        seed=args.seed,
+    )
+    print(f"Mock Supervisely API is running on {server.url}, press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.state.stats(), indent=4))
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+import os
+import json
+import zlib
+import shutil
+import hashlib
+import threading
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import supervisely as sly
+
+# * Header of each cached batch: magic bytes and SHA-256 of the compressed payload.
+MAGIC = b"CVC1"
+DIGEST_SIZE = hashlib.sha256().digest_size
+
+# * Name of the file with the description of the entry (converter version, hash of the XML, batch size).
+ENTRY_META_FILE = "entry.json"
+
+# * Name of the file, which is written when all batches of the task are saved.
+COMPLETE_FILE = "complete.json"
+
+
+class ConversionCache:
+    """Persistent cache of converted annotations, which is kept between the runs,
+    so if only the upload fails, the next run loads converted batches instead of parsing
+    and converting annotations.xml again.
+    Each task has its own entry, which is keyed by SHA-256 of the XML file, version
+    of the converters and the batch size. Batches are stored as zlib-compressed JSON
+    with the checksum in the header. Entries of other converter versions are removed on start,
+    corrupted batches are detected on load and dropped.
+    The total size of the cache is limited by max_bytes, least recently used entries are evicted
+    first, when an entry is closed. Entries, which are still open (the task is being processed),
+    are never evicted. All methods are thread-safe.
+
+    :param cache_dir: directory, where entries will be stored
+    :type cache_dir: str
+    :param converter_version: version of the converters, entries of other versions are removed
+    :type converter_version: str
+    :param max_bytes: maximum total size of the entries in bytes
+    :type max_bytes: int
+    """
+
+    def __init__(self, cache_dir: str, converter_version: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.converter_version = converter_version
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._open_entries: Set[str] = set()
+        self.evictions = 0
+
+        sly.fs.mkdir(cache_dir)
+        self._drop_stale_entries()
+        with self._lock:
+            self._evict()
+
+    def entry(
+        self,
+        annotations_xml_path: str,
+        batch_size: int,
+        start: int = 0,
+        stop: Optional[int] = None,
+    ) -> "CacheEntry":
+        """Returns the entry of the task with the given annotations.xml,
+        the entry is created if it doesn't exist. If only the range of images
+        of the task is processed (e.g. by one of the shards), the range is a part of the key.
+        The entry must be closed with CacheEntry.close, when the task is processed.
+
+        :param annotations_xml_path: path to the annotations.xml of the task
+        :type annotations_xml_path: str
+        :param batch_size: number of images in one batch
+        :type batch_size: int
+        :param start: index of the first image of the range, defaults to 0
+        :type start: int, optional
+        :param stop: index of the image after the last one, defaults to None (till the end)
+        :type stop: Optional[int], optional
+        :return: entry of the task
+        :rtype: CacheEntry
+        """
+        xml_hash = _file_sha256(annotations_xml_path)
+        key = hashlib.sha256(
+            f"{xml_hash}|{self.converter_version}|{batch_size}|{start}|{stop}".encode(
+                "utf-8"
+            )
+        ).hexdigest()
+        entry_meta = {
+            "converter_version": self.converter_version,
+            "xml_hash": xml_hash,
+            "batch_size": batch_size,
+            "range": [start, stop],
+        }
+        entry_dir = os.path.join(self.cache_dir, key)
+        with self._lock:
+            self._open_entries.add(entry_dir)
+            entry = CacheEntry(entry_dir, entry_meta, on_close=self._close_entry)
+            # * Access time of the entry is its modification time, used for eviction.
+            os.utime(entry_dir)
+        return entry
+
+    def _close_entry(self, entry: "CacheEntry") -> None:
+        """Releases the entry and evicts least recently used entries,
+        if the size of the cache exceeds the limit."""
+        with self._lock:
+            self._open_entries.discard(entry.entry_dir)
+            self._evict()
+
+    def _entries(self) -> List[Tuple[str, int, float]]:
+        """Returns list of (path, size, modification time) for each entry."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_dir():
+                continue
+            entries.append((entry.path, _dir_size(entry.path), entry.stat().st_mtime))
+        return entries
+
+    def _evict(self) -> None:
+        """Removes least recently used entries, which are not open, until the size
+        of the cache fits the limit. Must be called with the lock acquired."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path in self._open_entries:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            self.evictions += 1
+            sly.logger.debug(f"Evicted conversion cache entry {path}.")
+
+    def _drop_stale_entries(self) -> None:
+        """Removes entries, which were created by other versions of the converters
+        or have no readable description."""
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_dir():
+                continue
+            entry_meta = _read_json(os.path.join(entry.path, ENTRY_META_FILE))
+            if (
+                entry_meta is None
+                or entry_meta.get("converter_version") != self.converter_version
+            ):
+                sly.logger.debug(f"Removing stale conversion cache entry {entry.path}.")
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+
+class CacheEntry:
+    """Converted batches of one task in the ConversionCache.
+
+    :param entry_dir: directory of the entry
+    :type entry_dir: str
+    :param entry_meta: description of the entry
+    :type entry_meta: Dict[str, Any]
+    :param on_close: function, which is called with the entry on close, defaults to None
+    :type on_close: Optional[Callable[[CacheEntry], None]], optional
+    """
+
+    def __init__(
+        self,
+        entry_dir: str,
+        entry_meta: Dict[str, Any],
+        on_close: Optional[Callable[["CacheEntry"], None]] = None,
+    ):
+        self.entry_dir = entry_dir
+        self._on_close = on_close
+        sly.fs.mkdir(entry_dir)
+        meta_path = os.path.join(entry_dir, ENTRY_META_FILE)
+        if _read_json(meta_path) != entry_meta:
+            _write_json(meta_path, entry_meta)
+
+    @property
+    def batches_count(self) -> Optional[int]:
+        """Number of batches of the task, if all of them were saved, None otherwise."""
+        complete = _read_json(os.path.join(self.entry_dir, COMPLETE_FILE))
+        if complete is None:
+            return None
+        return complete.get("batches")
+
+    def validate(self) -> bool:
+        """Checks that all batches of the complete entry exist and are not corrupted.
+        If the entry is corrupted, it's cleared, so the task will be converted again.
+
+        :return: True if the entry is complete and valid, False otherwise
+        :rtype: bool
+        """
+        batches_count = self.batches_count
+        if batches_count is None:
+            return False
+        for batch_idx in range(batches_count):
+            if self._read_batch_bytes(batch_idx) is None:
+                sly.logger.warning(
+                    f"Conversion cache entry {self.entry_dir} is corrupted, it will be cleared."
+                )
+                self.clear()
+                return False
+        return True
+
+    def load_batch(self, batch_idx: int) -> Optional[Any]:
+        """Returns the payload of the batch or None if the batch is not saved or corrupted.
+        Corrupted batches are removed.
+
+        :param batch_idx: index of the batch
+        :type batch_idx: int
+        :return: payload of the batch
+        :rtype: Optional[Any]
+        """
+        data = self._read_batch_bytes(batch_idx)
+        if data is None:
+            return None
+        try:
+            return json.loads(zlib.decompress(data).decode("utf-8"))
+        except (zlib.error, UnicodeDecodeError, ValueError):
+            sly.logger.warning(
+                f"Cached batch {batch_idx} can't be decoded, dropping it."
+            )
+            sly.fs.silent_remove(self._batch_path(batch_idx))
+            return None
+
+    def iter_batches(self) -> Iterator[Any]:
+        """Yields payloads of all batches of the complete entry.
+
+        :raises RuntimeError: if the batch can't be loaded
+        :return: iterator over payloads of the batches
+        :rtype: Iterator[Any]
+        """
+        for batch_idx in range(self.batches_count or 0):
+            payload = self.load_batch(batch_idx)
+            if payload is None:
+                raise RuntimeError(
+                    f"Batch {batch_idx} of the conversion cache entry {self.entry_dir} can't be loaded."
+                )
+            yield payload
+
+    def save_batch(self, batch_idx: int, payload: Any) -> None:
+        """Saves the JSON-serializable payload of the batch.
+
+        :param batch_idx: index of the batch
+        :type batch_idx: int
+        :param payload: converted batch
+        :type payload: Any
+        """
+        data = zlib.compress(json.dumps(payload).encode("utf-8"))
+        batch_path = self._batch_path(batch_idx)
+        temp_path = f"{batch_path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(hashlib.sha256(data).digest())
+            f.write(data)
+        os.replace(temp_path, batch_path)
+
+    def mark_complete(self, batches_count: int) -> None:
+        """Marks the entry as complete after all batches of the task are saved.
+
+        :param batches_count: number of batches of the task
+        :type batches_count: int
+        """
+        _write_json(
+            os.path.join(self.entry_dir, COMPLETE_FILE), {"batches": batches_count}
+        )
+
+    def close(self) -> None:
+        """Releases the entry after the task is processed, so it can be evicted from the cache.
+        Repeated calls have no effect."""
+        on_close, self._on_close = self._on_close, None
+        if on_close is not None:
+            on_close(self)
+
+    def clear(self) -> None:
+        """Removes all saved batches of the entry."""
+        for entry in os.scandir(self.entry_dir):
+            if entry.name != ENTRY_META_FILE:
+                sly.fs.silent_remove(entry.path)
+
+    def _batch_path(self, batch_idx: int) -> str:
+        return os.path.join(self.entry_dir, f"{batch_idx:06d}.bin")
+
+    def _read_batch_bytes(self, batch_idx: int) -> Optional[bytes]:
+        """Reads the compressed payload of the batch and checks its header and checksum.
+        Returns None if the batch is not saved, removes the batch file if it's corrupted.
+        """
+        batch_path = self._batch_path(batch_idx)
+        if not os.path.isfile(batch_path):
+            return None
+        with open(batch_path, "rb") as f:
+            magic = f.read(len(MAGIC))
+            digest = f.read(DIGEST_SIZE)
+            data = f.read()
+        if magic != MAGIC or hashlib.sha256(data).digest() != digest:
+            sly.logger.warning(f"Cached batch {batch_path} is corrupted, dropping it.")
+            sly.fs.silent_remove(batch_path)
+            return None
+        return data
+
+
+def _file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Returns SHA-256 of the file content in hex format."""
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def _dir_size(path: str) -> int:
+    """Returns total size of the files in the directory, files removed during the scan are skipped."""
+    size = 0
+    for item in os.scandir(path):
+        try:
+            if item.is_file():
+                size += item.stat().st_size
+        except OSError:
+            continue
+    return size
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    """Returns content of the JSON file or None if the file doesn't exist or can't be read."""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, data: Dict) -> None:
+    """Writes the JSON file atomically."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
@@ -1,9 +1,36 @@
 import cv2
 import os
+import multiprocessing
 import numpy as np
 
-from typing import Dict, List, Optional, Tuple, Union, Literal
+from array import array
+
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    Literal,
+)
 from collections import namedtuple, defaultdict
+from contextlib import nullcontext
+from functools import lru_cache
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    as_completed,
+    wait,
+)
+from itertools import islice
+from time import perf_counter, sleep
 
 import supervisely as sly
 import xml.etree.ElementTree as ET
@@ -16,6 +43,206 @@ from supervisely.geometry.cuboid import CuboidFace
 
 ImageObject = namedtuple("ImageObject", ["name", "path", "size", "labels", "tags"])
 
+# * Converted video task, which is waiting for its video to be encoded before the upload.
+VideoTask = namedtuple(
+    "VideoTask", ["dataset_name", "source_name", "video_path", "frames", "tags"]
+)
+
+# * Video annotations are uploaded by chunks of frames, so long videos don't produce
+# * huge requests. Failed chunk is retried with delay growing by VIDEO_ANN_RETRY_DELAY seconds.
+VIDEO_ANN_CHUNK_FRAMES = 500
+VIDEO_ANN_CHUNK_RETRIES = 3
+VIDEO_ANN_RETRY_DELAY = 2
+
+# * Number of images, which are converted and uploaded at once by upload_images_task_batches.
+# * Memory usage of the streaming upload is bounded by this number.
+IMAGES_BATCH_SIZE = 500
+
+# * Version of the converters output, which is a part of the conversion cache key.
+# * Must be increased on every change of the converted annotations, so cached conversions are not reused.
+CONVERTER_VERSION = "1"
+
+
+class VideoObjectRegistry:
+    """Stores VideoObjects of the video by identity of CVAT objects, so VideoFigures
+    of the same object on different frames share one VideoObject.
+    Identity of the object is the name of its class with CVAT track ID or group ID.
+    Objects without identity are stored by their own keys, so each of them is unique.
+    Insert and lookup take constant time, objects are kept in the order of insertion.
+    """
+
+    def __init__(self):
+        self._objects: Dict[Hashable, sly.VideoObject] = {}
+
+    def get_or_create(
+        self, obj_class: sly.ObjClass, cvat_label: Dict[str, str]
+    ) -> sly.VideoObject:
+        """Returns VideoObject for the given CVAT label, creates and stores it if not found.
+
+        :param obj_class: object class of the label in Supervisely format
+        :type obj_class: sly.ObjClass
+        :param cvat_label: label in CVAT format (from XML parser)
+        :type cvat_label: Dict[str, str]
+        :return: shared VideoObject for the label
+        :rtype: sly.VideoObject
+        """
+        identity = self.identity(obj_class, cvat_label)
+        if identity is not None:
+            video_object = self._objects.get(identity)
+            if video_object is not None:
+                return video_object
+
+        video_object = sly.VideoObject(obj_class)
+        self._objects[identity or video_object.key()] = video_object
+        return video_object
+
+    @staticmethod
+    def identity(
+        obj_class: sly.ObjClass, cvat_label: Dict[str, str]
+    ) -> Optional[Tuple[str, str, str]]:
+        """Returns identity of the CVAT object: class name with track ID or group ID.
+        Group ID "0" means that the label is not grouped in CVAT.
+
+        :return: identity of the object or None if the label has neither track nor group
+        :rtype: Optional[Tuple[str, str, str]]
+        """
+        track_id = cvat_label.get("track_id")
+        if track_id is not None:
+            return obj_class.name, "track", track_id
+        group_id = cvat_label.get("group_id")
+        if group_id is not None and group_id != "0":
+            return obj_class.name, "group", group_id
+        return None
+
+    def objects(self) -> List[sly.VideoObject]:
+        """Returns list of stored VideoObjects without duplicates in the order of insertion.
+
+        :return: list of VideoObjects
+        :rtype: List[sly.VideoObject]
+        """
+        return list(self._objects.values())
+
+    def to_collection(self) -> sly.VideoObjectCollection:
+        """Returns stored VideoObjects as VideoObjectCollection for VideoAnnotation.
+
+        :return: collection of VideoObjects
+        :rtype: sly.VideoObjectCollection
+        """
+        return sly.VideoObjectCollection(self.objects())
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+
+class ObjClassTable:
+    """Interns object classes of the labels: each class is created once and referenced
+    by integer ID in CompactLabels, so labels don't keep their own ObjClass objects.
+    """
+
+    __slots__ = ("_ids", "_obj_classes")
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._obj_classes: List[sly.ObjClass] = []
+
+    def intern(self, class_name: str, geometry_type: type) -> int:
+        """Returns ID of the object class with given name, creates the class if not found.
+
+        :param class_name: name of the object class
+        :type class_name: str
+        :param geometry_type: geometry type of the class, e.g. sly.Rectangle
+        :type geometry_type: type
+        :return: ID of the class in the table
+        :rtype: int
+        """
+        class_id = self._ids.get(class_name)
+        if class_id is None:
+            class_id = len(self._obj_classes)
+            self._ids[class_name] = class_id
+            self._obj_classes.append(sly.ObjClass(class_name, geometry_type))
+        return class_id
+
+    def __getitem__(self, class_id: int) -> sly.ObjClass:
+        return self._obj_classes[class_id]
+
+    def __len__(self) -> int:
+        return len(self._obj_classes)
+
+
+class CompactLabels:
+    """Labels of the image stored as flat arrays instead of Label objects:
+    ID of the class for each label, coordinates of all labels in one array and
+    offsets of the labels in it. Supervisely Labels are built by to_labels only before the upload.
+    Coordinates are stored as [top, left, bottom, right] for rectangles and as [row, col, ...]
+    pairs for polygons, polylines and points. Labels of other geometries (masks, skeletons)
+    are stored as Label objects and marked with class ID -1.
+
+    :param class_table: table with object classes of the labels, shared between images of the task
+    :type class_table: ObjClassTable
+    """
+
+    __slots__ = ("class_table", "class_ids", "offsets", "coordinates", "other_labels")
+
+    def __init__(self, class_table: ObjClassTable):
+        self.class_table = class_table
+        self.class_ids = array("i")
+        self.offsets = array("i", [0])
+        self.coordinates = array("i")
+        self.other_labels: List[sly.Label] = []
+
+    def add(self, class_id: int, coordinates: np.ndarray) -> None:
+        """Adds the label with given class ID and coordinates.
+
+        :param class_id: ID of the class in the class table
+        :type class_id: int
+        :param coordinates: coordinates of the label
+        :type coordinates: np.ndarray
+        """
+        self.class_ids.append(class_id)
+        self.coordinates.frombytes(np.asarray(coordinates, dtype=np.int32).tobytes())
+        self.offsets.append(len(self.coordinates))
+
+    def add_label(self, sly_label: sly.Label) -> None:
+        """Adds the label, which can't be stored as coordinates, as Label object.
+
+        :param sly_label: Supervisely Label
+        :type sly_label: sly.Label
+        """
+        self.class_ids.append(-1)
+        self.offsets.append(len(self.coordinates))
+        self.other_labels.append(sly_label)
+
+    def to_labels(self) -> List[sly.Label]:
+        """Builds Supervisely Labels in the order of adding.
+
+        :return: list of Supervisely Labels
+        :rtype: List[sly.Label]
+        """
+        other_labels = iter(self.other_labels)
+        sly_labels = []
+        for idx, class_id in enumerate(self.class_ids):
+            if class_id < 0:
+                sly_labels.append(next(other_labels))
+                continue
+
+            obj_class = self.class_table[class_id]
+            start, end = self.offsets[idx], self.offsets[idx + 1]
+            coordinates = self.coordinates[start:end].tolist()
+            geometry_type = obj_class.geometry_type
+            if geometry_type is sly.Rectangle:
+                geometry = sly.Rectangle(*coordinates)
+            elif geometry_type is sly.Point:
+                geometry = sly.Point(*coordinates)
+            else:
+                geometry = geometry_type(
+                    exterior=list(zip(coordinates[::2], coordinates[1::2]))
+                )
+            sly_labels.append(sly.Label(geometry=geometry, obj_class=obj_class))
+        return sly_labels
+
+    def __len__(self) -> int:
+        return len(self.class_ids)
+
 
 def convert_rectangle(
     cvat_label: Dict[str, str], **kwargs
@@ -24,6 +251,8 @@ def convert_rectangle(
 
     Available kwargs:
         - frame_idx: int, if passed, the label will be converted to VideoFigure
+        - video_objects: VideoObjectRegistry, if passed with frame_idx, VideoFigures of the same
+            CVAT object (track or group) will share one VideoObject from the registry
 
     :param cvat_label: label in CVAT format (from XML parser)
     :type cvat_label: Dict[str, str]
@@ -46,7 +275,7 @@ def convert_rectangle(
 
     frame_idx = kwargs.get("frame_idx")
     if frame_idx is not None:
-        video_object = sly.VideoObject(obj_class)
+        video_object = get_video_object(obj_class, cvat_label, **kwargs)
         sly_label = sly.VideoFigure(video_object, geometry, frame_idx)
     else:
         sly_label = sly.Label(
@@ -64,6 +293,8 @@ def convert_polygon(
 
     Available kwargs:
         - frame_idx: int, if passed, the label will be converted to VideoFigure
+        - video_objects: VideoObjectRegistry, if passed with frame_idx, VideoFigures of the same
+            CVAT object (track or group) will share one VideoObject from the registry
 
     :param cvat_label: label in CVAT format (from XML parser)
     :type cvat_label: Dict[str, str]
@@ -78,11 +309,11 @@ def convert_polygon(
     # </polygon>
 
     exterior = extract_points(cvat_label["points"])
-    geometry = sly.Polygon(exterior=exterior)
+    geometry = sly.Polygon(exterior=exterior.tolist())
 
     frame_idx = kwargs.get("frame_idx")
     if frame_idx is not None:
-        video_object = sly.VideoObject(obj_class)
+        video_object = get_video_object(obj_class, cvat_label, **kwargs)
         sly_label = sly.VideoFigure(video_object, geometry, frame_idx)
     else:
         sly_label = sly.Label(
@@ -100,6 +331,8 @@ def convert_polyline(
 
     Available kwargs:
         - frame_idx: int, if passed, the label will be converted to VideoFigure
+        - video_objects: VideoObjectRegistry, if passed with frame_idx, VideoFigures of the same
+            CVAT object (track or group) will share one VideoObject from the registry
 
     :param cvat_label: label in CVAT format (from XML parser)
     :type cvat_label: Dict[str, str]
@@ -114,15 +347,15 @@ def convert_polyline(
     # </polyline>
 
     exterior = extract_points(cvat_label["points"])
-    geometry = sly.Polyline(exterior=exterior)
+    geometry = sly.Polyline(exterior=exterior.tolist())
 
     frame_idx = kwargs.get("frame_idx")
     if frame_idx is not None:
-        video_object = sly.VideoObject(obj_class)
+        video_object = get_video_object(obj_class, cvat_label, **kwargs)
         sly_label = sly.VideoFigure(video_object, geometry, frame_idx)
     else:
         sly_label = sly.Label(
-            geometry=sly.Polyline(exterior=exterior),
+            geometry=geometry,
             obj_class=obj_class,
         )
 
@@ -138,6 +371,8 @@ def convert_points(
 
     Available kwargs:
         - frame_idx: int, if passed, the label will be converted to VideoFigure
+        - video_objects: VideoObjectRegistry, if passed with frame_idx, VideoFigures of the same
+            CVAT object (track or group) will share one VideoObject from the registry
 
     :param cvat_label: label in CVAT format (from XML parser)
     :type cvat_label: Dict[str, str]
@@ -151,12 +386,12 @@ def convert_points(
     # <points label="ear" occluded="0" points="221.27,536.29;238.60,544.44;257.97,547.50;" z_order="0">
     # </points>
 
-    points = extract_points(cvat_label["points"])
+    points = extract_points(cvat_label["points"]).tolist()
     sly_labels = []
 
     frame_idx = kwargs.get("frame_idx")
     if frame_idx is not None:
-        video_object = sly.VideoObject(obj_class)
+        video_object = get_video_object(obj_class, cvat_label, **kwargs)
         for point in points:
             sly_label = sly.VideoFigure(
                 video_object, sly.Point(row=point[0], col=point[1]), frame_idx
@@ -284,6 +519,8 @@ def convert_mask(
 
     Available kwargs:
         - frame_idx: int, if passed, the label will be converted to VideoFigure
+        - video_objects: VideoObjectRegistry, if passed with frame_idx, VideoFigures of the same
+            CVAT object (track or group) will share one VideoObject from the registry
 
     :param cvat_label: label in CVAT format (from XML parser)
     :type cvat_label: Dict[str, str]
@@ -320,7 +557,7 @@ def convert_mask(
 
     frame_idx = kwargs.get("frame_idx")
     if frame_idx is not None:
-        video_object = sly.VideoObject(obj_class)
+        video_object = get_video_object(obj_class, cvat_label, **kwargs)
         sly_label = sly.VideoFigure(video_object, geometry, frame_idx)
     else:
         sly_label = sly.Label(
@@ -338,6 +575,8 @@ def convert_skeleton(
 
     Available kwargs:
         - frame_idx: int, if passed, the label will be converted to VideoFigure
+        - video_objects: VideoObjectRegistry, if passed with frame_idx, VideoFigures of the same
+            CVAT object (track or group) will share one VideoObject from the registry
 
     :param cvat_label: label in CVAT format (from XML parser)
     :type cvat_label: Dict[str, str]
@@ -364,28 +603,22 @@ def convert_skeleton(
     #   </points>
     # </skeleton>
 
-    MULTIPLIER = 10
+    # * Template and object class are the same for all skeletons with the same label and nodes,
+    # * so they are built once and only positions of the nodes are converted for each instance.
+    obj_class = get_skeleton_class(
+        class_name, tuple(node.get("label") for node in nodes)
+    )
 
-    template = KeypointsTemplate()
     sly_nodes = []
-    for idx, node in enumerate(nodes):
-        label = node.get("label")
-        points = [int(float(point)) for point in node.get("points").split(",")]
-        col, row = points
-        template.add_point(label=label, row=idx * MULTIPLIER, col=idx * MULTIPLIER)
-        sly_nodes.append(sly.Node(label=label, row=row, col=col))
-
-    obj_class = sly.ObjClass(
-        name=class_name,
-        geometry_type=sly.GraphNodes,
-        geometry_config=template,
-    )
+    for node in nodes:
+        col, row = (int(float(point)) for point in node.get("points").split(","))
+        sly_nodes.append(sly.Node(label=node.get("label"), row=row, col=col))
 
     geometry = sly.GraphNodes(sly_nodes)
 
     frame_idx = kwargs.get("frame_idx")
     if frame_idx is not None:
-        video_object = sly.VideoObject(obj_class)
+        video_object = get_video_object(obj_class, cvat_label, **kwargs)
         sly_label = sly.VideoFigure(video_object, geometry, frame_idx)
     else:
         sly_label = sly.Label(geometry=geometry, obj_class=obj_class)
@@ -393,20 +626,67 @@ def convert_skeleton(
     return sly_label
 
 
-def extract_points(points: str) -> List[Tuple[int, int]]:
+@lru_cache(maxsize=None)
+def get_skeleton_class(class_name: str, node_labels: Tuple[str, ...]) -> sly.ObjClass:
+    """Returns object class with KeypointsTemplate for the skeleton with given label and nodes.
+    Classes are cached, so the template is built once for each skeleton label and set of nodes.
+    Nodes in the template are placed on the diagonal in the given order.
+
+    :param class_name: name of the object class
+    :type class_name: str
+    :param node_labels: sorted labels of the skeleton nodes
+    :type node_labels: Tuple[str, ...]
+    :return: object class for the skeleton
+    :rtype: sly.ObjClass
+    """
+    MULTIPLIER = 10
+
+    template = KeypointsTemplate()
+    for idx, label in enumerate(node_labels):
+        template.add_point(label=label, row=idx * MULTIPLIER, col=idx * MULTIPLIER)
+
+    sly.logger.debug(f"Built keypoints template for {class_name}: {node_labels}.")
+
+    return sly.ObjClass(
+        name=class_name,
+        geometry_type=sly.GraphNodes,
+        geometry_config=template,
+    )
+
+
+def get_video_object(
+    obj_class: sly.ObjClass, cvat_label: Dict[str, str], **kwargs
+) -> sly.VideoObject:
+    """Returns shared VideoObject from the registry passed in video_objects kwarg
+    or creates a new VideoObject if the registry is not passed.
+
+    :param obj_class: object class of the label in Supervisely format
+    :type obj_class: sly.ObjClass
+    :param cvat_label: label in CVAT format (from XML parser)
+    :type cvat_label: Dict[str, str]
+    :return: VideoObject for the VideoFigure
+    :rtype: sly.VideoObject
+    """
+    video_objects = kwargs.get("video_objects")
+    if video_objects is None:
+        return sly.VideoObject(obj_class)
+    return video_objects.get_or_create(obj_class, cvat_label)
+
+
+def extract_points(points: str) -> np.ndarray:
     """Extracts points from a string in CVAT format after parsing XML.
+    The whole string is parsed with one NumPy call, coordinates are truncated to integers
+    and swapped from CVAT (x, y) order to Supervisely (row, col) order.
 
     :param points: string with points in CVAT format (e.g. "221.27,536.29;238.60,544.44;257.97,547.50;")
     :type points: str
-    :return: list of points in Supervisely format (e.g. [(536, 221), (544, 238), (547, 257)])
-    :rtype: List[Tuple[int, int]]
+    :return: array of points with shape (N, 2) in Supervisely format (e.g. [[536, 221], [544, 238], [547, 257]])
+    :rtype: np.ndarray
     """
-    point_pairs = points.split(";")
-    coordinates = []
-    for point_pair in point_pairs:
-        y, x = point_pair.split(",")
-        coordinates.append((int(float(x)), int(float(y))))
-    return coordinates
+    coordinates = np.fromstring(points.strip(";").replace(";", ","), sep=",")
+    if coordinates.size % 2 != 0:
+        raise ValueError(f"Can't parse points from CVAT string: {points}")
+    return coordinates.astype(np.int64).reshape(-1, 2)[:, ::-1]
 
 
 def cvat_rle_to_binary_mask(
@@ -482,41 +762,285 @@ CONVERT_MAP = {
     "skeleton": convert_skeleton,
 }
 
+# * Suffixes of the object class names and geometry types, which are used by the convert functions
+# * from CONVERT_MAP. Skeletons get classes with keypoints templates from get_skeleton_class.
+# * Cuboids are not here, because convert_cuboid is not implemented yet and returns no labels.
+CLASS_GEOMETRIES = {
+    "box": ("_rectangle", sly.Rectangle),
+    "polygon": ("_polygon", sly.Polygon),
+    "polyline": ("_polyline", sly.Polyline),
+    "points": ("_point", sly.Point),
+    "mask": ("_mask", sly.Bitmap),
+}
+
 
 def convert_video_annotations(
     images_et: List[ET.Element],
     images_paths: List[str],
 ) -> Tuple[Tuple[int, int], List[sly.VideoFigure], List[sly.VideoTag]]:
     video_frames = []
-    video_objects = []
+    video_objects = VideoObjectRegistry()
     video_tags = []
 
     for image_et, image_path in zip(images_et, images_paths):
         video_size, frame_figures, frame_tags = convert_labels(
-            image_et, image_path, "video"
+            image_et, image_path, "video", video_objects=video_objects
         )
         frame_idx = int(image_et.attrib["id"])
         video_frames.append(sly.Frame(frame_idx, figures=frame_figures))
         video_tags.extend(frame_tags)
 
-        for figure in frame_figures:
-            video_object = figure.video_object
-            if video_object not in video_objects:
-                video_objects.append(video_object)
+    video_tags = merge_video_tags(video_tags)
+
+    return video_size, video_frames, video_objects.objects(), video_tags
+
+
+def convert_video_tracks(
+    annotations_et: ET.Element,
+    images_paths: List[str],
+    keyframes_only: bool = False,
+) -> Tuple[Tuple[int, int], List[sly.Frame], List[sly.VideoObject], List[sly.VideoTag]]:
+    """Converts CVAT annotations in "CVAT for video 1.1" format to Supervisely format.
+    Each <track> element is converted to one VideoObject, all shapes of the track
+    are converted to VideoFigures of this object. Shapes with outside="1" mark frames,
+    where the object is not visible, so they are skipped.
+    CVAT exports interpolated shapes for every frame of the track (with keyframe="0"),
+    if keyframes_only is True, only shapes from keyframes will be converted.
+
+    :param annotations_et: root element of the parsed annotations.xml
+    :type annotations_et: ET.Element
+    :param images_paths: list of paths to the frames of the video, ordered by frame index
+    :type images_paths: List[str]
+    :param keyframes_only: if True, interpolated shapes will be skipped, defaults to False
+    :type keyframes_only: bool, optional
+    :return: size of the video (height, width), list of frames, list of video objects, list of video tags
+    :rtype: Tuple[Tuple[int, int], List[sly.Frame], List[sly.VideoObject], List[sly.VideoTag]]
+    """
+    video_size = get_video_size(annotations_et, images_paths)
+    image_height, image_width = video_size
+
+    frames_figures = defaultdict(list)
+    video_objects = VideoObjectRegistry()
+
+    # XML Example:
+    # <track id="0" label="car" source="manual">
+    #   <box frame="0" keyframe="1" outside="0" occluded="0" xtl="1.0" ytl="2.0" xbr="3.0" ybr="4.0" z_order="0">
+    #   </box>
+    #   <box frame="1" keyframe="0" outside="1" occluded="0" xtl="1.0" ytl="2.0" xbr="3.0" ybr="4.0" z_order="0">
+    #   </box>
+    # </track>
+
+    for track_et in annotations_et.findall("track"):
+        track_label = track_et.attrib["label"]
+        track_id = track_et.attrib["id"]
+
+        for shape_et in track_et:
+            geometry = shape_et.tag
+            if geometry not in CONVERT_MAP:
+                continue
+            if shape_et.attrib.get("outside") == "1":
+                continue
+            if keyframes_only and shape_et.attrib.get("keyframe") != "1":
+                continue
+
+            frame_idx = int(shape_et.attrib["frame"])
+            # * All shapes of the track will share one VideoObject by the track ID.
+            cvat_label = {**shape_et.attrib, "label": track_label, "track_id": track_id}
+            sly_figures = CONVERT_MAP[geometry](
+                cvat_label,
+                image_height=image_height,
+                image_width=image_width,
+                nodes=shape_et.findall("points") or [],
+                frame_idx=frame_idx,
+                video_objects=video_objects,
+            )
+
+            if not isinstance(sly_figures, list):
+                sly_figures = [sly_figures]
+            frames_figures[frame_idx].extend(
+                figure for figure in sly_figures if figure is not None
+            )
+
+    sly.logger.debug(
+        f"Converted {len(video_objects)} tracks on {len(frames_figures)} frames."
+    )
+
+    video_tags = []
+    for cvat_tag in annotations_et.findall("tag"):
+        frame_idx = int(cvat_tag.attrib["frame"])
+        video_tags.append(convert_tag(cvat_tag.attrib, frame_idx=frame_idx))
+    video_tags = merge_video_tags(video_tags)
+
+    frames_count = max(len(images_paths), max(frames_figures, default=-1) + 1)
+    video_frames = [
+        sly.Frame(frame_idx, figures=frames_figures.get(frame_idx, []))
+        for frame_idx in range(frames_count)
+    ]
+
+    return video_size, video_frames, video_objects.objects(), video_tags
+
+
+def merge_video_tags(video_tags: List[sly.VideoTag]) -> List[sly.VideoTag]:
+    """Merges VideoTags with the same name and value on consecutive or overlapping frames
+    into one VideoTag with the frame range, which covers all of them.
+    CVAT stores tags for each frame separately, so without merging a tag on 10000 frames
+    becomes 10000 VideoTags. Tags without frame range are returned as is.
 
-    return video_size, video_frames, video_objects, video_tags
+    :param video_tags: list of VideoTags (e.g. with one frame in each frame range)
+    :type video_tags: List[sly.VideoTag]
+    :return: list of merged VideoTags
+    :rtype: List[sly.VideoTag]
+    """
+    merged_tags = []
+
+    # Dictionary with (tag name, tag value) as keys and lists of frame ranges as values.
+    tags_ranges = defaultdict(list)
+    tags_metas = {}
+    for video_tag in video_tags:
+        if video_tag.frame_range is None:
+            merged_tags.append(video_tag)
+            continue
+        key = (video_tag.meta.name, video_tag.value)
+        tags_metas[key] = video_tag.meta
+        tags_ranges[key].append(tuple(video_tag.frame_range))
+
+    for key, frame_ranges in tags_ranges.items():
+        frame_ranges.sort()
+        start, end = frame_ranges[0]
+        for next_start, next_end in frame_ranges[1:]:
+            if next_start <= end + 1:
+                end = max(end, next_end)
+                continue
+            merged_tags.append(
+                sly.VideoTag(tags_metas[key], value=key[1], frame_range=(start, end))
+            )
+            start, end = next_start, next_end
+        merged_tags.append(
+            sly.VideoTag(tags_metas[key], value=key[1], frame_range=(start, end))
+        )
+
+    sly.logger.debug(f"Merged {len(video_tags)} video tags into {len(merged_tags)}.")
+
+    return merged_tags
+
+
+def get_video_size(
+    annotations_et: ET.Element, images_paths: List[str]
+) -> Tuple[int, int]:
+    """Returns size of the video from the "original_size" element of annotations.xml
+    or reads it from the first frame, if the element is not found.
+
+    :param annotations_et: root element of the parsed annotations.xml
+    :type annotations_et: ET.Element
+    :param images_paths: list of paths to the frames of the video without extensions
+    :type images_paths: List[str]
+    :return: size of the video (height, width)
+    :rtype: Tuple[int, int]
+    """
+    original_size = annotations_et.find("meta/task/original_size")
+    if original_size is not None:
+        return (
+            int(original_size.find("height").text),
+            int(original_size.find("width").text),
+        )
+
+    return image_size_from_file(f"{images_paths[0]}.PNG")
+
+
+def get_frames_paths(images_dir: str) -> List[str]:
+    """Returns paths to the frames of the video task ordered by frame index.
+    CVAT saves frames as "frame_000000.PNG", the extension is removed from the paths,
+    because images_to_mp4() adds it.
+
+    :param images_dir: path to the directory with frames
+    :type images_dir: str
+    :return: list of paths to the frames without extensions
+    :rtype: List[str]
+    """
+    return sorted(
+        os.path.splitext(image_path)[0] for image_path in sly.fs.list_files(images_dir)
+    )
+
+
+def iter_images_et(
+    annotations_xml_path: str,
+    start: int = 0,
+    stop: Optional[int] = None,
+    index: Optional[Any] = None,
+) -> Iterator[ET.Element]:
+    """Incrementally parses annotations.xml and yields <image> elements one by one.
+    Previous elements are removed from the tree, so the whole file is never kept in memory.
+    Only images from start to stop (not included) are yielded. If the byte-offset index
+    of the file is provided (see xml_index.load_index), the reader seeks directly to the first
+    image of the range, otherwise the file is parsed from the beginning.
+
+    :param annotations_xml_path: path to the annotations.xml file
+    :type annotations_xml_path: str
+    :param start: index of the first image, defaults to 0
+    :type start: int, optional
+    :param stop: index of the image after the last one, defaults to None (till the end)
+    :type stop: Optional[int], optional
+    :param index: XmlIndex of the file, defaults to None
+    :type index: Optional[XmlIndex], optional
+    :return: iterator over the image elements
+    :rtype: Iterator[ET.Element]
+    """
+    if index is not None:
+        yield from index.iter_elements("image", start, stop)
+        return
+
+    if start or stop is not None:
+        yield from islice(iter_images_et(annotations_xml_path), start, stop)
+        return
+
+    context = ET.iterparse(annotations_xml_path, events=("start", "end"))
+    _, root = next(context)
+    for event, element in context:
+        if event == "end" and element.tag == "image":
+            yield element
+            # * The element is still available for the caller, but is detached from the tree.
+            root.clear()
+
+
+def get_task_source(annotations_xml_path: str) -> Optional[str]:
+    """Reads the "source" parameter (meta -> task -> source) of the CVAT task from annotations.xml.
+    Only the <meta> element is parsed, so the function is fast even for huge annotation files.
+
+    :param annotations_xml_path: path to the annotations.xml file
+    :type annotations_xml_path: str
+    :return: value of the "source" parameter or None if it's not found
+    :rtype: Optional[str]
+    """
+    for _, element in ET.iterparse(annotations_xml_path, events=("end",)):
+        if element.tag == "source":
+            return element.text
+        if element.tag == "meta":
+            return None
+    return None
 
 
 def convert_images_annotations(
     images_et: List[ET.Element],
     images_paths: List[str],
 ) -> Tuple[Dict[str, List[sly.Tag]], List[ImageObject]]:
+    """Converts labels and tags of the images from CVAT format.
+    Labels in the returned ImageObjects are CompactLabels with one class table for the task,
+    Supervisely Labels are built from them in prepare_images_for_upload.
+
+    :param images_et: list of image elements parsed from CVAT XML annotation
+    :type images_et: List[ET.Element]
+    :param images_paths: list of paths to the images on the local machine
+    :type images_paths: List[str]
+    :return: dictionary with tags for each image by image name, list of ImageObjects
+    :rtype: Tuple[Dict[str, List[sly.Tag]], List[ImageObject]]
+    """
     task_tags = dict()
     image_objects = []
+    class_table = ObjClassTable()
     for image_et, image_path in zip(images_et, images_paths):
         image_name = image_et.attrib["name"]
-        image_size, image_labels, image_tags = convert_labels(
-            image_et, image_name, "imageset"
+        image_size, image_labels, image_tags = convert_labels_compact(
+            image_et, image_name, class_table
         )
         task_tags[image_name] = image_tags
         image_objects.append(
@@ -532,12 +1056,322 @@ def convert_images_annotations(
     return task_tags, image_objects
 
 
+def convert_labels_compact(
+    image_et: ET.Element, image_name: str, class_table: ObjClassTable
+) -> Tuple[Tuple[int, int], CompactLabels, List[sly.Tag]]:
+    """Converts CVAT labels of the image to CompactLabels.
+    Geometries from COMPACT_GEOMETRIES are stored as coordinates, other geometries
+    are converted with CONVERT_MAP and stored as Label objects.
+
+    :param image_et: image data parsed from CVAT XML annotation
+    :type image_et: ET.Element
+    :param image_name: name of the image
+    :type image_name: str
+    :param class_table: table with object classes of the task, will be updated with new classes
+    :type class_table: ObjClassTable
+    :return: size of the image (height, width), labels of the image, list of tags
+    :rtype: Tuple[Tuple[int, int], CompactLabels, List[sly.Tag]]
+    """
+    image_height = int(image_et.attrib["height"])
+    image_width = int(image_et.attrib["width"])
+    image_size = (image_height, image_width)
+
+    sly_tags = [convert_tag(cvat_tag.attrib) for cvat_tag in image_et.findall("tag")]
+
+    labels = CompactLabels(class_table)
+    for geometry in CONVERT_MAP:
+        cvat_labels = image_et.findall(geometry)
+        if cvat_labels:
+            sly.logger.debug(
+                f"Found {len(cvat_labels)} with {geometry} geometry in {image_name}."
+            )
+
+        compact_geometry = COMPACT_GEOMETRIES.get(geometry)
+        for cvat_label in cvat_labels:
+            if compact_geometry is None:
+                sly_labels = CONVERT_MAP[geometry](
+                    cvat_label.attrib,
+                    image_height=image_height,
+                    image_width=image_width,
+                    nodes=cvat_label.findall("points") or [],
+                )
+                if not isinstance(sly_labels, list):
+                    sly_labels = [sly_labels]
+                for sly_label in sly_labels:
+                    if sly_label is not None:
+                        labels.add_label(sly_label)
+                continue
+
+            suffix, geometry_type, get_coordinates = compact_geometry
+            class_id = class_table.intern(
+                cvat_label.attrib["label"] + suffix, geometry_type
+            )
+            for coordinates in get_coordinates(cvat_label.attrib):
+                labels.add(class_id, coordinates)
+
+    return image_size, labels, sly_tags
+
+
+def _rectangle_coordinates(cvat_label: Dict[str, str]) -> List[List[int]]:
+    """Returns coordinates of the CVAT box as [[top, left, bottom, right]]."""
+    return [
+        [
+            int(float(cvat_label["ytl"])),
+            int(float(cvat_label["xtl"])),
+            int(float(cvat_label["ybr"])),
+            int(float(cvat_label["xbr"])),
+        ]
+    ]
+
+
+def _polygon_coordinates(cvat_label: Dict[str, str]) -> List[np.ndarray]:
+    """Returns coordinates of the CVAT polygon or polyline as one (N, 2) array of (row, col) points."""
+    return [extract_points(cvat_label["points"])]
+
+
+def _points_coordinates(cvat_label: Dict[str, str]) -> np.ndarray:
+    """Returns coordinates of the CVAT points as (N, 2) array, each point is a separate label."""
+    return extract_points(cvat_label["points"])
+
+
+# * Geometries, which are stored by convert_labels_compact as coordinates:
+# * CVAT geometry: (suffix of the class name, geometry type, function to get coordinates of the labels).
+COMPACT_GEOMETRIES = {
+    "box": ("_rectangle", sly.Rectangle, _rectangle_coordinates),
+    "polygon": ("_polygon", sly.Polygon, _polygon_coordinates),
+    "polyline": ("_polyline", sly.Polyline, _polygon_coordinates),
+    "points": ("_point", sly.Point, _points_coordinates),
+}
+
+
+def convert_images_annotations_json(
+    images_et: List[ET.Element],
+    images_paths: List[str],
+) -> Tuple[Dict[str, List[sly.Tag]], List[ImageObject], List[sly.ObjClass]]:
+    """Fast alternative of convert_images_annotations, which converts labels of the images
+    directly to Supervisely JSON format without building Label and Annotation objects.
+    Labels in the returned ImageObjects are dictionaries, which are equal to Label.to_json()
+    of the labels from convert_images_annotations, object classes of the labels are returned separately.
+
+    :param images_et: list of image elements parsed from CVAT XML annotation
+    :type images_et: List[ET.Element]
+    :param images_paths: list of paths to the images on the local machine
+    :type images_paths: List[str]
+    :return: dictionary with tags for each image by image name, list of ImageObjects
+        with labels in JSON format, list of object classes of the labels
+    :rtype: Tuple[Dict[str, List[sly.Tag]], List[ImageObject], List[sly.ObjClass]]
+    """
+    task_tags = dict()
+    image_objects = []
+    obj_classes = dict()
+    for image_et, image_path in zip(images_et, images_paths):
+        image_name = image_et.attrib["name"]
+        image_size, image_labels, image_tags = convert_labels_json(
+            image_et, image_name, obj_classes
+        )
+        task_tags[image_name] = image_tags
+        image_objects.append(
+            ImageObject(
+                name=image_name,
+                path=image_path,
+                size=image_size or image_size_from_file(image_path),
+                labels=image_labels,
+                tags=image_tags,
+            )
+        )
+
+    return task_tags, image_objects, list(obj_classes.values())
+
+
+def convert_labels_json(
+    image_et: ET.Element, image_name: str, obj_classes: Dict[str, sly.ObjClass]
+) -> Tuple[Tuple[int, int], List[Dict], List[sly.Tag]]:
+    """Converts CVAT labels of the image directly to Supervisely JSON format.
+    Geometries from JSON_GEOMETRIES are converted from CVAT attributes without building
+    geometry objects, other geometries are converted with CONVERT_MAP and serialized.
+    Object classes of the labels are added to the given dictionary by names.
+
+    :param image_et: image data parsed from CVAT XML annotation
+    :type image_et: ET.Element
+    :param image_name: name of the image
+    :type image_name: str
+    :param obj_classes: dictionary with object classes by names, will be updated with new classes
+    :type obj_classes: Dict[str, sly.ObjClass]
+    :return: size of the image (height, width), list of labels in JSON format, list of tags
+    :rtype: Tuple[Tuple[int, int], List[Dict], List[sly.Tag]]
+    """
+    image_height = int(image_et.attrib["height"])
+    image_width = int(image_et.attrib["width"])
+    image_size = (image_height, image_width)
+
+    sly_tags = [convert_tag(cvat_tag.attrib) for cvat_tag in image_et.findall("tag")]
+
+    labels_json = []
+    for geometry in CONVERT_MAP:
+        cvat_labels = image_et.findall(geometry)
+        if cvat_labels:
+            sly.logger.debug(
+                f"Found {len(cvat_labels)} with {geometry} geometry in {image_name}."
+            )
+
+        json_geometry = JSON_GEOMETRIES.get(geometry)
+        for cvat_label in cvat_labels:
+            if json_geometry is None:
+                # * Masks and skeletons need geometry objects for encoding and templates.
+                sly_labels = CONVERT_MAP[geometry](
+                    cvat_label.attrib,
+                    image_height=image_height,
+                    image_width=image_width,
+                    nodes=cvat_label.findall("points") or [],
+                )
+                if not isinstance(sly_labels, list):
+                    sly_labels = [sly_labels]
+                for sly_label in sly_labels:
+                    if sly_label is None:
+                        continue
+                    obj_classes.setdefault(
+                        sly_label.obj_class.name, sly_label.obj_class
+                    )
+                    labels_json.append(sly_label.to_json())
+                continue
+
+            suffix, geometry_type, get_exteriors = json_geometry
+            class_name = cvat_label.attrib["label"] + suffix
+            if class_name not in obj_classes:
+                obj_classes[class_name] = sly.ObjClass(class_name, geometry_type)
+
+            shape = geometry_type.geometry_name()
+            for exterior in get_exteriors(cvat_label.attrib):
+                labels_json.append(
+                    {
+                        "classTitle": class_name,
+                        "description": "",
+                        "tags": [],
+                        "points": {"exterior": exterior, "interior": []},
+                        "geometryType": shape,
+                        "shape": shape,
+                    }
+                )
+
+    return image_size, labels_json, sly_tags
+
+
+def _rectangle_exteriors(cvat_label: Dict[str, str]) -> List[List[List[int]]]:
+    """Returns exterior of the CVAT box in Supervisely JSON format: [[left, top], [right, bottom]]."""
+    return [
+        [
+            [int(float(cvat_label["xtl"])), int(float(cvat_label["ytl"]))],
+            [int(float(cvat_label["xbr"])), int(float(cvat_label["ybr"]))],
+        ]
+    ]
+
+
+def _polygon_exteriors(cvat_label: Dict[str, str]) -> List[List[List[int]]]:
+    """Returns exterior of the CVAT polygon or polyline in Supervisely JSON format: [[col, row], ...]."""
+    return [extract_points(cvat_label["points"])[:, ::-1].tolist()]
+
+
+def _points_exteriors(cvat_label: Dict[str, str]) -> List[List[List[int]]]:
+    """Returns exteriors of the CVAT points in Supervisely JSON format, one for each point."""
+    return [[point] for point in extract_points(cvat_label["points"])[:, ::-1].tolist()]
+
+
+# * Geometries, which are converted by convert_labels_json directly to JSON:
+# * CVAT geometry: (suffix of the class name, geometry type, function to get exteriors of the labels).
+JSON_GEOMETRIES = {
+    "box": ("_rectangle", sly.Rectangle, _rectangle_exteriors),
+    "polygon": ("_polygon", sly.Polygon, _polygon_exteriors),
+    "polyline": ("_polyline", sly.Polyline, _polygon_exteriors),
+    "points": ("_point", sly.Point, _points_exteriors),
+}
+
+
+def prepare_images_json_for_upload(
+    api: sly.Api,
+    images_objects: List[ImageObject],
+    obj_classes: List[sly.ObjClass],
+    images_project: sly.ProjectInfo,
+    images_project_meta: sly.ProjectMeta,
+    metrics: Optional[Any] = None,
+) -> Tuple[List[str], List[str], List[Dict], sly.ProjectMeta]:
+    """Fast alternative of prepare_images_for_upload for ImageObjects from convert_images_annotations_json.
+    Adds all new object classes and tags to the project meta with one request, resolves IDs
+    of the classes from the project meta on Supervisely and builds annotations in JSON format
+    for the bulk annotation upload.
+
+    :param api: Supervisely API object
+    :type api: sly.Api
+    :param images_objects: list of ImageObjects with labels in JSON format
+    :type images_objects: List[ImageObject]
+    :param obj_classes: list of object classes of the labels
+    :type obj_classes: List[sly.ObjClass]
+    :param images_project: ProjectInfo object for the project in Supervisely where images will be uploaded
+    :type images_project: sly.ProjectInfo
+    :param images_project_meta: actual project meta from Supervisely, if it contains all classes
+        and tags of the batch, IDs of the classes are taken from it without requests
+    :type images_project_meta: sly.ProjectMeta
+    :param metrics: RunMetrics object to time the stages with, defaults to None
+    :type metrics: Optional[RunMetrics], optional
+    :return: list of images names, list of images paths, list of annotations in JSON format,
+        project meta with classes and tags of the batch
+    :rtype: Tuple[List[str], List[str], List[Dict], sly.ProjectMeta]
+    """
+    with _stage(metrics, "meta"):
+        tag_metas = [
+            tag.meta for image_object in images_objects for tag in image_object.tags
+        ]
+        is_meta_complete = all(
+            getattr(images_project_meta.get_obj_class(obj_class.name), "sly_id", None)
+            is not None
+            for obj_class in obj_classes
+        ) and all(
+            images_project_meta.get_tag_meta(tag_meta.name) is not None
+            for tag_meta in tag_metas
+        )
+        if not is_meta_complete:
+            # * All new classes and tags of the batch are added with one update,
+            # * the actual meta from Supervisely contains IDs of the classes.
+            images_project_meta = merge_project_meta(
+                api, images_project.id, obj_classes, tag_metas
+            )
+        class_ids = {
+            obj_class.name: obj_class.sly_id
+            for obj_class in images_project_meta.obj_classes
+        }
+
+    images_names = []
+    images_paths = []
+    images_anns = []
+
+    with _stage(metrics, "prepare"):
+        for image_object in images_objects:
+            images_names.append(image_object.name)
+            images_paths.append(image_object.path)
+
+            for label_json in image_object.labels:
+                label_json["classId"] = class_ids[label_json["classTitle"]]
+
+            image_height, image_width = image_object.size
+            images_anns.append(
+                {
+                    "description": "",
+                    "size": {"height": image_height, "width": image_width},
+                    "tags": [],
+                    "objects": image_object.labels,
+                    "customBigData": {},
+                }
+            )
+
+    return images_names, images_paths, images_anns, images_project_meta
+
+
 def prepare_images_for_upload(
     api: sly.Api,
     images_objects: List[ImageObject],
     images_project: sly.ProjectInfo,
     images_project_meta: sly.ProjectMeta,
-) -> Tuple[List[str], List[str], List[sly.Annotation]]:
+    metrics: Optional[Any] = None,
+) -> Tuple[List[str], List[str], List[sly.Annotation], sly.ProjectMeta]:
     """Generates lists of images names, paths and annotations from the list of ImageObjects
     for convenient uploading to Supervisely later using upload_paths() function.
     Updates project meta with tags from ImageObjects.
@@ -546,7 +1380,7 @@ def prepare_images_for_upload(
         - name of the image
         - path to the image on the local machine
         - size of the image (height, width) in pixels
-        - list of labels in Supervisely format
+        - list of labels in Supervisely format or CompactLabels
         - list of tags in Supervisely format
 
     :param api: Supervisely API object
@@ -556,8 +1390,11 @@ def prepare_images_for_upload(
     :type images_project: sly.ProjectInfo
     :param images_project_meta: project meta which will be updated with tags from ImageObjects
     :type images_project_meta: sly.ProjectMeta
-    :return: list of images names, list of images paths, list of annotations
-    :rtype: Tuple[List[str], List[str], List[sly.Annotation]]
+    :param metrics: RunMetrics object to time the stages with, defaults to None
+    :type metrics: Optional[RunMetrics], optional
+    :return: list of images names, list of images paths, list of annotations,
+        project meta with classes and tags of the images
+    :rtype: Tuple[List[str], List[str], List[sly.Annotation], sly.ProjectMeta]
     """
     images_names = []
     images_paths = []
@@ -571,22 +1408,28 @@ def prepare_images_for_upload(
             f"Image {image_object.name} has size (height, width): {image_object.size}."
         )
 
-        ann = create_image_annotation(
-            image_object.labels,
-            image_object.size,
-            image_object.name,
-        )
+        with _stage(metrics, "prepare"):
+            labels = image_object.labels
+            if isinstance(labels, CompactLabels):
+                # * Labels from convert_images_annotations are built right before the upload.
+                labels = labels.to_labels()
+            ann = create_image_annotation(
+                labels,
+                image_object.size,
+                image_object.name,
+            )
         images_anns.append(ann)
 
-        images_project_meta = update_project_meta(
-            api,
-            images_project_meta,
-            images_project.id,
-            tags=image_object.tags,
-            labels=image_object.labels,
-        )
+        with _stage(metrics, "meta"):
+            images_project_meta = update_project_meta(
+                api,
+                images_project_meta,
+                images_project.id,
+                tags=image_object.tags,
+                labels=labels,
+            )
 
-    return images_names, images_paths, images_anns
+    return images_names, images_paths, images_anns, images_project_meta
 
 
 def images_to_mp4(
@@ -634,8 +1477,201 @@ def images_to_mp4(
     sly.logger.debug(f"Finished saving video, result size: {file_size} MB.")
 
 
+class VideoEncoder:
+    """Encodes videos of several tasks at once on a process pool, while the main thread
+    keeps converting and uploading the other tasks. Each submitted video is returned by
+    the `finished` method as soon as its file is ready, so the upload can start
+    without waiting for the rest. Directory with the frames is removed right after encoding.
+    Number of videos, which are submitted but not returned yet, is limited by max_pending
+    to keep memory (annotations of the waiting tasks) and disk usage bounded.
+    The pool of processes is started on the first submitted video, so the encoder
+    costs nothing for the projects without videos.
+
+    :param max_workers: number of processes, defaults to the number of CPUs
+    :type max_workers: Optional[int], optional
+    :param max_pending: maximum number of videos in progress, defaults to 2 * max_workers
+    :type max_pending: Optional[int], optional
+    :param metrics: RunMetrics object to time the encoding with, defaults to None
+    :type metrics: Optional[RunMetrics], optional
+    :param cancel_token: cancellation token, on cancellation the waiting videos are dropped
+        and the encoding processes are terminated, defaults to None
+    :type cancel_token: Optional[CancellationToken], optional
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        metrics: Optional[Any] = None,
+        cancel_token: Optional[Any] = None,
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 2
+        self.metrics = metrics
+        self.cancel_token = cancel_token
+
+        self._executor = None
+        self._context = None
+        self._pending: Dict[Future, Tuple[str, Any]] = {}
+        self._unregister_cancel = None
+        if cancel_token is not None:
+            self._unregister_cancel = cancel_token.on_cancel(self.terminate)
+
+        sly.logger.debug(
+            f"Started video encoder with {self.max_workers} processes, "
+            f"max pending videos: {self.max_pending}."
+        )
+
+    def submit(
+        self,
+        task: str,
+        video_path: str,
+        image_paths: List[str],
+        video_size: Tuple[int, int],
+        frames_dir: Optional[str] = None,
+        context: Any = None,
+    ) -> None:
+        """Schedules encoding of the video from the images.
+
+        :param task: name of the task, used for logging and metrics
+        :type task: str
+        :param video_path: path, where video will be saved on the local machine
+        :type video_path: str
+        :param image_paths: list of paths to the images on the local machine
+        :type image_paths: List[str]
+        :param video_size: size of the video (height, width) in pixels
+        :type video_size: Tuple[int, int]
+        :param frames_dir: directory with the frames, which will be removed after encoding, defaults to None
+        :type frames_dir: Optional[str], optional
+        :param context: any data, which will be returned with the finished video, defaults to None
+        :type context: Any, optional
+        """
+        _raise_if_cancelled(self.cancel_token)
+        if self._executor is None:
+            self._start_executor()
+        future = self._executor.submit(
+            _encode_video, video_path, image_paths, video_size, frames_dir
+        )
+        self._pending[future] = (task, context)
+        sly.logger.debug(f"Scheduled encoding of the video {video_path}.")
+
+    def finished(self, wait_all: bool = False) -> Iterator[Tuple[Any, Optional[str]]]:
+        """Yields contexts of the encoded videos with errors (None if the video was encoded).
+        By default yields only videos, which are already finished, and waits for at least one
+        video if there are max_pending videos in progress. With wait_all=True waits for all videos
+        and yields them in the order of completion.
+
+        :param wait_all: wait for all submitted videos, defaults to False
+        :type wait_all: bool, optional
+        :return: iterator over the tuples (context, error message or None)
+        :rtype: Iterator[Tuple[Any, Optional[str]]]
+        """
+        _raise_if_cancelled(self.cancel_token)
+        if wait_all:
+            futures = as_completed(list(self._pending))
+        elif len(self._pending) >= self.max_pending:
+            futures, _ = wait(list(self._pending), return_when=FIRST_COMPLETED)
+        else:
+            futures = [future for future in self._pending if future.done()]
+
+        for future in futures:
+            # * Videos, which were dropped by the cancellation, are not returned.
+            _raise_if_cancelled(self.cancel_token)
+            task, context = self._pending.pop(future)
+            try:
+                duration = future.result()
+            except Exception as e:
+                sly.logger.warning(f"Failed to encode video for task {task}: {e}")
+                yield context, str(e)
+                continue
+
+            if self.metrics is not None:
+                self.metrics.add_stage("encode", duration, task)
+            yield context, None
+
+    def shutdown(self) -> None:
+        """Waits for the running processes and shuts down the pool."""
+        if self._unregister_cancel is not None:
+            self._unregister_cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def terminate(self) -> None:
+        """Drops the videos, which are not started yet, and terminates the encoding processes.
+        Files of the videos, which were being encoded, are left incomplete.
+        Futures of the running videos fail with BrokenProcessPool, so the waiting in `finished` is stopped.
+        """
+        sly.logger.info(
+            f"Terminating video encoder with {len(self._pending)} videos in progress."
+        )
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for process in self._context.processes:
+            if process.is_alive():
+                process.terminate()
+
+    def _start_executor(self) -> None:
+        """Starts the pool of processes. Processes are spawned and not forked, because the encoder
+        is used while other threads (metrics logger, lease heartbeat, UI timers) are running, and
+        the forked child could inherit locks (e.g. of the logger) held by them and deadlock.
+        Processes of the pool are kept by the context, so they can be terminated without private
+        attributes of the pool. If a process dies (e.g. killed by OOM), the pool is broken
+        and all videos in progress fail with BrokenProcessPool instead of waiting forever.
+        """
+        self._context = _TrackingSpawnContext()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=self._context
+        )
+
+    def __enter__(self) -> "VideoEncoder":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+
+
+class _TrackingSpawnContext(multiprocessing.context.SpawnContext):
+    """Spawn context of the VideoEncoder pool, which keeps all processes created by the pool."""
+
+    def __init__(self):
+        super().__init__()
+        self.processes: List[multiprocessing.process.BaseProcess] = []
+
+    def Process(self, *args, **kwargs) -> multiprocessing.process.BaseProcess:
+        process = multiprocessing.context.SpawnProcess(*args, **kwargs)
+        self.processes.append(process)
+        return process
+
+
+def _encode_video(
+    video_path: str,
+    image_paths: List[str],
+    video_size: Tuple[int, int],
+    frames_dir: Optional[str] = None,
+) -> float:
+    """Saves the images to the video file and removes the directory with frames.
+    Runs in the worker process of VideoEncoder, returns the duration of encoding in seconds.
+
+    :return: duration of encoding in seconds
+    :rtype: float
+    """
+    start = perf_counter()
+    images_to_mp4(video_path, image_paths, video_size)
+    duration = perf_counter() - start
+
+    if frames_dir is not None:
+        sly.fs.remove_dir(frames_dir)
+        sly.logger.debug(f"Removed frames directory {frames_dir}.")
+
+    return duration
+
+
 def convert_labels(
-    image_et: ET.Element, image_name: str, data_type: Literal["imageset", "video"]
+    image_et: ET.Element,
+    image_name: str,
+    data_type: Literal["imageset", "video"],
+    video_objects: Optional[VideoObjectRegistry] = None,
 ) -> Union[
     Tuple[Tuple[int, int], List[sly.Label], List[sly.Tag]],
     Tuple[Tuple[int, int], List[sly.VideoFigure], List[sly.VideoTag]],
@@ -652,6 +1688,9 @@ def convert_labels(
     :type image_name: str
     :param data_type: type of the task, possible values: "imageset", "video"
     :type data_type: Literal["imageset", "video"]
+    :param video_objects: registry of VideoObjects of the video, used only for "video" data type,
+        if not passed, each VideoFigure will have its own VideoObject, defaults to None
+    :type video_objects: Optional[VideoObjectRegistry], optional
     :return: size of the image or video (height, width), list of labels or video figures, list of tags or video tags
     :rtype: Union[
         Tuple[Tuple[int, int], List[sly.Label], List[sly.Tag]],
@@ -704,6 +1743,7 @@ def convert_labels(
                 image_width=image_width,
                 nodes=nodes,
                 frame_idx=frame_idx,
+                video_objects=video_objects,
             )
 
             if isinstance(sly_label, list):
@@ -745,50 +1785,215 @@ def update_project_meta(
 
     sly.logger.debug("Update project meta initiated.")
 
+    missing_obj_classes = []
+    missing_tag_metas = []
+
     if labels:
         sly.logger.debug(f"Will update {len(labels)} labels.")
-        for label in labels:
-            label: Union[sly.Label, sly.VideoObject]
-            if label is not None:
-                if label.obj_class not in project_meta.obj_classes:
-                    sly.logger.debug(
-                        f"Object class {label.obj_class.name} not found in project meta, will add it."
-                    )
-                    project_meta = project_meta.add_obj_class(label.obj_class)
-                    api.project.update_meta(project_id, project_meta)
-                    sly.logger.debug(
-                        f"Object class {label.obj_class.name} added, meta updated on Supervisely."
-                    )
+        # * Labels can share object classes (e.g. cached skeleton classes),
+        # * each shared class is compared with the project meta only once.
+        obj_classes = {
+            id(label.obj_class): label.obj_class
+            for label in labels
+            if label is not None
+        }
+        for obj_class in obj_classes.values():
+            if project_meta.get_obj_class(obj_class.name) is None:
+                sly.logger.debug(
+                    f"Object class {obj_class.name} not found in project meta, will add it."
+                )
+                missing_obj_classes.append(obj_class)
 
     if tags:
         sly.logger.debug(f"Will update {len(tags)} tags.")
         for tag in tags:
             tag: sly.Tag
-            if tag.meta not in project_meta.tag_metas:
+            if project_meta.get_tag_meta(tag.meta.name) is None:
                 sly.logger.debug(
                     f"Tag meta {tag.meta.name} not found in project meta, will add it."
                 )
-                project_meta = project_meta.add_tag_meta(tag.meta)
-                api.project.update_meta(project_id, project_meta)
-                sly.logger.debug(
-                    f"Tag meta {tag.meta.name} added, meta updated on Supervisely."
-                )
+                missing_tag_metas.append(tag.meta)
+
+    if missing_obj_classes or missing_tag_metas:
+        project_meta = merge_project_meta(
+            api, project_id, missing_obj_classes, missing_tag_metas
+        )
+        sly.logger.debug(
+            f"Added {len(missing_obj_classes)} object classes and {len(missing_tag_metas)} tag metas, "
+            "meta updated on Supervisely."
+        )
 
     sly.logger.debug("Update project meta finished.")
 
     return project_meta
 
 
-def upload_images_task(
+def merge_project_meta(
+    api: sly.Api,
+    project_id: int,
+    obj_classes: Iterable[sly.ObjClass] = (),
+    tag_metas: Iterable[sly.TagMeta] = (),
+) -> sly.ProjectMeta:
+    """Adds object classes and tag metas, which are missing by name, to the project meta
+    on Supervisely and returns the actual meta of the project.
+    The meta is read right before the update, so classes and tags, which are already
+    in the project, keep their IDs. Supervisely replaces the whole meta on update and has no
+    conditional update, so the function must not be called for the same project by several
+    workers at once: in the sharded mode the meta is written once by shard 0 before the upload,
+    see sharding.share_project_meta.
+
+    :param api: Supervisely API object
+    :type api: sly.Api
+    :param project_id: project ID in Supervisely
+    :type project_id: int
+    :param obj_classes: object classes, which must be in the project meta, defaults to ()
+    :type obj_classes: Iterable[sly.ObjClass], optional
+    :param tag_metas: tag metas, which must be in the project meta, defaults to ()
+    :type tag_metas: Iterable[sly.TagMeta], optional
+    :return: project meta from Supervisely
+    :rtype: sly.ProjectMeta
+    """
+    project_meta = sly.ProjectMeta.from_json(api.project.get_meta(project_id))
+    missing_obj_classes, missing_tag_metas = missing_meta(
+        project_meta, obj_classes, tag_metas
+    )
+    if not missing_obj_classes and not missing_tag_metas:
+        return project_meta
+
+    project_meta = project_meta.add_obj_classes(missing_obj_classes)
+    project_meta = project_meta.add_tag_metas(missing_tag_metas)
+    api.project.update_meta(project_id, project_meta)
+    return sly.ProjectMeta.from_json(api.project.get_meta(project_id))
+
+
+def missing_meta(
+    project_meta: sly.ProjectMeta,
+    obj_classes: Iterable[sly.ObjClass] = (),
+    tag_metas: Iterable[sly.TagMeta] = (),
+) -> Tuple[List[sly.ObjClass], List[sly.TagMeta]]:
+    """Returns object classes and tag metas, which are missing in the project meta by name.
+    Duplicates by name are returned once.
+
+    :param project_meta: project meta to check
+    :type project_meta: sly.ProjectMeta
+    :param obj_classes: object classes to check, defaults to ()
+    :type obj_classes: Iterable[sly.ObjClass], optional
+    :param tag_metas: tag metas to check, defaults to ()
+    :type tag_metas: Iterable[sly.TagMeta], optional
+    :return: missing object classes, missing tag metas
+    :rtype: Tuple[List[sly.ObjClass], List[sly.TagMeta]]
+    """
+    obj_classes = {obj_class.name: obj_class for obj_class in obj_classes}
+    tag_metas = {tag_meta.name: tag_meta for tag_meta in tag_metas}
+    missing_obj_classes = [
+        obj_class
+        for name, obj_class in obj_classes.items()
+        if project_meta.get_obj_class(name) is None
+    ]
+    missing_tag_metas = [
+        tag_meta
+        for name, tag_meta in tag_metas.items()
+        if project_meta.get_tag_meta(name) is None
+    ]
+    return missing_obj_classes, missing_tag_metas
+
+
+def collect_project_meta(annotations_xml_paths: Iterable[str]) -> sly.ProjectMeta:
+    """Returns project meta with object classes and tag metas of all labels and tags
+    of the given tasks, without converting the annotations. Classes are built with the same
+    names and geometries as in the convert functions from CONVERT_MAP, so the meta contains
+    all classes and tags, which will be used by the converted annotations.
+    The files are parsed incrementally, <image> and <track> elements are removed from
+    the tree after they are checked. For the same input the result is the same.
+
+    :param annotations_xml_paths: paths to the annotations.xml files of the tasks
+    :type annotations_xml_paths: Iterable[str]
+    :return: project meta with classes and tags of the tasks
+    :rtype: sly.ProjectMeta
+    """
+    obj_classes = {}
+    tag_metas = {}
+
+    def add_shape(shape_et: ET.Element, label: str) -> None:
+        if shape_et.tag == "skeleton":
+            node_labels = sorted(
+                node.get("label") for node in shape_et.findall("points")
+            )
+            if node_labels:
+                class_name = label + "_graph"
+                obj_classes.setdefault(
+                    class_name, get_skeleton_class(class_name, tuple(node_labels))
+                )
+            return
+        if shape_et.tag not in CLASS_GEOMETRIES:
+            return
+        suffix, geometry_type = CLASS_GEOMETRIES[shape_et.tag]
+        class_name = label + suffix
+        if class_name not in obj_classes:
+            obj_classes[class_name] = sly.ObjClass(class_name, geometry_type)
+
+    def add_tag(tag_et: ET.Element) -> None:
+        tag_name = tag_et.attrib["label"]
+        if tag_name not in tag_metas:
+            tag_metas[tag_name] = sly.TagMeta(tag_name, sly.TagValueType.NONE)
+
+    for annotations_xml_path in annotations_xml_paths:
+        context = ET.iterparse(annotations_xml_path, events=("start", "end"))
+        _, root = next(context)
+        # * Only children of the root are checked: images, tracks and tags of videos.
+        depth = 0
+        for event, element in context:
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            if depth > 0:
+                continue
+
+            if element.tag == "image":
+                for child_et in element:
+                    if child_et.tag == "tag":
+                        add_tag(child_et)
+                    elif child_et.tag in CONVERT_MAP:
+                        add_shape(child_et, child_et.attrib["label"])
+            elif element.tag == "track":
+                for shape_et in element:
+                    if shape_et.tag in CONVERT_MAP:
+                        add_shape(shape_et, element.attrib["label"])
+            elif element.tag == "tag":
+                add_tag(element)
+            root.clear()
+
+    return sly.ProjectMeta(
+        obj_classes=list(obj_classes.values()), tag_metas=list(tag_metas.values())
+    )
+
+
+def upload_images_task_batches(
     api: sly.Api,
     dataset_name: str,
     sly_project: sly.ProjectInfo,
-    image_names: List[str],
-    image_paths: List[str],
-    anns: List[sly.Annotation],
-    sly_tags: Dict[str, List[sly.Tag]],
-) -> List[sly.ImageInfo]:
-    """Uploads images, annotations and tags to Supervisely by batches.
+    sly_project_meta: sly.ProjectMeta,
+    images_et: Iterable[ET.Element],
+    images_dir: str,
+    batch_size: int = IMAGES_BATCH_SIZE,
+    fast_converter: bool = False,
+    cache_entry: Optional[Any] = None,
+    sly_dataset: Optional[sly.DatasetInfo] = None,
+    metrics: Optional[Any] = None,
+    cancel_token: Optional[Any] = None,
+) -> sly.ProjectMeta:
+    """Streaming conversion and upload of the images task.
+    Images are read from the iterable by batches, each batch is converted, prepared and uploaded
+    with its annotations and tags before the next one is read, so memory usage is bounded
+    by the batch size and the upload starts right after the first batch is converted.
+    Returns project meta, which contains classes and tags of the uploaded labels.
+
+    If the entry of the conversion cache is provided, converted batches are saved to it.
+    If the entry is complete, images elements are not read at all and batches are loaded
+    from the cache, if it's partial, only batches, which are missing in the cache, are converted.
+    Batches, which are loaded from or saved to the cache, are uploaded in JSON format
+    as with the fast converter, so the labels of each batch are built only once.
 
     :param api: Supervisely API object
     :type api: sly.Api
@@ -796,53 +2001,292 @@ def upload_images_task(
     :type dataset_name: str
     :param sly_project: project in Supervisely where images will be uploaded
     :type sly_project: sly.ProjectInfo
-    :param image_names: list of image names
-    :type image_names: List[str]
-    :param image_paths: list of paths to the images on the local machine
-    :type image_paths: List[str]
-    :param anns: list of Annotation objects for images
-    :type anns: List[sly.Annotation]
-    :param sly_tags: dictionary with tags for each image by image name
-    :type sly_tags: Dict[str, List[sly.Tag]]
-    :return: list of uploaded images as ImageInfo objects
-    :rtype: List[sly.ImageInfo]
+    :param sly_project_meta: current meta of the project
+    :type sly_project_meta: sly.ProjectMeta
+    :param images_et: image elements of CVAT XML annotation, e.g. from iter_images_et
+    :type images_et: Iterable[ET.Element]
+    :param images_dir: path to the directory with images on the local machine
+    :type images_dir: str
+    :param batch_size: number of images in one batch, defaults to IMAGES_BATCH_SIZE
+    :type batch_size: int, optional
+    :param fast_converter: convert labels directly to JSON with convert_images_annotations_json, defaults to False
+    :type fast_converter: bool, optional
+    :param cache_entry: entry of the conversion cache for the task, it's closed
+        when the task is uploaded, defaults to None
+    :type cache_entry: Optional[CacheEntry], optional
+    :param sly_dataset: existing dataset to upload images to, if not provided
+        a new dataset with dataset_name will be created, defaults to None
+    :type sly_dataset: Optional[sly.DatasetInfo], optional
+    :param metrics: RunMetrics object to time the stages and count uploaded data with, defaults to None
+    :type metrics: Optional[RunMetrics], optional
+    :param cancel_token: cancellation token, which is checked before each batch, defaults to None
+    :type cancel_token: Optional[CancellationToken], optional
+    :return: updated project meta
+    :rtype: sly.ProjectMeta
     """
-    sly_dataset = api.dataset.create(
-        sly_project.id, dataset_name, change_name_if_conflict=True
-    )
+    if sly_dataset is None:
+        sly_dataset = api.dataset.create(
+            sly_project.id, dataset_name, change_name_if_conflict=True
+        )
 
-    sly.logger.debug(
-        f"Created dataset {sly_dataset.name} in project {sly_project.name}."
+        sly.logger.debug(
+            f"Created dataset {sly_dataset.name} in project {sly_project.name}."
+        )
+
+    # * The entry is closed even if the upload fails, so it can be evicted from the cache.
+    try:
+        cached_batches = None
+        if cache_entry is not None and cache_entry.validate():
+            sly.logger.info(
+                f"Converted annotations for dataset {dataset_name} are loaded from the cache."
+            )
+            cached_batches = cache_entry.iter_batches()
+
+        uploaded_count = 0
+        batches_count = 0
+        batches = cached_batches or _lazy_batches(images_et, batch_size)
+        for batch_idx, batch in enumerate(batches):
+            _raise_if_cancelled(cancel_token)
+            with _trace(metrics, f"batch {batch_idx}", "batch", task=dataset_name):
+                with _stage(metrics, "convert", dataset_name):
+                    if cached_batches is not None:
+                        cached_batch = batch
+                    elif cache_entry is not None:
+                        cached_batch = cache_entry.load_batch(batch_idx)
+                    else:
+                        cached_batch = None
+
+                    if cached_batch is not None:
+                        (
+                            batched_tags,
+                            image_objects,
+                            obj_classes,
+                        ) = _images_batch_from_json(cached_batch, images_dir)
+                        if metrics is not None:
+                            metrics.count("conversion_cache_hits")
+                    else:
+                        (
+                            batched_tags,
+                            image_objects,
+                            obj_classes,
+                        ) = _convert_images_batch(batch, images_dir, fast_converter)
+                        if cache_entry is not None:
+                            batch_json = _images_batch_to_json(
+                                image_objects, obj_classes
+                            )
+                            cache_entry.save_batch(batch_idx, batch_json)
+                            # * The saved batch is uploaded as the cached one,
+                            # * the labels are not built again for the upload.
+                            (
+                                batched_tags,
+                                image_objects,
+                                obj_classes,
+                            ) = _images_batch_from_json(batch_json, images_dir)
+                            if metrics is not None:
+                                metrics.count("conversion_cache_misses")
+                batches_count += 1
+                if metrics is not None:
+                    metrics.count(
+                        "labels",
+                        sum(len(image_object.labels) for image_object in image_objects),
+                    )
+
+                if obj_classes is not None:
+                    # * Meta of the project is updated with classes and tags of the batch,
+                    # * the next batch starts from the returned meta without the extra request.
+                    (
+                        batched_image_names,
+                        batched_image_paths,
+                        batched_anns,
+                        sly_project_meta,
+                    ) = prepare_images_json_for_upload(
+                        api,
+                        image_objects,
+                        obj_classes,
+                        sly_project,
+                        sly_project_meta,
+                        metrics,
+                    )
+                else:
+                    (
+                        batched_image_names,
+                        batched_image_paths,
+                        batched_anns,
+                        sly_project_meta,
+                    ) = prepare_images_for_upload(
+                        api, image_objects, sly_project, sly_project_meta, metrics
+                    )
+
+                uploaded_image_infos = _upload_images_batch(
+                    api,
+                    sly_dataset,
+                    batched_image_names,
+                    batched_image_paths,
+                    batched_anns,
+                    metrics,
+                )
+
+                if any(batched_tags.values()):
+                    with _stage(metrics, "upload_tags", dataset_name):
+                        upload_images_tags(
+                            api, uploaded_image_infos, sly_project.id, batched_tags
+                        )
+
+            uploaded_count += len(uploaded_image_infos)
+            sly.logger.info(
+                f"Uploaded {uploaded_count} images with annotations to dataset {sly_dataset.name}."
+            )
+
+        if cache_entry is not None and cached_batches is None:
+            cache_entry.mark_complete(batches_count)
+    finally:
+        if cache_entry is not None:
+            cache_entry.close()
+
+    sly.logger.info(
+        f"Finished uploading images and annotations for dataset {sly_dataset.name} to Supervisely."
     )
 
-    sly.logger.info(f"Uploading {len(image_names)} images to Supervisely.")
+    return sly_project_meta
 
-    for batched_image_names, batched_image_paths, batched_anns in zip(
-        sly.batched(image_names), sly.batched(image_paths), sly.batched(anns)
-    ):
-        uploaded_image_infos = api.image.upload_paths(
-            sly_dataset.id, batched_image_names, batched_image_paths
-        )
 
-        uploaded_image_ids = [image_info.id for image_info in uploaded_image_infos]
+def _convert_images_batch(
+    images_et: List[ET.Element], images_dir: str, fast_converter: bool
+) -> Tuple[Dict[str, List[sly.Tag]], List[ImageObject], Optional[List[sly.ObjClass]]]:
+    """Converts the batch of images with convert_images_annotations_json if fast_converter is True,
+    with convert_images_annotations otherwise. Object classes are returned only by the fast converter.
 
-        sly.logger.info(
-            f"Uploaded {len(uploaded_image_ids)} images to Supervisely to dataset {sly_dataset.name}."
+    :return: dictionary with tags for each image by image name, list of ImageObjects,
+        list of object classes of the labels or None
+    :rtype: Tuple[Dict[str, List[sly.Tag]], List[ImageObject], Optional[List[sly.ObjClass]]]
+    """
+    images_paths = [
+        os.path.join(images_dir, image_et.attrib["name"]) for image_et in images_et
+    ]
+    if fast_converter:
+        return convert_images_annotations_json(images_et, images_paths)
+
+    batched_tags, image_objects = convert_images_annotations(images_et, images_paths)
+    return batched_tags, image_objects, None
+
+
+def _images_batch_to_json(
+    image_objects: List[ImageObject], obj_classes: Optional[List[sly.ObjClass]]
+) -> Dict[str, List]:
+    """Serializes the converted batch of images for the conversion cache:
+    labels in Supervisely JSON format, names of the tags and object classes of the labels.
+
+    :param image_objects: list of converted ImageObjects
+    :type image_objects: List[ImageObject]
+    :param obj_classes: list of object classes from the fast converter, None for other converters
+    :type obj_classes: Optional[List[sly.ObjClass]]
+    :return: JSON-serializable batch
+    :rtype: Dict[str, List]
+    """
+    images_json = []
+    batch_obj_classes = {obj_class.name: obj_class for obj_class in obj_classes or []}
+    for image_object in image_objects:
+        labels = image_object.labels
+        if obj_classes is None:
+            if isinstance(labels, CompactLabels):
+                labels = labels.to_labels()
+            for label in labels:
+                batch_obj_classes.setdefault(label.obj_class.name, label.obj_class)
+            labels = [label.to_json() for label in labels]
+        images_json.append(
+            {
+                "name": image_object.name,
+                "size": list(image_object.size),
+                "labels": labels,
+                "tags": [tag.name for tag in image_object.tags],
+            }
         )
 
-        api.annotation.upload_anns(uploaded_image_ids, batched_anns)
+    return {
+        "images": images_json,
+        "obj_classes": [
+            obj_class.to_json() for obj_class in batch_obj_classes.values()
+        ],
+    }
+
+
+def _images_batch_from_json(
+    batch_json: Dict[str, List], images_dir: str
+) -> Tuple[Dict[str, List[sly.Tag]], List[ImageObject], List[sly.ObjClass]]:
+    """Restores the batch of images from the conversion cache in the format of convert_images_annotations_json.
+
+    :param batch_json: batch from _images_batch_to_json
+    :type batch_json: Dict[str, List]
+    :param images_dir: path to the directory with images on the local machine
+    :type images_dir: str
+    :return: dictionary with tags for each image by image name, list of ImageObjects
+        with labels in JSON format, list of object classes of the labels
+    :rtype: Tuple[Dict[str, List[sly.Tag]], List[ImageObject], List[sly.ObjClass]]
+    """
+    batched_tags = dict()
+    image_objects = []
+    for image_json in batch_json["images"]:
+        image_name = image_json["name"]
+        image_tags = [
+            convert_tag({"label": tag_name}) for tag_name in image_json["tags"]
+        ]
+        batched_tags[image_name] = image_tags
+        image_objects.append(
+            ImageObject(
+                name=image_name,
+                path=os.path.join(images_dir, image_name),
+                size=tuple(image_json["size"]),
+                labels=image_json["labels"],
+                tags=image_tags,
+            )
+        )
+
+    obj_classes = [
+        sly.ObjClass.from_json(obj_class_json)
+        for obj_class_json in batch_json["obj_classes"]
+    ]
+    return batched_tags, image_objects, obj_classes
 
-        sly.logger.info(f"Uploaded {len(batched_anns)} annotations to Supervisely.")
+
+def _upload_images_batch(
+    api: sly.Api,
+    sly_dataset: sly.DatasetInfo,
+    image_names: List[str],
+    image_paths: List[str],
+    anns: Union[List[sly.Annotation], List[Dict]],
+    metrics: Optional[Any] = None,
+) -> List[sly.ImageInfo]:
+    """Uploads the batch of images with their annotations to the dataset.
+
+    :return: list of uploaded images as ImageInfo objects
+    :rtype: List[sly.ImageInfo]
+    """
+    with _stage(metrics, "upload_images", sly_dataset.name):
+        uploaded_image_infos = api.image.upload_paths(
+            sly_dataset.id, image_names, image_paths
+        )
+
+    uploaded_image_ids = [image_info.id for image_info in uploaded_image_infos]
 
     sly.logger.info(
-        f"Finished uploading images and annotations for dataset {sly_dataset.name} to Supervisely."
+        f"Uploaded {len(uploaded_image_ids)} images to Supervisely to dataset {sly_dataset.name}."
     )
 
-    if sly_tags:
-        sly.logger.debug("There were tags in the current task, will upload them.")
-        upload_images_tags(api, uploaded_image_infos, sly_project.id, sly_tags)
-    else:
-        sly.logger.debug("No tags were found in the current task, nothing to upload.")
+    with _stage(metrics, "upload_anns", sly_dataset.name):
+        if isinstance(anns[0], dict):
+            # * Annotations from the fast converter are already in JSON format.
+            api.annotation.upload_jsons(uploaded_image_ids, anns)
+        else:
+            api.annotation.upload_anns(uploaded_image_ids, anns)
+
+    sly.logger.info(f"Uploaded {len(anns)} annotations to Supervisely.")
+
+    if metrics is not None:
+        metrics.count("images", len(uploaded_image_ids))
+        metrics.count(
+            "bytes_uploaded",
+            sum(os.path.getsize(path) for path in image_paths),
+        )
 
     return uploaded_image_infos
 
@@ -891,6 +2335,170 @@ def upload_images_tags(
     sly.logger.info("Tags successfully uploaded to Supervisely.")
 
 
+def upload_video_annotation(
+    api: sly.Api,
+    video_id: int,
+    video_frames: Iterable[sly.Frame],
+    video_tags: List[sly.VideoTag],
+    frames_per_chunk: int = VIDEO_ANN_CHUNK_FRAMES,
+    retries: int = VIDEO_ANN_CHUNK_RETRIES,
+    metrics: Optional[Any] = None,
+    cancel_token: Optional[Any] = None,
+) -> None:
+    """Uploads annotation of the video to Supervisely by chunks of frames instead of
+    one VideoAnnotation, so size of the requests doesn't depend on the length of the video.
+    Each chunk contains figures of the frames window and objects, which appear in it
+    for the first time. Chunks are built lazily from the frames and retried one at a time,
+    already uploaded objects and figures are not sent again on retry.
+
+    :param api: Supervisely API object
+    :type api: sly.Api
+    :param video_id: ID of the uploaded video in Supervisely
+    :type video_id: int
+    :param video_frames: frames of the video with figures
+    :type video_frames: Iterable[sly.Frame]
+    :param video_tags: tags of the video
+    :type video_tags: List[sly.VideoTag]
+    :param frames_per_chunk: number of frames in one chunk, defaults to VIDEO_ANN_CHUNK_FRAMES
+    :type frames_per_chunk: int, optional
+    :param retries: number of attempts to upload one chunk, defaults to VIDEO_ANN_CHUNK_RETRIES
+    :type retries: int, optional
+    :param metrics: RunMetrics object to trace the chunks with, defaults to None
+    :type metrics: Optional[RunMetrics], optional
+    :param cancel_token: cancellation token, which is checked before each chunk, defaults to None
+    :type cancel_token: Optional[CancellationToken], optional
+    """
+    project_id = api.video.get_info_by_id(video_id).project_id
+
+    # * Shared map of uploaded objects, figures and tags. Objects are referenced by figures
+    # * of the next chunks and uploaded entities are skipped on retry.
+    key_id_map = sly.KeyIdMap()
+
+    if video_tags:
+        with _trace(metrics, "video tags", "batch", video_id=video_id):
+            _retry_chunk(
+                lambda: api.video.tag.append_to_entity(
+                    video_id,
+                    project_id,
+                    sly.VideoTagCollection(
+                        [
+                            tag
+                            for tag in video_tags
+                            if key_id_map.get_tag_id(tag.key()) is None
+                        ]
+                    ),
+                    key_id_map,
+                ),
+                f"tags of the video {video_id}",
+                retries,
+                cancel_token,
+            )
+        sly.logger.debug(f"Uploaded {len(video_tags)} tags of the video {video_id}.")
+
+    for chunk_idx, frames_chunk in enumerate(
+        _lazy_batches(video_frames, frames_per_chunk)
+    ):
+        figures = [figure for frame in frames_chunk for figure in frame.figures]
+        if not figures:
+            continue
+        _raise_if_cancelled(cancel_token)
+
+        def upload_chunk():
+            new_objects = {}
+            for figure in figures:
+                video_object = figure.video_object
+                if key_id_map.get_object_id(video_object.key()) is None:
+                    new_objects.setdefault(video_object.key(), video_object)
+            if new_objects:
+                api.video.object.append_bulk(
+                    video_id,
+                    sly.VideoObjectCollection(list(new_objects.values())),
+                    key_id_map,
+                )
+
+            new_figures = [
+                figure
+                for figure in figures
+                if key_id_map.get_figure_id(figure.key()) is None
+            ]
+            if new_figures:
+                api.video.figure.append_bulk(video_id, new_figures, key_id_map)
+
+        first_frame, last_frame = frames_chunk[0].index, frames_chunk[-1].index
+        with _trace(metrics, f"chunk {chunk_idx}", "batch", video_id=video_id):
+            _retry_chunk(
+                upload_chunk,
+                f"frames {first_frame}-{last_frame} of the video {video_id}",
+                retries,
+                cancel_token,
+            )
+
+        sly.logger.debug(
+            f"Uploaded {len(figures)} figures on frames {first_frame}-{last_frame} "
+            f"of the video {video_id}."
+        )
+
+    sly.logger.debug(f"Finished uploading annotation of the video {video_id}.")
+
+
+def _lazy_batches(items: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    """Lazily splits items into batches of the given size, the items are read
+    from the iterable only when the batch is requested.
+
+    :param items: items to split, e.g. frames of the video or image elements
+    :type items: Iterable[Any]
+    :param batch_size: number of items in one batch
+    :type batch_size: int
+    :return: iterator over the lists of items
+    :rtype: Iterator[List[Any]]
+    """
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _retry_chunk(
+    upload: Callable[[], None],
+    description: str,
+    retries: int,
+    cancel_token: Optional[Any] = None,
+) -> None:
+    """Calls the upload function and retries it with growing delay if it fails.
+    Raises the last exception if all attempts failed. If the cancellation token is provided,
+    the delay is interrupted by the cancellation.
+
+    :param upload: function, which uploads the chunk
+    :type upload: Callable[[], None]
+    :param description: description of the chunk for the logs
+    :type description: str
+    :param retries: number of attempts
+    :type retries: int
+    :param cancel_token: cancellation token, which interrupts the delay, defaults to None
+    :type cancel_token: Optional[CancellationToken], optional
+    :raises OperationCancelled: if the token is cancelled during the delay
+    """
+    for attempt in range(1, retries + 1):
+        try:
+            upload()
+            return
+        except Exception as e:
+            if attempt == retries:
+                raise
+            sly.logger.warning(
+                f"Failed to upload {description} (attempt {attempt} of {retries}): {e}. "
+                "Will retry..."
+            )
+            delay = attempt * VIDEO_ANN_RETRY_DELAY
+            if cancel_token is None:
+                sleep(delay)
+            else:
+                cancel_token.wait(delay)
+                cancel_token.raise_if_cancelled()
+
+
 def get_tag_meta(api: sly.Api, sly_project_id: int, tag_name: str) -> sly.TagMeta:
     """Returns active tag meta from API for the given project ID and tag name.
     Important: this function makes an API call, because local project meta does not contain tag IDs.
@@ -957,3 +2565,52 @@ def create_image_annotation(
         sly.logger.debug(f"Created annotation for {image_name} with labels.")
 
     return ann
+
+
+def _stage(
+    metrics: Optional[Any], name: str, task: Optional[str] = None
+) -> ContextManager:
+    """Returns context manager, which times the stage with given RunMetrics object
+    or does nothing if metrics are not provided.
+
+    :param metrics: RunMetrics object or None
+    :type metrics: Optional[RunMetrics]
+    :param name: name of the stage
+    :type name: str
+    :param task: name of the task, defaults to None
+    :type task: Optional[str], optional
+    :return: context manager for the stage
+    :rtype: ContextManager
+    """
+    if metrics is None:
+        return nullcontext()
+    return metrics.stage(name, task)
+
+
+def _raise_if_cancelled(cancel_token: Optional[Any]) -> None:
+    """Raises the exception of the cancellation token if it's cancelled,
+    does nothing if the token is not provided.
+
+    :param cancel_token: CancellationToken object or None
+    :type cancel_token: Optional[CancellationToken]
+    """
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+
+
+def _trace(metrics: Optional[Any], name: str, category: str, **args) -> ContextManager:
+    """Returns context manager, which records a span with the tracer of given RunMetrics object
+    or does nothing if metrics are not provided.
+
+    :param metrics: RunMetrics object or None
+    :type metrics: Optional[RunMetrics]
+    :param name: name of the span
+    :type name: str
+    :param category: category of the span, e.g. "task", "batch"
+    :type category: str
+    :return: context manager for the span
+    :rtype: ContextManager
+    """
+    if metrics is None:
+        return nullcontext()
+    return metrics.trace(name, category, **args)
@@ -1,9 +1,15 @@
 import os
+import multiprocessing
 
 import supervisely as sly
 
 from dotenv import load_dotenv
 
+from metrics import ProgressTracker, RunMetrics
+from tracing import Tracer
+from conversion_cache import ConversionCache
+from converters import CONVERTER_VERSION
+
 sly.logger.info(f"Python current working directory: {os.getcwd()}")
 
 ABSOLUTE_PATH = os.path.dirname(os.path.abspath(__file__))
@@ -26,7 +32,13 @@ if sly.is_development():
     else:
         sly.logger.warning("One of the .env files is missing. It may cause errors.")
 
-api = sly.Api.from_env()
+# * Processes of the video encoder are spawned and import the main module (and this module) again.
+# The API, the cleaning of the directories and the conversion cache are used only in the main process,
+# so they are not created in the encoder processes: e.g. the cache of a child process
+# must not evict entries, which are used by the main process.
+IS_MAIN_PROCESS = multiprocessing.current_process().name == "MainProcess"
+
+api = sly.Api.from_env() if IS_MAIN_PROCESS else None
 SLY_APP_DATA_DIR = sly.app.get_data_dir()
 sly.logger.debug(f"App starting... SLY_APP_DATA_DIR: {SLY_APP_DATA_DIR}")
 
@@ -37,12 +49,72 @@ ARCHIVE_DIR = os.path.join(TEMP_DIR, "archives")
 
 # * Directory, where unpacked CVAT tasks will be stored.
 UNPACKED_DIR = os.path.join(TEMP_DIR, "unpacked")
-sly.fs.mkdir(ARCHIVE_DIR, remove_content_if_exists=True)
-sly.fs.mkdir(UNPACKED_DIR, remove_content_if_exists=True)
+# * The directories are cleaned only in the main process, not to remove the frames in use.
+if IS_MAIN_PROCESS:
+    sly.fs.mkdir(ARCHIVE_DIR, remove_content_if_exists=True)
+    sly.fs.mkdir(UNPACKED_DIR, remove_content_if_exists=True)
 sly.logger.debug(
     f"App starting... Archive dir: {ARCHIVE_DIR}, unpacked dir: {UNPACKED_DIR}"
 )
 
+# * Directory, where JSON and Prometheus summaries of the run will be saved.
+# It's not cleaned on start, so metrics of the previous runs are kept.
+METRICS_DIR = os.path.join(SLY_APP_DATA_DIR, "metrics")
+sly.logger.debug(f"App starting... Metrics dir: {METRICS_DIR}")
+
+# * Opt-in timeline of the pipeline stages in Chrome trace-event format.
+# To enable set TRACE_PIPELINE=1 in the environment, the trace will be saved to METRICS_DIR.
+TRACE_PIPELINE = os.getenv("TRACE_PIPELINE", "").lower() in ("1", "true")
+TRACE_PATH = os.path.join(METRICS_DIR, "import_cvat_trace.json")
+TRACER = Tracer(enabled=TRACE_PIPELINE)
+sly.logger.debug(f"App starting... Trace pipeline: {TRACE_PIPELINE}")
+
+# * Cache of converted annotations of images tasks, it's kept between the runs,
+# so if only the upload fails, the next run doesn't parse and convert the same annotations.xml again.
+# To disable set CONVERSION_CACHE=0 in the environment.
+# The size limit is set with CONVERSION_CACHE_MB in the environment, least recently used entries are evicted.
+CONVERSION_CACHE_DIR = os.path.join(SLY_APP_DATA_DIR, "conversion_cache")
+CONVERSION_CACHE_MB = int(os.getenv("CONVERSION_CACHE_MB", "2048"))
+CONVERSION_CACHE = None
+if IS_MAIN_PROCESS and os.getenv("CONVERSION_CACHE", "1").lower() in ("1", "true"):
+    CONVERSION_CACHE = ConversionCache(
+        CONVERSION_CACHE_DIR, CONVERTER_VERSION, CONVERSION_CACHE_MB * 1024 * 1024
+    )
+sly.logger.debug(
+    f"App starting... Conversion cache: {CONVERSION_CACHE is not None}, dir: {CONVERSION_CACHE_DIR}, "
+    f"size limit: {CONVERSION_CACHE_MB} MB"
+)
+
+# * Opt-in fast converter for images tasks, which builds annotations directly in JSON format
+# without Supervisely Label and Annotation objects. To enable set FAST_CONVERTER=1 in the environment.
+FAST_CONVERTER = os.getenv("FAST_CONVERTER", "").lower() in ("1", "true")
+sly.logger.debug(f"App starting... Fast converter: {FAST_CONVERTER}")
+
+# * Sharded mode: SHARD_COUNT instances of the app get the same input and each processes
+# its own part of the tasks (or ranges of images of large tasks), see sharding.shard_work.
+# All shards of the run upload to the same projects. By default the app processes all tasks.
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+SHARD_INDEX = int(os.getenv("SHARD_INDEX", "0"))
+# * All shards of the same run must get the same SHARD_RUN_ID, it's a part of the names
+# of the projects, so the projects of the previous runs are never reused.
+SHARD_RUN_ID = os.getenv("SHARD_RUN_ID")
+if SHARD_COUNT > 1 and not SHARD_RUN_ID:
+    raise ValueError(
+        "SHARD_RUN_ID must be set in sharded mode, the same value for all shards of the run."
+    )
+sly.logger.debug(
+    f"App starting... Shard {SHARD_INDEX} of {SHARD_COUNT}, run ID: {SHARD_RUN_ID}"
+)
+
+# * Progress of tasks, images (frames of videos) and bytes with the rolling throughput and ETA,
+# it's logged together with the throughput of the run.
+PROGRESS = ProgressTracker("import_cvat")
+
+# * Timings of the pipeline stages and counters of the processed data.
+METRICS = RunMetrics("import_cvat", tracer=TRACER, progress=PROGRESS)
+if IS_MAIN_PROCESS:
+    METRICS.track_api(api)
+
 TEAM_ID = sly.io.env.team_id()
 WORKSPACE_ID = sly.io.env.workspace_id()
 
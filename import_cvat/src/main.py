@@ -1,18 +1,33 @@
 import os
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import supervisely as sly
 
 import globals as g
 import xml.etree.ElementTree as ET
 
 from converters import (
-    convert_images_annotations,
+    collect_project_meta,
     convert_video_annotations,
-    prepare_images_for_upload,
-    upload_images_task,
+    convert_video_tracks,
+    get_frames_paths,
+    get_task_source,
+    iter_images_et,
+    IMAGES_BATCH_SIZE,
     update_project_meta,
-    images_to_mp4,
+    upload_images_task_batches,
+    upload_video_annotation,
+    VideoEncoder,
+    VideoTask,
 )
+from sharding import (
+    get_or_create_dataset,
+    get_or_create_project,
+    share_project_meta,
+    shard_work,
+    whole_tasks,
+    ShardWork,
+)
+from xml_index import load_index
 
 MARKER = "annotations.xml"
 
@@ -20,6 +35,17 @@ MARKER = "annotations.xml"
 @sly.handle_exceptions
 def main():
     sly.logger.debug("Starting main function...")
+    g.METRICS.start()
+    try:
+        process_data()
+    finally:
+        g.PROGRESS.log()
+        g.METRICS.stop()
+        g.METRICS.dump(g.METRICS_DIR)
+        g.TRACER.dump(g.TRACE_PATH)
+
+
+def process_data():
     data_path = download_data()
 
     project_name = f"From CVAT {os.path.basename(data_path)}"
@@ -33,11 +59,8 @@ def main():
     ):
         sly.logger.debug(f"Found CVAT data in {cvat_task}")
         annotations_xml_path = os.path.join(cvat_task, MARKER)
-        tree = ET.parse(annotations_xml_path)
-        try:
-            source = tree.find("meta").find("task").find("source").text
-        except Exception:
-            source = None
+        with g.METRICS.stage("parse", sly.fs.get_file_name(cvat_task)):
+            source = get_task_source(annotations_xml_path)
 
         if not source:
             images_tasks.append((cvat_task, source))
@@ -48,27 +71,85 @@ def main():
         f"Found {len(images_tasks)} images tasks and {len(videos_tasks)} videos tasks"
     )
 
-    if images_tasks:
-        process_image_tasks(project_name, images_tasks)
-    if videos_tasks:
-        process_video_tasks(project_name, videos_tasks)
+    images_meta = None
+    videos_meta = None
+    if g.SHARD_COUNT > 1:
+        # * All shards compute the same meta from all tasks, not only from their own,
+        # * it's written once before the upload, see share_project_meta.
+        with g.METRICS.stage("meta"):
+            if images_tasks:
+                images_meta = collect_project_meta(
+                    os.path.join(task_path, MARKER) for task_path, _ in images_tasks
+                )
+            if videos_tasks:
+                videos_meta = collect_project_meta(
+                    os.path.join(task_path, MARKER) for task_path, _ in videos_tasks
+                )
+        shard_tasks = shard_work(
+            images_tasks + videos_tasks, g.SHARD_INDEX, g.SHARD_COUNT, data_path
+        )
+        images_tasks = [work for work in shard_tasks if not work.source]
+        videos_tasks = [work for work in shard_tasks if work.source]
+    else:
+        images_tasks = whole_tasks(images_tasks)
+        videos_tasks = whole_tasks(videos_tasks)
+
+    tasks_count = len(images_tasks) + len(videos_tasks)
+    g.PROGRESS.add_total("tasks", tasks_count)
+    tasks_progress = sly.Progress("Processing CVAT tasks", tasks_count)
+
+    # * Shard 0 writes the meta of the shared projects, even if it got no tasks of this type.
+    if images_tasks or (images_meta is not None and g.SHARD_INDEX == 0):
+        process_image_tasks(project_name, images_tasks, tasks_progress, images_meta)
+    if videos_tasks or (videos_meta is not None and g.SHARD_INDEX == 0):
+        process_video_tasks(project_name, videos_tasks, tasks_progress, videos_meta)
 
     sly.logger.info("Processed all tasks, exiting...")
 
 
-def process_image_tasks(project_name: str, images_tasks: List[str]):
-    sly.logger.info(f"Started processing {len(images_tasks)} images tasks...")
+def create_project(project_name: str, project_type: str) -> sly.ProjectInfo:
+    """Creates the project in Supervisely. In sharded mode all shards of the run use
+    the same project, so the project of the run is returned, if it already exists.
+
+    :param project_name: name of the project
+    :type project_name: str
+    :param project_type: type of the project, e.g. sly.ProjectType.IMAGES
+    :type project_type: str
+    :return: project in Supervisely
+    :rtype: sly.ProjectInfo
+    """
+    if g.SHARD_COUNT > 1:
+        return get_or_create_project(
+            g.api, g.WORKSPACE_ID, project_name, project_type, g.SHARD_RUN_ID
+        )
 
-    images_project = g.api.project.create(
+    return g.api.project.create(
         g.WORKSPACE_ID,
-        project_name + "(images)",
-        type=sly.ProjectType.IMAGES,
+        project_name,
+        type=project_type,
         change_name_if_conflict=True,
     )
 
-    images_project_meta = sly.ProjectMeta.from_json(
-        g.api.project.get_meta(images_project.id)
-    )
+
+def process_image_tasks(
+    project_name: str,
+    images_tasks: List[ShardWork],
+    tasks_progress: sly.Progress,
+    shared_meta: Optional[sly.ProjectMeta] = None,
+):
+    sly.logger.info(f"Started processing {len(images_tasks)} images tasks...")
+
+    images_project = create_project(project_name + "(images)", sly.ProjectType.IMAGES)
+
+    if shared_meta is not None:
+        with g.METRICS.stage("meta"):
+            images_project_meta = share_project_meta(
+                g.api, images_project.id, shared_meta, g.SHARD_INDEX
+            )
+    else:
+        images_project_meta = sly.ProjectMeta.from_json(
+            g.api.project.get_meta(images_project.id)
+        )
 
     sly.logger.debug(
         f"Created project {images_project.name} with id {images_project.id}"
@@ -76,56 +157,80 @@ def process_image_tasks(project_name: str, images_tasks: List[str]):
 
     sly.logger.debug(f"Will process {len(images_tasks)} images tasks")
 
-    for task_path, _ in images_tasks:
-        images_et, images_paths = read_task_data(task_path)
-
-        sly.logger.debug(f"Read {len(images_paths)} images from {task_path}")
+    for work in images_tasks:
+        task_path = work.task_path
         dataset_name = sly.fs.get_file_name(os.path.normpath(task_path))
         sly.logger.debug(f"Will use {dataset_name} as dataset name.")
 
-        task_tags, image_objects = convert_images_annotations(images_et, images_paths)
-
-        sly.logger.debug(
-            f"Prepared labels and tags in Supervisely format for {len(image_objects)} images."
-        )
-
-        images_names, images_paths, images_anns = prepare_images_for_upload(
-            g.api, image_objects, images_project, images_project_meta
-        )
-
-        sly.logger.debug(f"Prepared {len(images_names)} images for upload.")
-
-        uploaded_images = upload_images_task(
-            g.api,
-            dataset_name,
-            images_project,
-            images_names,
-            images_paths,
-            images_anns,
-            task_tags,
-        )
+        with g.METRICS.trace(dataset_name, "task"):
+            # * Images are parsed, converted and uploaded by batches,
+            # * so the whole task is never kept in memory.
+            annotations_xml_path = os.path.join(task_path, MARKER)
+            # * The index gives the number of images for the progress and is reused to read the images.
+            index = load_index(annotations_xml_path)
+            images_stop = index.count() if work.stop is None else work.stop
+            g.PROGRESS.add_total("images", images_stop - work.start)
+            images_et = iter_images_et(
+                annotations_xml_path, work.start, work.stop, index=index
+            )
+            sly_dataset = None
+            if work.stop is not None:
+                # * Range of images of the task, which is split between shards.
+                sly.logger.info(
+                    f"Will process images from {work.start} to {work.stop} of {dataset_name}."
+                )
+                # * Ranges of the same task are uploaded by different shards to one dataset.
+                sly_dataset = get_or_create_dataset(
+                    g.api, images_project.id, dataset_name
+                )
+
+            cache_entry = None
+            if g.CONVERSION_CACHE is not None:
+                cache_entry = g.CONVERSION_CACHE.entry(
+                    annotations_xml_path, IMAGES_BATCH_SIZE, work.start, work.stop
+                )
+            images_project_meta = upload_images_task_batches(
+                g.api,
+                dataset_name,
+                images_project,
+                images_project_meta,
+                images_et,
+                os.path.join(task_path, "images"),
+                fast_converter=g.FAST_CONVERTER,
+                cache_entry=cache_entry,
+                sly_dataset=sly_dataset,
+                metrics=g.METRICS,
+            )
 
-        sly.logger.info(
-            f"Successfully uploaded {len(uploaded_images)} images to dataset {dataset_name}"
-            f"in project {images_project.name}"
-        )
+            sly.logger.info(
+                f"Successfully uploaded images to dataset {dataset_name} "
+                f"in project {images_project.name}"
+            )
+            g.PROGRESS.advance("tasks")
+            tasks_progress.iter_done_report()
 
     sly.logger.info(f"Finished processing {len(images_tasks)} images tasks.")
 
 
-def process_video_tasks(project_name: str, videos_tasks: List[str]):
+def process_video_tasks(
+    project_name: str,
+    videos_tasks: List[ShardWork],
+    tasks_progress: sly.Progress,
+    shared_meta: Optional[sly.ProjectMeta] = None,
+):
     sly.logger.info(f"Started processing {len(videos_tasks)} videos tasks...")
 
-    videos_project = g.api.project.create(
-        g.WORKSPACE_ID,
-        project_name + "(videos)",
-        type=sly.ProjectType.VIDEOS,
-        change_name_if_conflict=True,
-    )
+    videos_project = create_project(project_name + "(videos)", sly.ProjectType.VIDEOS)
 
-    videos_project_meta = sly.ProjectMeta.from_json(
-        g.api.project.get_meta(videos_project.id)
-    )
+    if shared_meta is not None:
+        with g.METRICS.stage("meta"):
+            videos_project_meta = share_project_meta(
+                g.api, videos_project.id, shared_meta, g.SHARD_INDEX
+            )
+    else:
+        videos_project_meta = sly.ProjectMeta.from_json(
+            g.api.project.get_meta(videos_project.id)
+        )
 
     sly.logger.debug(
         f"Created project {videos_project.name} with id {videos_project.id}"
@@ -133,50 +238,98 @@ def process_video_tasks(project_name: str, videos_tasks: List[str]):
 
     sly.logger.debug(f"Will process {len(videos_tasks)} videos tasks")
 
-    for task_path, source in videos_tasks:
-        images_et, images_paths = read_task_data(task_path)
-
-        sly.logger.debug(f"Read {len(images_paths)} images from {task_path}")
-
-        dataset_name = sly.fs.get_file_name(task_path)
-        sly.logger.debug(f"Will use {dataset_name} as dataset name.")
-        (
-            video_size,
-            video_frames,
-            video_objects,
-            video_tags,
-        ) = convert_video_annotations(images_et, images_paths)
-
-        sly.logger.debug(f"Found {len(video_frames)} frames in the video.")
-
-        update_project_meta(
-            g.api,
-            videos_project_meta,
-            videos_project.id,
-            labels=video_objects,
-            tags=video_tags,
-        )
-
-        source_name = f"{sly.fs.get_file_name(source)}.mp4"
-        video_path = os.path.join(task_path, source_name)
-        sly.logger.debug(f"Will save video to {video_path}.")
-        images_to_mp4(video_path, images_paths, video_size)
+    # * Videos are encoded in separate processes, while the next tasks are converted.
+    # * Each video is uploaded as soon as it's encoded.
+    with VideoEncoder(metrics=g.METRICS) as encoder:
+        for task_path, source, *_ in videos_tasks:
+            dataset_name = sly.fs.get_file_name(task_path)
+            sly.logger.debug(f"Will use {dataset_name} as dataset name.")
+
+            with g.METRICS.trace(dataset_name, "task"):
+                with g.METRICS.stage("parse", dataset_name):
+                    annotations_et, images_et, images_paths = read_video_task_data(
+                        task_path
+                    )
+
+                sly.logger.debug(f"Read {len(images_paths)} frames from {task_path}")
+
+                with g.METRICS.stage("convert", dataset_name):
+                    if images_et:
+                        (
+                            video_size,
+                            video_frames,
+                            video_objects,
+                            video_tags,
+                        ) = convert_video_annotations(images_et, images_paths)
+                    else:
+                        # * Task in "CVAT for video 1.1" format, annotations are stored in tracks.
+                        (
+                            video_size,
+                            video_frames,
+                            video_objects,
+                            video_tags,
+                        ) = convert_video_tracks(annotations_et, images_paths)
+                g.METRICS.count(
+                    "labels",
+                    sum(len(video_frame.figures) for video_frame in video_frames),
+                )
+
+                sly.logger.debug(f"Found {len(video_frames)} frames in the video.")
+                g.PROGRESS.add_total("images", len(video_frames))
+
+                with g.METRICS.stage("meta", dataset_name):
+                    videos_project_meta = update_project_meta(
+                        g.api,
+                        videos_project_meta,
+                        videos_project.id,
+                        labels=video_objects,
+                        tags=video_tags,
+                    )
+
+                source_name = f"{sly.fs.get_file_name(source)}.mp4"
+                video_path = os.path.join(task_path, source_name)
+                sly.logger.debug(f"Will save video to {video_path}.")
+                encoder.submit(
+                    dataset_name,
+                    video_path,
+                    images_paths,
+                    video_size,
+                    frames_dir=os.path.join(task_path, "images"),
+                    context=VideoTask(
+                        dataset_name, source_name, video_path, video_frames, video_tags
+                    ),
+                )
+
+            for video_task, error in encoder.finished():
+                upload_video_task(videos_project, video_task, error)
+                g.PROGRESS.advance("tasks")
+                tasks_progress.iter_done_report()
+
+        for video_task, error in encoder.finished(wait_all=True):
+            upload_video_task(videos_project, video_task, error)
+            g.PROGRESS.advance("tasks")
+            tasks_progress.iter_done_report()
 
-        frames = sly.FrameCollection(video_frames)
-        objects = sly.VideoObjectCollection(video_objects)
-        tag_collection = sly.VideoTagCollection(video_tags)
+    sly.logger.info(f"Finished processing {len(videos_tasks)} videos tasks.")
 
-        sly.logger.debug(
-            f"Will create VideoAnnotation object with: {video_size} size, "
-            f"{len(frames)} frames, {len(objects)} objects, {len(tag_collection)} tags."
-        )
 
-        ann = sly.VideoAnnotation(
-            video_size, len(frames), objects, frames, tag_collection
-        )
+def upload_video_task(
+    videos_project: sly.ProjectInfo, video_task: VideoTask, error: Optional[str]
+) -> None:
+    """Uploads the encoded video and its annotation to the new dataset in Supervisely.
 
-        sly.logger.debug("VideoAnnotation successfully created.")
+    :param videos_project: project in Supervisely where the video will be uploaded
+    :type videos_project: sly.ProjectInfo
+    :param video_task: converted video task with the path to the encoded video
+    :type video_task: VideoTask
+    :param error: error message if the video was not encoded, None otherwise
+    :type error: Optional[str]
+    """
+    dataset_name = video_task.dataset_name
+    if error is not None:
+        raise RuntimeError(f"Can't encode video for task {dataset_name}: {error}")
 
+    with g.METRICS.trace(dataset_name, "task"):
         dataset_info = g.api.dataset.create(
             videos_project.id, dataset_name, change_name_if_conflict=True
         )
@@ -186,15 +339,25 @@ def process_video_tasks(project_name: str, videos_tasks: List[str]):
             "Uploading video..."
         )
 
-        uploaded_video: sly.api.video_api.VideoInfo = g.api.video.upload_path(
-            dataset_info.id, source_name, video_path
-        )
+        with g.METRICS.stage("upload_video", dataset_name):
+            uploaded_video: sly.api.video_api.VideoInfo = g.api.video.upload_path(
+                dataset_info.id, video_task.source_name, video_task.video_path
+            )
+        g.METRICS.count("images", len(video_task.frames))
+        g.METRICS.count("bytes_uploaded", os.path.getsize(video_task.video_path))
 
         sly.logger.debug(
-            f"Uploaded video {source_name} to dataset {dataset_info.name}."
+            f"Uploaded video {video_task.source_name} to dataset {dataset_info.name}."
         )
 
-        g.api.video.annotation.append(uploaded_video.id, ann)
+        with g.METRICS.stage("upload_anns", dataset_name):
+            upload_video_annotation(
+                g.api,
+                uploaded_video.id,
+                video_task.frames,
+                video_task.tags,
+                metrics=g.METRICS,
+            )
 
         sly.logger.debug(f"Added annotation to video with ID {uploaded_video.id}.")
 
@@ -203,26 +366,38 @@ def process_video_tasks(project_name: str, videos_tasks: List[str]):
             f"in project {videos_project.name}."
         )
 
-    sly.logger.info(f"Finished processing {len(videos_tasks)} videos tasks.")
-
 
 def check_function(folder_path: str) -> bool:
     images_dir = os.path.join(folder_path, "images")
     return os.path.isdir(images_dir) and sly.fs.list_files(images_dir)
 
 
-def read_task_data(task_path: str) -> Tuple[List[ET.Element], List[str]]:
+def read_video_task_data(
+    task_path: str,
+) -> Tuple[ET.Element, List[ET.Element], List[str]]:
+    """Parses annotations.xml of the video task in "CVAT for images 1.1" or "CVAT for video 1.1" format.
+    Returns root element of annotations.xml, list of <image> elements (empty for "CVAT for video 1.1")
+    and list of paths to the frames.
+
+    :param task_path: path to the task directory
+    :type task_path: str
+    :return: root element of annotations.xml, list of image elements, list of paths to the frames
+    :rtype: Tuple[ET.Element, List[ET.Element], List[str]]
+    """
     annotations_xml_path = os.path.join(task_path, "annotations.xml")
-    tree = ET.parse(annotations_xml_path)
-    images_et = tree.findall("image")
+    annotations_et = ET.parse(annotations_xml_path).getroot()
+    images_et = annotations_et.findall("image")
 
     images_dir = os.path.join(task_path, "images")
 
-    images_paths = [
-        os.path.join(images_dir, image_et.attrib["name"]) for image_et in images_et
-    ]
+    if images_et:
+        images_paths = [
+            os.path.join(images_dir, image_et.attrib["name"]) for image_et in images_et
+        ]
+    else:
+        images_paths = get_frames_paths(images_dir)
 
-    return images_et, images_paths
+    return annotations_et, images_et, images_paths
 
 
 def download_data() -> str:
@@ -258,7 +433,9 @@ def _download_folder(remote_path: str) -> str:
     folder_name = sly.fs.get_file_name(remote_path)
     save_path = os.path.join(g.UNPACKED_DIR, folder_name)
     sly.logger.debug(f"Will download folder to {save_path}.")
-    g.api.file.download_directory(g.TEAM_ID, remote_path, save_path)
+    with g.METRICS.stage("download"):
+        g.api.file.download_directory(g.TEAM_ID, remote_path, save_path)
+    g.METRICS.count("bytes_downloaded", sly.fs.get_directory_size(save_path))
     sly.logger.debug(f"Folder downloaded to {save_path}.")
     return save_path
 
@@ -268,14 +445,17 @@ def _download_archive(remote_path: str) -> str:
     archive_name = sly.fs.get_file_name_with_ext(remote_path)
     save_path = os.path.join(g.ARCHIVE_DIR, archive_name)
     sly.logger.debug(f"Will download archive to {save_path}.")
-    g.api.file.download(g.TEAM_ID, remote_path, save_path)
+    with g.METRICS.stage("download"):
+        g.api.file.download(g.TEAM_ID, remote_path, save_path)
+    g.METRICS.count("bytes_downloaded", os.path.getsize(save_path))
     sly.logger.debug(f"Archive downloaded to {save_path}.")
 
     file_name = sly.fs.get_file_name(remote_path)
     unpack_path = os.path.join(g.UNPACKED_DIR, file_name)
     sly.logger.debug(f"Will unpack archive to {unpack_path}.")
     try:
-        sly.fs.unpack_archive(save_path, unpack_path)
+        with g.METRICS.stage("unpack"):
+            sly.fs.unpack_archive(save_path, unpack_path)
     except Exception as e:
         raise RuntimeError(
             f"Can't unpack archive from {remote_path}. "
@@ -0,0 +1,519 @@
+import os
+import json
+import threading
+
+from time import monotonic, perf_counter, time
+from contextlib import contextmanager
+from collections import defaultdict, deque
+from datetime import timedelta
+from typing import Any, Dict, Generator, Optional, Tuple
+
+import supervisely as sly
+
+# * Names of the pipeline stages, which are timed for each task.
+# Used only for ordering in the reports, any other stage name can be used as well.
+STAGES = [
+    "export",
+    "download",
+    "unpack",
+    "parse",
+    "convert",
+    "prepare",
+    "meta",
+    "encode",
+    "upload_images",
+    "upload_anns",
+    "upload_tags",
+    "upload_video",
+]
+
+# * Prefix for all metrics in the Prometheus text-format file.
+PROMETHEUS_PREFIX = "cvat_to_sly"
+
+# * Levels of the progress from the coarsest to the finest.
+PROGRESS_LEVELS = ["projects", "tasks", "images", "bytes"]
+
+# * Counters of RunMetrics, which advance the levels of the progress.
+PROGRESS_COUNTERS = {
+    "images": "images",
+    "bytes_downloaded": "bytes",
+    "bytes_uploaded": "bytes",
+}
+
+
+class RunMetrics:
+    """Collects timings of the pipeline stages for each task and counters
+    (bytes, images, labels, API calls) for the whole run.
+    Periodically logs live throughput and writes JSON and Prometheus summaries at the end of the run.
+    All methods are thread-safe.
+
+    :param app_name: name of the application, used as a label in the reports
+    :type app_name: str
+    :param log_interval: interval in seconds between throughput log lines, defaults to 30
+    :type log_interval: float, optional
+    :param tracer: Tracer object, which will record a span for each stage, defaults to None
+    :type tracer: Optional[Tracer], optional
+    :param progress: ProgressTracker, which is advanced by the images and bytes counters
+        and logged with the throughput, defaults to None
+    :type progress: Optional[ProgressTracker], optional
+    """
+
+    def __init__(
+        self,
+        app_name: str,
+        log_interval: float = 30.0,
+        tracer: Optional[Any] = None,
+        progress: Optional["ProgressTracker"] = None,
+    ):
+        self.app_name = app_name
+        self.log_interval = log_interval
+        self.tracer = tracer
+        self.progress = progress
+
+        self._lock = threading.Lock()
+        self._started_at = time()
+        self._start_counter = perf_counter()
+        self._finished_at = None
+
+        # Dictionary with task names as keys and dictionaries of stage durations as values.
+        # Example: {"task_1": {"download": 1.5, "parse": 0.2}}
+        self._task_stages = defaultdict(lambda: defaultdict(float))
+
+        # Total durations and number of calls for each stage across all tasks.
+        self._stage_totals = defaultdict(float)
+        self._stage_calls = defaultdict(int)
+
+        # Counters for the whole run, e.g. {"images": 100, "bytes_uploaded": 1024}.
+        self._counters = defaultdict(int)
+
+        self._stop_event = threading.Event()
+        self._logger_thread = None
+
+    @contextmanager
+    def stage(
+        self, name: str, task: Optional[str] = None
+    ) -> Generator[None, None, None]:
+        """Context manager, which measures the duration of the stage and saves it
+        for the given task (if provided) and to the total stage duration.
+
+        :param name: name of the stage, e.g. "download", "parse", "upload_images"
+        :type name: str
+        :param task: name of the task, which the stage belongs to, defaults to None
+        :type task: Optional[str], optional
+        """
+        start = perf_counter()
+        try:
+            with self.trace(name, "stage", task=task):
+                yield
+        finally:
+            self.add_stage(name, perf_counter() - start, task)
+
+    def add_stage(self, name: str, duration: float, task: Optional[str] = None) -> None:
+        """Saves the duration of the stage, which was measured outside of this object
+        (e.g. in a worker process), for the given task (if provided) and to the total stage duration.
+
+        :param name: name of the stage, e.g. "encode"
+        :type name: str
+        :param duration: duration of the stage in seconds
+        :type duration: float
+        :param task: name of the task, which the stage belongs to, defaults to None
+        :type task: Optional[str], optional
+        """
+        with self._lock:
+            self._stage_totals[name] += duration
+            self._stage_calls[name] += 1
+            if task is not None:
+                self._task_stages[task][name] += duration
+
+    @contextmanager
+    def trace(self, name: str, category: str, **args) -> Generator[None, None, None]:
+        """Context manager, which records a span with the tracer without timing it as a stage.
+        Used for spans, which contain several stages (e.g. task or batch).
+        Does nothing if the tracer is not provided.
+
+        :param name: name of the span
+        :type name: str
+        :param category: category of the span, e.g. "task", "batch"
+        :type category: str
+        """
+        if self.tracer is None:
+            yield
+            return
+
+        with self.tracer.span(name, category, **args):
+            yield
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Increases the counter with the given name by the given value.
+
+        :param name: name of the counter, e.g. "images", "labels", "bytes_uploaded"
+        :type name: str
+        :param value: value to add to the counter, defaults to 1
+        :type value: int, optional
+        """
+        with self._lock:
+            self._counters[name] += value
+        if self.progress is not None and name in PROGRESS_COUNTERS:
+            self.progress.advance(PROGRESS_COUNTERS[name], value)
+
+    def track_api(self, api: sly.Api) -> None:
+        """Wraps post and get methods of the Supervisely API object to count API calls.
+        The wrapping is done only once for each API object, on the next calls
+        the API object only starts reporting to the current metrics object.
+
+        :param api: Supervisely API object
+        :type api: sly.Api
+        """
+        api._run_metrics = self
+        if getattr(api, "_run_metrics_wrapped", False):
+            return
+
+        def wrap(method_name: str):
+            original = getattr(api, method_name)
+
+            def wrapped(method, *args, **kwargs):
+                api._run_metrics.count("api_calls")
+                api._run_metrics.count(f"api_calls:{method}")
+                return original(method, *args, **kwargs)
+
+            setattr(api, method_name, wrapped)
+
+        wrap("post")
+        wrap("get")
+        api._run_metrics_wrapped = True
+
+    def start(self) -> None:
+        """Starts the background thread, which periodically logs the live throughput."""
+        if self._logger_thread is not None:
+            return
+
+        self._logger_thread = threading.Thread(
+            target=self._log_throughput_loop, daemon=True
+        )
+        self._logger_thread.start()
+
+    def stop(self) -> None:
+        """Stops the background thread and fixes the duration of the run."""
+        self._stop_event.set()
+        if self._logger_thread is not None:
+            self._logger_thread.join()
+            self._logger_thread = None
+        with self._lock:
+            self._finished_at = perf_counter()
+
+    def elapsed(self) -> float:
+        """Returns the duration of the run in seconds (up to now, if the run is not finished yet).
+
+        :return: duration of the run in seconds
+        :rtype: float
+        """
+        end = self._finished_at or perf_counter()
+        return end - self._start_counter
+
+    def throughput(self) -> Tuple[float, float]:
+        """Returns the average throughput of the run as images per second and megabytes per second.
+        Megabytes are counted from both downloaded and uploaded bytes.
+
+        :return: images per second, megabytes per second
+        :rtype: Tuple[float, float]
+        """
+        elapsed = self.elapsed() or 1e-9
+        with self._lock:
+            images = self._counters["images"]
+            bytes_total = (
+                self._counters["bytes_downloaded"] + self._counters["bytes_uploaded"]
+            )
+        return images / elapsed, bytes_total / 1024 / 1024 / elapsed
+
+    def _log_throughput_loop(self) -> None:
+        """Logs the live throughput every log_interval seconds until the run is stopped."""
+        while not self._stop_event.wait(self.log_interval):
+            images_per_second, mb_per_second = self.throughput()
+            sly.logger.info(
+                f"Throughput: {images_per_second:.2f} images/s, {mb_per_second:.2f} MB/s "
+                f"after {self.elapsed():.0f} seconds.",
+                extra={
+                    "images_per_second": round(images_per_second, 3),
+                    "mb_per_second": round(mb_per_second, 3),
+                },
+            )
+            if self.progress is not None:
+                self.progress.log()
+
+    def summary(self) -> Dict:
+        """Returns the summary of the run as a dictionary, which can be serialized to JSON.
+
+        :return: summary of the run
+        :rtype: Dict
+        """
+        images_per_second, mb_per_second = self.throughput()
+        with self._lock:
+            stages = _ordered(self._stage_totals)
+            return {
+                "app": self.app_name,
+                "started_at": self._started_at,
+                "duration": round(self.elapsed(), 3),
+                "throughput": {
+                    "images_per_second": round(images_per_second, 3),
+                    "mb_per_second": round(mb_per_second, 3),
+                },
+                "stages": {
+                    name: {
+                        "seconds": round(seconds, 3),
+                        "calls": self._stage_calls[name],
+                    }
+                    for name, seconds in stages.items()
+                },
+                "counters": dict(self._counters),
+                "tasks": {
+                    task: {
+                        name: round(seconds, 3)
+                        for name, seconds in _ordered(task_stages).items()
+                    }
+                    for task, task_stages in self._task_stages.items()
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        """Returns the summary of the run in the Prometheus text-based exposition format.
+
+        :return: metrics in Prometheus text format
+        :rtype: str
+        """
+        summary = self.summary()
+        app_label = f'app="{self.app_name}"'
+        lines = [
+            f"# HELP {PROMETHEUS_PREFIX}_run_duration_seconds Duration of the run.",
+            f"# TYPE {PROMETHEUS_PREFIX}_run_duration_seconds gauge",
+            f"{PROMETHEUS_PREFIX}_run_duration_seconds{{{app_label}}} {summary['duration']}",
+            f"# HELP {PROMETHEUS_PREFIX}_stage_seconds_total Total time spent in the pipeline stage.",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_seconds_total counter",
+        ]
+        for name, stage in summary["stages"].items():
+            lines.append(
+                f'{PROMETHEUS_PREFIX}_stage_seconds_total{{{app_label},stage="{name}"}} {stage["seconds"]}'
+            )
+        lines.extend(
+            [
+                f"# HELP {PROMETHEUS_PREFIX}_stage_calls_total Number of times the pipeline stage was run.",
+                f"# TYPE {PROMETHEUS_PREFIX}_stage_calls_total counter",
+            ]
+        )
+        for name, stage in summary["stages"].items():
+            lines.append(
+                f'{PROMETHEUS_PREFIX}_stage_calls_total{{{app_label},stage="{name}"}} {stage["calls"]}'
+            )
+        lines.extend(
+            [
+                f"# HELP {PROMETHEUS_PREFIX}_items_total Counted items (bytes, images, labels, API calls).",
+                f"# TYPE {PROMETHEUS_PREFIX}_items_total counter",
+            ]
+        )
+        for name, value in sorted(summary["counters"].items()):
+            lines.append(
+                f'{PROMETHEUS_PREFIX}_items_total{{{app_label},name="{name}"}} {value}'
+            )
+
+        return "\n".join(lines) + "\n"
+
+    def dump(self, output_dir: str) -> Tuple[str, str]:
+        """Saves the summary of the run to the JSON and Prometheus text-format files
+        in the given directory. Returns paths to the saved files.
+
+        :param output_dir: directory, where files will be saved
+        :type output_dir: str
+        :return: path to the JSON file, path to the Prometheus file
+        :rtype: Tuple[str, str]
+        """
+        sly.fs.mkdir(output_dir)
+        json_path = os.path.join(output_dir, f"{self.app_name}_metrics.json")
+        prom_path = os.path.join(output_dir, f"{self.app_name}_metrics.prom")
+
+        with open(json_path, "w") as f:
+            json.dump(self.summary(), f, indent=4)
+        with open(prom_path, "w") as f:
+            f.write(self.to_prometheus())
+
+        sly.logger.info(f"Saved run metrics to {json_path} and {prom_path}.")
+
+        return json_path, prom_path
+
+
+class ProgressTracker:
+    """Nested progress of the run: projects, tasks, images (frames for videos) and bytes.
+    Totals of the levels may be unknown or grow during the run (e.g. number of images
+    is known only after the task is downloaded). For each level the rolling throughput
+    is computed over the last window seconds and the ETA is estimated from it.
+    The ETA of the run is the largest ETA of the levels with known totals, so it's never
+    too optimistic because of the tasks, which are not started yet. All methods are thread-safe.
+
+    :param name: name of the progress, used in the log lines
+    :type name: str
+    :param window: duration of the window of the rolling throughput in seconds, defaults to 60
+    :type window: float, optional
+    """
+
+    def __init__(self, name: str, window: float = 60.0):
+        self.name = name
+        self.window = window
+
+        self._lock = threading.Lock()
+        self._done = {level: 0 for level in PROGRESS_LEVELS}
+        self._totals: Dict[str, Optional[int]] = {
+            level: None for level in PROGRESS_LEVELS
+        }
+        # * Samples (time, done) of each level for the rolling throughput, one per second at most.
+        self._samples = {level: deque() for level in PROGRESS_LEVELS}
+        # * Keys of the totals, which are already added, see add_total.
+        self._total_keys = set()
+
+    def add_total(self, level: str, value: int, key: Optional[Any] = None) -> None:
+        """Increases the total of the level by the given value, e.g. when the task is unpacked
+        and the number of its images becomes known.
+        If the key is given (e.g. ID of the project), the total is added only once for the key,
+        so the work, which is retried, doesn't increase the total again.
+
+        :param level: level of the progress, one of PROGRESS_LEVELS
+        :type level: str
+        :param value: value to add to the total
+        :type value: int
+        :param key: key of the added work, defaults to None
+        :type key: Optional[Any], optional
+        """
+        with self._lock:
+            if key is not None:
+                if (level, key) in self._total_keys:
+                    return
+                self._total_keys.add((level, key))
+            self._totals[level] = (self._totals[level] or 0) + value
+
+    def advance(self, level: str, value: int = 1) -> None:
+        """Increases the number of done items of the level.
+
+        :param level: level of the progress, one of PROGRESS_LEVELS
+        :type level: str
+        :param value: number of done items, defaults to 1
+        :type value: int, optional
+        """
+        now = monotonic()
+        with self._lock:
+            self._done[level] += value
+            samples = self._samples[level]
+            if not samples:
+                # * Starting point of the throughput is the moment before the first item.
+                samples.append((now, self._done[level] - value))
+                samples.append((now, self._done[level]))
+            elif now - samples[-1][0] >= 1:
+                samples.append((now, self._done[level]))
+            else:
+                samples[-1] = (samples[-1][0], self._done[level])
+            while len(samples) > 2 and now - samples[1][0] > self.window:
+                samples.popleft()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the state of the progress: done items, totals, rolling throughput (items per second)
+        and ETA (seconds) of each level, which has any progress or total, and the ETA of the run.
+
+        :return: state of the progress
+        :rtype: Dict[str, Any]
+        """
+        now = monotonic()
+        levels = {}
+        with self._lock:
+            for level in PROGRESS_LEVELS:
+                done, total = self._done[level], self._totals[level]
+                if not done and total is None:
+                    continue
+                rate = None
+                samples = self._samples[level]
+                if samples:
+                    # * The latest sample, which is older than the window, is the start of the window,
+                    # * so if nothing was done during the window (stall), the throughput is 0.
+                    start = samples[0]
+                    for sample in samples:
+                        if now - sample[0] <= self.window:
+                            break
+                        start = sample
+                    if now - start[0] >= 1:
+                        rate = (done - start[1]) / (now - start[0])
+                eta = None
+                if total is not None and rate:
+                    eta = max(total - done, 0) / rate
+                levels[level] = {"done": done, "total": total, "rate": rate, "eta": eta}
+
+        etas = [level["eta"] for level in levels.values() if level["eta"] is not None]
+        return {"levels": levels, "eta": max(etas) if etas else None}
+
+    def format(self, snapshot: Optional[Dict[str, Any]] = None) -> str:
+        """Returns the human-readable line with the state of the progress, e.g.
+        "projects 3/10, tasks 12/40, images 5000/12000 (85.3/s), 1.2 GB (5.1 MB/s), ETA 0:12:30".
+
+        :param snapshot: state of the progress, defaults to None (current state)
+        :type snapshot: Optional[Dict[str, Any]], optional
+        :return: state of the progress
+        :rtype: str
+        """
+        snapshot = snapshot or self.snapshot()
+        parts = []
+        for level, state in snapshot["levels"].items():
+            if level == "bytes":
+                part = f"{_format_bytes(state['done'])}"
+                if state["rate"] is not None:
+                    part += f" ({_format_bytes(state['rate'])}/s)"
+            else:
+                part = f"{level} {state['done']}"
+                if state["total"] is not None:
+                    part += f"/{state['total']}"
+                if state["rate"] is not None and level == "images":
+                    part += f" ({state['rate']:.1f}/s)"
+            parts.append(part)
+        eta = snapshot["eta"]
+        parts.append(
+            f"ETA {timedelta(seconds=round(eta))}" if eta is not None else "ETA unknown"
+        )
+        return ", ".join(parts)
+
+    def log(self) -> None:
+        """Writes the structured log line with the state of the progress."""
+        snapshot = self.snapshot()
+        sly.logger.info(
+            f"Progress of {self.name}: {self.format(snapshot)}.",
+            extra={
+                "progress": {
+                    level: {
+                        key: round(value, 3) if isinstance(value, float) else value
+                        for key, value in state.items()
+                    }
+                    for level, state in snapshot["levels"].items()
+                },
+                "eta_seconds": round(snapshot["eta"])
+                if snapshot["eta"] is not None
+                else None,
+            },
+        )
+
+
+def _format_bytes(value: float) -> str:
+    """Returns the size in bytes as a human-readable string, e.g. "1.2 GB"."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TB"
+
+
+def _ordered(stages: Dict[str, float]) -> Dict[str, float]:
+    """Returns the dictionary with stages sorted in the pipeline order,
+    unknown stages are placed at the end in alphabetical order.
+
+    :param stages: dictionary with stage names as keys
+    :type stages: Dict[str, float]
+    :return: sorted dictionary
+    :rtype: Dict[str, float]
+    """
+    order = {name: idx for idx, name in enumerate(STAGES)}
+    return dict(
+        sorted(
+            stages.items(), key=lambda item: (order.get(item[0], len(STAGES)), item[0])
+        )
+    )
@@ -0,0 +1,260 @@
+import os
+import math
+import time
+
+from collections import namedtuple
+from typing import List, Optional, Tuple
+
+import supervisely as sly
+
+from converters import merge_project_meta, missing_meta
+from xml_index import load_index
+
+# * Unit of work of one shard: task directory, "source" of the task (None for images tasks)
+# * and range of images [start, stop) for images tasks, stop is None for the whole task.
+ShardWork = namedtuple("ShardWork", ["task_path", "source", "start", "stop", "weight"])
+
+# * Images tasks, which are larger than the share of one shard divided by this number,
+# * are split into ranges of images, so each shard gets the balanced amount of work.
+SPLIT_FACTOR = 2
+
+# * Shards wait for the project meta written by shard 0 for up to META_WAIT_TIMEOUT seconds
+# * and check it every META_POLL_INTERVAL seconds.
+META_WAIT_TIMEOUT = 600
+META_POLL_INTERVAL = 2
+
+# * Description of the projects, which are created by the sharded run, the ID of the run is appended.
+RUN_DESCRIPTION_PREFIX = "Imported from CVAT by the sharded run "
+
+
+def whole_tasks(tasks: List[Tuple[str, Optional[str]]]) -> List[ShardWork]:
+    """Returns units of work for the whole tasks without sharding.
+
+    :param tasks: list of tuples with task directory and "source" of the task
+    :type tasks: List[Tuple[str, Optional[str]]]
+    :return: list of units of work
+    :rtype: List[ShardWork]
+    """
+    return [ShardWork(task_path, source, 0, None, 0) for task_path, source in tasks]
+
+
+def shard_work(
+    tasks: List[Tuple[str, Optional[str]]],
+    shard_index: int,
+    shard_count: int,
+    data_path: str,
+) -> List[ShardWork]:
+    """Returns units of work of the shard with the given index.
+    All shards get the same input and compute the same plan, so each unit is processed
+    by exactly one shard without any coordination between them:
+        1. Tasks are ordered by their path relative to the data directory.
+        2. Weight of the task is the size of its images directory in bytes.
+        3. Images tasks, which are larger than the half of the shard share,
+            are split into ranges of images with equal number of images.
+        4. Units are assigned from the heaviest to the lightest to the least loaded shard.
+
+    :param tasks: list of tuples with task directory and "source" of the task
+    :type tasks: List[Tuple[str, Optional[str]]]
+    :param shard_index: index of the current shard, from 0 to shard_count - 1
+    :type shard_index: int
+    :param shard_count: total number of shards
+    :type shard_count: int
+    :param data_path: path to the directory with the input data
+    :type data_path: str
+    :return: list of units of work in the order of processing
+    :rtype: List[ShardWork]
+    """
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(
+            f"Shard index must be in range [0, {shard_count}), got {shard_index}."
+        )
+
+    tasks = sorted(tasks, key=lambda task: os.path.relpath(task[0], data_path))
+    weights = [
+        sly.fs.get_directory_size(os.path.join(task_path, "images"))
+        for task_path, _ in tasks
+    ]
+    shard_share = sum(weights) / shard_count
+    max_unit_weight = shard_share / SPLIT_FACTOR
+
+    units = []
+    for (task_path, source), weight in zip(tasks, weights):
+        if source or shard_count == 1 or weight <= max_unit_weight:
+            # * Video tasks are uploaded as one video, so they are never split.
+            units.append(ShardWork(task_path, source, 0, None, weight))
+            continue
+
+        images_count = load_index(os.path.join(task_path, "annotations.xml")).count()
+        if images_count < 2:
+            units.append(ShardWork(task_path, source, 0, None, weight))
+            continue
+
+        parts_count = min(math.ceil(weight / max_unit_weight), images_count)
+        part_size = math.ceil(images_count / parts_count)
+        for start in range(0, images_count, part_size):
+            stop = min(start + part_size, images_count)
+            units.append(
+                ShardWork(
+                    task_path,
+                    source,
+                    start,
+                    stop,
+                    weight * (stop - start) // images_count,
+                )
+            )
+
+    loads = [0] * shard_count
+    assigned = [[] for _ in range(shard_count)]
+    order = sorted(range(len(units)), key=lambda idx: (-units[idx].weight, idx))
+    for idx in order:
+        shard = min(range(shard_count), key=lambda shard: (loads[shard], shard))
+        loads[shard] += units[idx].weight
+        assigned[shard].append(idx)
+
+    sly.logger.info(
+        f"Shard {shard_index} of {shard_count} got {len(assigned[shard_index])} of {len(units)} units "
+        f"with {loads[shard_index] / 1024 / 1024:.1f} MB of data."
+    )
+
+    # * Units are processed in the order of the input, so ranges of the same task go one after another.
+    return [units[idx] for idx in sorted(assigned[shard_index])]
+
+
+def get_or_create_project(
+    api: sly.Api, workspace_id: int, project_name: str, project_type: str, run_id: str
+) -> sly.ProjectInfo:
+    """Returns the project of the run, creates it if it doesn't exist.
+    All shards of the run write to the same project, so the name of the project includes
+    the ID of the run and the project can be created by another shard between the check
+    and the creation, in this case the existing project is returned.
+    The ID of the run is saved in the description of the project, so the project with
+    the same name, which was not created by this run, is never reused.
+
+    :param api: Supervisely API object
+    :type api: sly.Api
+    :param workspace_id: workspace ID in Supervisely
+    :type workspace_id: int
+    :param project_name: name of the project without the ID of the run
+    :type project_name: str
+    :param project_type: type of the project, e.g. sly.ProjectType.IMAGES
+    :type project_type: str
+    :param run_id: ID of the run, which is the same for all shards of the run
+    :type run_id: str
+    :raises RuntimeError: if the project with the name of the run was not created by the run
+    :return: project in Supervisely
+    :rtype: sly.ProjectInfo
+    """
+    run_project_name = f"{project_name}_{run_id}"
+    description = f"{RUN_DESCRIPTION_PREFIX}{run_id}"
+
+    project = api.project.get_info_by_name(workspace_id, run_project_name)
+    if project is None:
+        try:
+            return api.project.create(
+                workspace_id,
+                run_project_name,
+                type=project_type,
+                description=description,
+            )
+        except Exception as e:
+            project = api.project.get_info_by_name(workspace_id, run_project_name)
+            if project is None:
+                raise
+            sly.logger.debug(
+                f"Project {run_project_name} was created by another shard: {e}"
+            )
+
+    if project.description != description:
+        raise RuntimeError(
+            f"Project {run_project_name} (ID {project.id}) already exists, but it was not created "
+            f"by the run {run_id}. Set another SHARD_RUN_ID for all shards."
+        )
+    return project
+
+
+def get_or_create_dataset(
+    api: sly.Api, project_id: int, dataset_name: str
+) -> sly.DatasetInfo:
+    """Returns the dataset with the given name, creates it if it doesn't exist.
+    Ranges of the same task are uploaded by different shards to the same dataset.
+    The project belongs to the run (see get_or_create_project), so only datasets
+    of the same run are reused.
+
+    :param api: Supervisely API object
+    :type api: sly.Api
+    :param project_id: project ID in Supervisely
+    :type project_id: int
+    :param dataset_name: name of the dataset
+    :type dataset_name: str
+    :return: dataset in Supervisely
+    :rtype: sly.DatasetInfo
+    """
+    dataset = api.dataset.get_info_by_name(project_id, dataset_name)
+    if dataset is not None:
+        return dataset
+
+    try:
+        return api.dataset.create(project_id, dataset_name)
+    except Exception as e:
+        dataset = api.dataset.get_info_by_name(project_id, dataset_name)
+        if dataset is None:
+            raise
+        sly.logger.debug(f"Dataset {dataset_name} was created by another shard: {e}")
+        return dataset
+
+
+def share_project_meta(
+    api: sly.Api,
+    project_id: int,
+    project_meta: sly.ProjectMeta,
+    shard_index: int,
+    timeout: float = META_WAIT_TIMEOUT,
+) -> sly.ProjectMeta:
+    """Makes the meta of the project, which is shared by all shards, contain all classes and tags
+    of the import before any annotation is uploaded. Supervisely replaces the whole meta on update
+    and has no conditional update, so concurrent updates can drop classes of each other.
+    The meta is computed by every shard from all tasks with converters.collect_project_meta,
+    only shard 0 writes it, other shards wait until it's written and only read it.
+    As the meta contains classes and tags of all tasks, nothing is written to it during the upload.
+
+    :param api: Supervisely API object
+    :type api: sly.Api
+    :param project_id: project ID in Supervisely
+    :type project_id: int
+    :param project_meta: project meta with classes and tags of all tasks of the import
+    :type project_meta: sly.ProjectMeta
+    :param shard_index: index of the current shard
+    :type shard_index: int
+    :param timeout: time in seconds to wait for the meta, defaults to META_WAIT_TIMEOUT
+    :type timeout: float, optional
+    :raises RuntimeError: if the meta is not written by shard 0 in time
+    :return: actual project meta from Supervisely
+    :rtype: sly.ProjectMeta
+    """
+    obj_classes = project_meta.obj_classes
+    tag_metas = project_meta.tag_metas
+    if shard_index == 0:
+        shared_meta = merge_project_meta(api, project_id, obj_classes, tag_metas)
+        sly.logger.info(
+            f"Wrote meta of the project {project_id} for all shards: "
+            f"{len(shared_meta.obj_classes)} object classes, {len(shared_meta.tag_metas)} tag metas."
+        )
+        return shared_meta
+
+    deadline = time.monotonic() + timeout
+    while True:
+        shared_meta = sly.ProjectMeta.from_json(api.project.get_meta(project_id))
+        missing_obj_classes, missing_tag_metas = missing_meta(
+            shared_meta, obj_classes, tag_metas
+        )
+        if not missing_obj_classes and not missing_tag_metas:
+            return shared_meta
+        if time.monotonic() > deadline:
+            raise RuntimeError(
+                f"Meta of the project {project_id} wasn't written by shard 0 in {timeout} seconds, "
+                f"{len(missing_obj_classes)} object classes and {len(missing_tag_metas)} tag metas are missing."
+            )
+        sly.logger.debug(
+            f"Waiting for shard 0 to write meta of the project {project_id}."
+        )
+        time.sleep(META_POLL_INTERVAL)
@@ -0,0 +1,117 @@
+import os
+import json
+import threading
+
+from time import perf_counter_ns
+from contextlib import contextmanager
+from typing import Dict, Generator, List
+
+import supervisely as sly
+
+
+class Tracer:
+    """Records begin and end events of the pipeline spans with process and thread IDs
+    and saves them as a Chrome trace-event JSON file, which can be opened in
+    chrome://tracing or https://ui.perfetto.dev to see overlaps and idle gaps between stages.
+    If the tracer is disabled, all methods do nothing, so it can be always passed around.
+
+    :param enabled: if False, no events will be recorded, defaults to True
+    :type enabled: bool, optional
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._start_ns = perf_counter_ns()
+        self._events = []
+
+        # Thread IDs, for which the name metadata event was already recorded.
+        self._named_threads = set()
+
+    @contextmanager
+    def span(
+        self, name: str, category: str = "stage", **args
+    ) -> Generator[None, None, None]:
+        """Context manager, which records begin event on enter and end event on exit.
+        Additional keyword arguments will be saved as arguments of the begin event.
+
+        :param name: name of the span, e.g. "download", "upload_images"
+        :type name: str
+        :param category: category of the span, e.g. "stage", "task", "batch", defaults to "stage"
+        :type category: str, optional
+        """
+        if not self.enabled:
+            yield
+            return
+
+        self._add_event(name, category, "B", args)
+        try:
+            yield
+        finally:
+            self._add_event(name, category, "E", {})
+
+    def events(self) -> List[Dict]:
+        """Returns a copy of the recorded events.
+
+        :return: list of events in Chrome trace-event format
+        :rtype: List[Dict]
+        """
+        with self._lock:
+            return list(self._events)
+
+    def dump(self, trace_path: str) -> None:
+        """Saves recorded events to the JSON file in Chrome trace-event format.
+        Does nothing if the tracer is disabled.
+
+        :param trace_path: path to the output JSON file
+        :type trace_path: str
+        """
+        if not self.enabled:
+            return
+
+        events = self.events()
+        sly.fs.ensure_base_path(trace_path)
+        with open(trace_path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+        sly.logger.info(f"Saved {len(events)} trace events to {trace_path}.")
+
+    def _add_event(self, name: str, category: str, phase: str, args: Dict) -> None:
+        """Adds the event to the list of events. On the first event from the thread
+        also adds the metadata event with the thread name.
+
+        :param name: name of the event
+        :type name: str
+        :param category: category of the event
+        :type category: str
+        :param phase: phase of the event, "B" for begin and "E" for end
+        :type phase: str
+        :param args: arguments of the event
+        :type args: Dict
+        """
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": phase,
+            "ts": (perf_counter_ns() - self._start_ns) / 1000,
+            "pid": os.getpid(),
+            "tid": thread.ident,
+        }
+        if args:
+            event["args"] = args
+
+        with self._lock:
+            if thread.ident not in self._named_threads:
+                self._named_threads.add(thread.ident)
+                self._events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": event["pid"],
+                        "tid": thread.ident,
+                        "args": {"name": thread.name},
+                    }
+                )
+            self._events.append(event)
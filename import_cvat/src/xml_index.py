@@ -0,0 +1,239 @@
+import os
+import re
+import json
+import mmap
+
+from collections import namedtuple
+from typing import Dict, Iterator, List, Optional
+from xml.sax.saxutils import unescape
+
+import supervisely as sly
+import xml.etree.ElementTree as ET
+
+# * Version of the index format, indexes of other versions are rebuilt.
+INDEX_VERSION = 1
+
+# * Suffix of the index file, which is stored next to the annotations.xml.
+INDEX_SUFFIX = ".idx.json"
+
+# * Tags of the indexed elements: images in "CVAT for images 1.1" and tracks in "CVAT for video 1.1".
+INDEXED_TAGS = ("image", "track")
+
+# * Size of the chunks, which are fed to the parser while reading the range of elements.
+READ_CHUNK_SIZE = 1024 * 1024
+
+# * Attribute values may contain unescaped ">", so quoted strings are skipped as a whole.
+_START_TAG = re.compile(rb'<(image|track)\b((?:[^>"]|"[^"]*")*)>')
+_ATTRIBUTE = re.compile(rb'([\w:-]+)="([^"]*)"')
+
+# * Indexed element: tag, byte offsets of its start and end in the file, ID, name
+# * (label for tracks) and size (height, width) if it's known.
+IndexedElement = namedtuple(
+    "IndexedElement", ["tag", "start", "end", "id", "name", "size"]
+)
+
+
+class XmlIndex:
+    """Byte offsets of <image> and <track> elements in annotations.xml,
+    which allow to parse only the requested range of elements without reading the whole file,
+    e.g. to resume processing from the image N or to split the task between workers.
+    Use load_index to get the index of the file.
+
+    :param xml_path: path to the annotations.xml
+    :type xml_path: str
+    :param elements: indexed elements in the order of the file
+    :type elements: List[IndexedElement]
+    """
+
+    def __init__(self, xml_path: str, elements: List[IndexedElement]):
+        self.xml_path = xml_path
+        self.elements = elements
+        self._by_tag: Dict[str, List[IndexedElement]] = {
+            tag: [] for tag in INDEXED_TAGS
+        }
+        for element in elements:
+            self._by_tag[element.tag].append(element)
+
+    def select(self, tag: str = "image") -> List[IndexedElement]:
+        """Returns indexed elements with the given tag in the order of the file.
+
+        :param tag: tag of the elements, "image" or "track", defaults to "image"
+        :type tag: str, optional
+        :return: list of indexed elements
+        :rtype: List[IndexedElement]
+        """
+        return self._by_tag[tag]
+
+    def count(self, tag: str = "image") -> int:
+        """Returns number of elements with the given tag.
+
+        :param tag: tag of the elements, "image" or "track", defaults to "image"
+        :type tag: str, optional
+        :return: number of elements
+        :rtype: int
+        """
+        return len(self._by_tag[tag])
+
+    def iter_elements(
+        self, tag: str = "image", start: int = 0, stop: Optional[int] = None
+    ) -> Iterator[ET.Element]:
+        """Seeks to the element number start with the given tag and incrementally parses
+        elements up to the element number stop (not included), like slicing of the list.
+        Yielded elements are detached from the tree, so memory usage doesn't depend on the range size.
+
+        :param tag: tag of the elements, "image" or "track", defaults to "image"
+        :type tag: str, optional
+        :param start: index of the first element, defaults to 0
+        :type start: int, optional
+        :param stop: index of the element after the last one, defaults to None (till the end)
+        :type stop: Optional[int], optional
+        :return: iterator over the parsed elements
+        :rtype: Iterator[ET.Element]
+        """
+        selected = self._by_tag[tag][start:stop]
+        if not selected:
+            return
+
+        range_start, range_end = selected[0].start, selected[-1].end
+        parser = ET.XMLPullParser(events=("start", "end"))
+        parser.feed(b"<annotations>")
+        root = None
+        with open(self.xml_path, "rb") as f:
+            f.seek(range_start)
+            remaining = range_end - range_start
+            while remaining > 0:
+                chunk = f.read(min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                if remaining == 0:
+                    chunk += b"</annotations>"
+                parser.feed(chunk)
+                for event, element in parser.read_events():
+                    if root is None:
+                        root = element
+                    elif event == "end" and element.tag == tag:
+                        yield element
+                        root.clear()
+        parser.close()
+
+
+def index_path(xml_path: str) -> str:
+    """Returns path to the index file of the annotations.xml."""
+    return xml_path + INDEX_SUFFIX
+
+
+def load_index(xml_path: str) -> XmlIndex:
+    """Returns the index of the annotations.xml. The index is loaded from the file next to
+    the annotations.xml if it's up to date, otherwise it's built and saved.
+
+    :param xml_path: path to the annotations.xml
+    :type xml_path: str
+    :return: index of the file
+    :rtype: XmlIndex
+    """
+    stat = os.stat(xml_path)
+    try:
+        with open(index_path(xml_path), "r") as f:
+            data = json.load(f)
+        if (
+            data["version"] == INDEX_VERSION
+            and data["xml_size"] == stat.st_size
+            and data["xml_mtime_ns"] == stat.st_mtime_ns
+        ):
+            elements = [
+                IndexedElement(*item[:5], tuple(item[5]) if item[5] else None)
+                for item in data["elements"]
+            ]
+            return XmlIndex(xml_path, elements)
+        sly.logger.debug(f"Index of {xml_path} is outdated, it will be rebuilt.")
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    index = build_index(xml_path)
+    save_index(index, stat)
+    return index
+
+
+def save_index(index: XmlIndex, stat: Optional[os.stat_result] = None) -> str:
+    """Saves the index to the file next to the annotations.xml.
+
+    :param index: index of the file
+    :type index: XmlIndex
+    :param stat: stat of the annotations.xml at the moment of indexing, defaults to None (current stat)
+    :type stat: Optional[os.stat_result], optional
+    :return: path to the saved index
+    :rtype: str
+    """
+    stat = stat or os.stat(index.xml_path)
+    path = index_path(index.xml_path)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(
+            {
+                "version": INDEX_VERSION,
+                "xml_size": stat.st_size,
+                "xml_mtime_ns": stat.st_mtime_ns,
+                "elements": [list(element) for element in index.elements],
+            },
+            f,
+        )
+    os.replace(temp_path, path)
+    return path
+
+
+def build_index(xml_path: str) -> XmlIndex:
+    """Makes one pass over the bytes of annotations.xml without parsing it and records
+    byte offsets, IDs, names and sizes of all top-level <image> and <track> elements.
+
+    :param xml_path: path to the annotations.xml
+    :type xml_path: str
+    :return: index of the file
+    :rtype: XmlIndex
+    """
+    elements = []
+    if os.path.getsize(xml_path) == 0:
+        return XmlIndex(xml_path, elements)
+
+    with open(xml_path, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        position = 0
+        while True:
+            match = _START_TAG.search(data, position)
+            if match is None:
+                break
+
+            tag = match.group(1).decode()
+            attributes = {
+                key.decode(): unescape(value.decode("utf-8"), {"&quot;": '"'})
+                for key, value in _ATTRIBUTE.findall(match.group(2))
+            }
+            if match.group(2).rstrip().endswith(b"/"):
+                end = match.end()
+            else:
+                closing_tag = f"</{tag}>".encode()
+                end = data.find(closing_tag, match.end())
+                if end == -1:
+                    raise ValueError(
+                        f"Closing tag for <{tag}> at byte {match.start()} was not found in {xml_path}."
+                    )
+                end += len(closing_tag)
+
+            size = None
+            if "height" in attributes and "width" in attributes:
+                size = (int(attributes["height"]), int(attributes["width"]))
+            elements.append(
+                IndexedElement(
+                    tag=tag,
+                    start=match.start(),
+                    end=end,
+                    id=int(attributes["id"]) if "id" in attributes else None,
+                    name=attributes.get("name", attributes.get("label")),
+                    size=size,
+                )
+            )
+            position = end
+
+    sly.logger.debug(f"Indexed {len(elements)} elements in {xml_path}.")
+    return XmlIndex(xml_path, elements)
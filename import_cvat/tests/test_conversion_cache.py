@@ -0,0 +1,51 @@
+import os
+
+from import_cvat.src.conversion_cache import ConversionCache
+
+# * Random payload, so the compressed batch takes ~1 KB.
+BATCH = [{"name": "image.jpg", "annotation": {"objects": [os.urandom(600).hex()]}}]
+
+
+def _write_xml(tmp_path, name: str) -> str:
+    path = os.path.join(tmp_path, name)
+    with open(path, "w") as f:
+        f.write(f"<annotations><image name='{name}'/></annotations>")
+    return path
+
+
+def _save_task(cache: ConversionCache, xml_path: str, mtime: float):
+    entry = cache.entry(xml_path, batch_size=1)
+    entry.save_batch(0, BATCH)
+    entry.mark_complete(1)
+    os.utime(entry.entry_dir, (mtime, mtime))
+    return entry
+
+
+def test_least_recently_used_entry_is_evicted_on_close(tmp_path):
+    cache_dir = os.path.join(tmp_path, "cache")
+    cache = ConversionCache(cache_dir, "1", max_bytes=1500)
+
+    old_entry = _save_task(cache, _write_xml(tmp_path, "old.xml"), mtime=1)
+    old_entry.close()
+    assert old_entry.validate()
+
+    new_entry = _save_task(cache, _write_xml(tmp_path, "new.xml"), mtime=2)
+    # * Open entries are never evicted.
+    assert old_entry.validate()
+    new_entry.close()
+
+    assert not os.path.exists(old_entry.entry_dir)
+    assert new_entry.validate()
+    assert cache.evictions == 1
+
+
+def test_open_entry_is_not_evicted(tmp_path):
+    cache_dir = os.path.join(tmp_path, "cache")
+    cache = ConversionCache(cache_dir, "1", max_bytes=1500)
+
+    open_entry = _save_task(cache, _write_xml(tmp_path, "open.xml"), mtime=1)
+    closed_entry = _save_task(cache, _write_xml(tmp_path, "closed.xml"), mtime=2)
+    closed_entry.close()
+
+    assert open_entry.validate()
+    assert not os.path.exists(closed_entry.entry_dir)
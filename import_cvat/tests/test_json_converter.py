@@ -0,0 +1,154 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+import supervisely as sly
+
+from import_cvat.src.converters import (
+    collect_project_meta,
+    convert_images_annotations,
+    convert_images_annotations_json,
+    create_image_annotation,
+    prepare_images_json_for_upload,
+)
+
+# * Task with all geometries: boxes, polygons and polylines, points, masks and skeletons
+# * (converted with CONVERT_MAP by both paths) and tags. Coordinates are fractional,
+# * as they are in the exports from CVAT.
+ANNOTATIONS_XML = """
+<annotations>
+  <image id="0" name="mixed.jpg" width="40" height="30">
+    <tag label="daytime" source="manual"></tag>
+    <tag label="street" source="manual"></tag>
+    <box label="car" occluded="0" xtl="1.4" ytl="2.6" xbr="20.2" ybr="15.9" z_order="0"></box>
+    <polygon label="road" occluded="0" points="0.5,29.1;39.0,29.0;20.7,10.3" z_order="0"></polygon>
+    <polyline label="lane" occluded="0" points="3.0,4.0;5.5,6.5;7.9,8.1" z_order="0"></polyline>
+    <points label="light" occluded="0" points="10.0,11.0;12.6,13.2" z_order="0"></points>
+    <cuboid label="box" occluded="0" xtl1="1.0" ytl1="2.0" xbl1="1.0" ybl1="8.0" xtr1="6.0" ytr1="2.0"
+      xbr1="6.0" ybr1="8.0" xtl2="3.0" ytl2="1.0" xbl2="3.0" ybl2="7.0" xtr2="8.0" ytr2="1.0" xbr2="8.0"
+      ybr2="7.0" z_order="0"></cuboid>
+    <mask label="person" occluded="0" rle="2, 4, 1, 5" left="5" top="6" width="4" height="3" z_order="0">
+    </mask>
+    <skeleton label="pose" z_order="0">
+      <points label="neck" outside="0" occluded="0" points="15.2,12.8"></points>
+      <points label="head" outside="0" occluded="0" points="15.0,9.5"></points>
+    </skeleton>
+  </image>
+  <image id="1" name="boxes.jpg" width="40" height="30">
+    <box label="car" occluded="0" xtl="0" ytl="0" xbr="39.99" ybr="29.99" z_order="0"></box>
+    <box label="truck" occluded="0" xtl="5.5" ytl="5.5" xbr="9.5" ybr="9.5" z_order="0"></box>
+    <points label="light" occluded="0" points="1.0,2.0" z_order="0"></points>
+  </image>
+  <image id="2" name="empty.jpg" width="40" height="30">
+  </image>
+</annotations>
+"""
+
+
+@pytest.fixture
+def images_et():
+    return ET.fromstring(ANNOTATIONS_XML).findall("image")
+
+
+@pytest.fixture
+def images_paths(images_et):
+    return [f"/images/{image_et.attrib['name']}" for image_et in images_et]
+
+
+def test_labels_json_equal_to_labels(images_et, images_paths):
+    tags, image_objects = convert_images_annotations(images_et, images_paths)
+    tags_json, image_objects_json, _ = convert_images_annotations_json(
+        images_et, images_paths
+    )
+
+    assert len(image_objects_json) == len(image_objects)
+    for image_object, image_object_json in zip(image_objects, image_objects_json):
+        labels = image_object.labels.to_labels()
+        assert image_object_json.name == image_object.name
+        assert image_object_json.size == image_object.size
+        assert image_object_json.labels == [label.to_json() for label in labels]
+
+    assert tags_json.keys() == tags.keys()
+    for image_name, image_tags in tags.items():
+        assert [tag.to_json() for tag in tags_json[image_name]] == [
+            tag.to_json() for tag in image_tags
+        ]
+
+
+def test_obj_classes_equal_to_labels_classes(images_et, images_paths):
+    _, image_objects = convert_images_annotations(images_et, images_paths)
+    _, _, obj_classes = convert_images_annotations_json(images_et, images_paths)
+
+    def class_json(obj_class: sly.ObjClass) -> dict:
+        # * Colors of the new classes are random.
+        obj_class_json = obj_class.to_json()
+        obj_class_json.pop("color")
+        return obj_class_json
+
+    expected = {}
+    for image_object in image_objects:
+        for label in image_object.labels.to_labels():
+            expected.setdefault(label.obj_class.name, class_json(label.obj_class))
+
+    assert {
+        obj_class.name: class_json(obj_class) for obj_class in obj_classes
+    } == expected
+
+
+def test_collected_meta_equal_to_labels_meta(images_et, images_paths, tmp_path):
+    tags, image_objects = convert_images_annotations(images_et, images_paths)
+    annotations_xml_path = tmp_path / "annotations.xml"
+    annotations_xml_path.write_text(ANNOTATIONS_XML)
+
+    project_meta = collect_project_meta([str(annotations_xml_path)])
+
+    def class_json(obj_class: sly.ObjClass) -> dict:
+        obj_class_json = obj_class.to_json()
+        obj_class_json.pop("color")
+        return obj_class_json
+
+    expected = {}
+    for image_object in image_objects:
+        for label in image_object.labels.to_labels():
+            expected.setdefault(label.obj_class.name, class_json(label.obj_class))
+
+    assert {
+        obj_class.name: class_json(obj_class) for obj_class in project_meta.obj_classes
+    } == expected
+    assert sorted(tag_meta.name for tag_meta in project_meta.tag_metas) == sorted(
+        {tag.meta.name for image_tags in tags.values() for tag in image_tags}
+    )
+
+
+def test_annotations_json_equal_to_annotations(images_et, images_paths):
+    _, image_objects = convert_images_annotations(images_et, images_paths)
+    tags, image_objects_json, obj_classes = convert_images_annotations_json(
+        images_et, images_paths
+    )
+
+    # * The meta already contains all classes with IDs and all tags,
+    # * so the annotations are prepared without requests to the API.
+    class_ids = {obj_class.name: idx for idx, obj_class in enumerate(obj_classes, 1)}
+    tag_metas = {
+        tag.meta.name: tag.meta for tag_list in tags.values() for tag in tag_list
+    }
+    project_meta = sly.ProjectMeta(
+        obj_classes=[
+            obj_class.clone(sly_id=class_ids[obj_class.name])
+            for obj_class in obj_classes
+        ],
+        tag_metas=list(tag_metas.values()),
+    )
+    names, paths, anns_json, meta = prepare_images_json_for_upload(
+        None, image_objects_json, obj_classes, None, project_meta
+    )
+
+    assert meta is project_meta
+    assert names == [image_object.name for image_object in image_objects]
+    assert paths == images_paths
+    for image_object, ann_json in zip(image_objects, anns_json):
+        expected = create_image_annotation(
+            image_object.labels.to_labels(), image_object.size, image_object.name
+        ).to_json()
+        for label_json in expected["objects"]:
+            label_json["classId"] = class_ids[label_json["classTitle"]]
+        assert ann_json == expected
@@ -0,0 +1,16 @@
+from import_cvat.src.metrics import ProgressTracker
+
+
+def test_keyed_total_is_added_once():
+    progress = ProgressTracker("test")
+
+    for _ in range(3):
+        # * The same project is copied again after the error.
+        progress.add_total("tasks", 4, key=1)
+    progress.add_total("tasks", 2, key=2)
+    progress.add_total("images", 10)
+    progress.add_total("images", 10)
+
+    levels = progress.snapshot()["levels"]
+    assert levels["tasks"]["total"] == 6
+    assert levels["images"]["total"] == 20
@@ -0,0 +1,70 @@
+import os
+import signal
+import threading
+import time
+import multiprocessing
+
+import cv2
+import numpy as np
+
+from import_cvat.src.converters import VideoEncoder
+
+# * Timeout of the tests in seconds, spawned processes import supervisely on start.
+TIMEOUT = 120
+
+
+def _write_frames(frames_dir, count: int = 3):
+    os.makedirs(frames_dir, exist_ok=True)
+    image = np.zeros((32, 48, 3), dtype=np.uint8)
+    paths = []
+    for idx in range(count):
+        path = os.path.join(frames_dir, f"{idx:05d}")
+        cv2.imwrite(f"{path}.PNG", image)
+        paths.append(path)
+    return paths
+
+
+def _collect_finished(encoder: VideoEncoder):
+    """Returns results of encoder.finished(wait_all=True) or None, if it doesn't finish in time."""
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.extend(encoder.finished(wait_all=True)), daemon=True
+    )
+    thread.start()
+    thread.join(TIMEOUT)
+    return None if thread.is_alive() else results
+
+
+def test_video_is_encoded(tmp_path):
+    paths = _write_frames(str(tmp_path / "frames"))
+    video_path = str(tmp_path / "video.mp4")
+
+    with VideoEncoder(max_workers=1) as encoder:
+        encoder.submit("task", video_path, paths, (32, 48), context="task")
+        results = _collect_finished(encoder)
+
+    assert results == [("task", None)]
+    assert os.path.getsize(video_path) > 0
+
+
+def test_killed_worker_fails_videos(tmp_path):
+    paths = _write_frames(str(tmp_path / "frames"))
+
+    encoder = VideoEncoder(max_workers=1)
+    encoder.submit("task", str(tmp_path / "video.mp4"), paths, (32, 48), context="task")
+
+    deadline = time.monotonic() + TIMEOUT
+    while not multiprocessing.active_children() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    for process in multiprocessing.active_children():
+        os.kill(process.pid, signal.SIGKILL)
+
+    # * The video of the dead process is returned with the error instead of waiting forever.
+    results = _collect_finished(encoder)
+    encoder.terminate()
+
+    assert results is not None
+    assert len(results) == 1
+    context, error = results[0]
+    assert context == "task"
+    assert error is not None
@@ -0,0 +1,171 @@
+import os
+import shutil
+import hashlib
+import threading
+
+from typing import Dict, Optional
+
+import supervisely as sly
+
+
+class ArchiveCache:
+    """Local cache of downloaded CVAT task archives, which is kept between the runs.
+    Archives are stored under the hash of (CVAT server, task ID, updated date), so the archive
+    of the task is reused until the task is changed in CVAT. The total size of the cache is
+    limited by max_bytes, least recently used archives are evicted first (the modification time
+    of the file is updated on every hit). Archives are hardlinked into the cache and out of it
+    when possible, so the cached copy doesn't take extra space while the task is processed.
+    All methods are thread-safe.
+
+    :param cache_dir: directory, where cached archives will be stored
+    :type cache_dir: str
+    :param max_bytes: maximum total size of the cached archives in bytes, 0 disables the cache
+    :type max_bytes: int
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = max_bytes > 0
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.enabled:
+            sly.fs.mkdir(cache_dir)
+
+    @staticmethod
+    def key(server_address: str, task_id: int, updated_date: str) -> str:
+        """Returns the key of the task archive in the cache.
+
+        :param server_address: address of the CVAT server
+        :type server_address: str
+        :param task_id: ID of the task in CVAT
+        :type task_id: int
+        :param updated_date: date of the last update of the task in CVAT
+        :type updated_date: str
+        :return: key of the task archive
+        :rtype: str
+        """
+        source = f"{server_address.rstrip('/')}|{task_id}|{updated_date}"
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, task_path: str) -> bool:
+        """Places the cached archive with the given key to the task_path.
+        Returns True on a cache hit, False if the archive is not in the cache.
+
+        :param key: key of the task archive, see ArchiveCache.key
+        :type key: str
+        :param task_path: path, where the archive should be placed
+        :type task_path: str
+        :return: True if the archive was found in the cache, False otherwise
+        :rtype: bool
+        """
+        if not self.enabled:
+            return False
+
+        cached_path = self._path(key)
+        with self._lock:
+            if not os.path.isfile(cached_path) or os.path.getsize(cached_path) == 0:
+                self.misses += 1
+                return False
+
+            os.utime(cached_path)
+            _link_or_copy(cached_path, task_path)
+            self.hits += 1
+
+        sly.logger.debug(f"Archive cache hit for {task_path}.")
+        return True
+
+    def put(self, key: str, task_path: str) -> None:
+        """Saves the downloaded archive to the cache and evicts least recently used archives,
+        if the size of the cache exceeds the limit. Archives larger than the limit are not cached.
+
+        :param key: key of the task archive, see ArchiveCache.key
+        :type key: str
+        :param task_path: path to the downloaded archive
+        :type task_path: str
+        """
+        if not self.enabled:
+            return
+
+        if os.path.getsize(task_path) > self.max_bytes:
+            sly.logger.debug(
+                f"Archive {task_path} is larger than the cache limit, it will not be cached."
+            )
+            return
+
+        cached_path = self._path(key)
+        temp_path = f"{cached_path}.tmp"
+        with self._lock:
+            # * Linking through the temporary file, so the cache never contains a partial archive.
+            _link_or_copy(task_path, temp_path)
+            os.replace(temp_path, cached_path)
+            self._evict(keep=cached_path)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns statistics of the cache: hits, misses, evictions, number and size of cached archives.
+
+        :return: statistics of the cache
+        :rtype: Dict[str, int]
+        """
+        with self._lock:
+            entries = self._entries()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "archives": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+            }
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.zip")
+
+    def _entries(self):
+        """Returns list of (path, size, modification time) for each cached archive."""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".zip"):
+                stat = entry.stat()
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Removes least recently used archives until the size of the cache fits the limit.
+        Must be called with the lock acquired.
+
+        :param keep: path to the archive, which must not be evicted, defaults to None
+        :type keep: Optional[str], optional
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            sly.fs.silent_remove(path)
+            total -= size
+            self.evictions += 1
+            sly.logger.debug(f"Evicted archive {path} from the cache.")
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    """Hardlinks src to dst, copies the file if hardlinks are not supported
+    (e.g. directories are on different file systems). Existing dst is replaced.
+
+    :param src: path to the source file
+    :type src: str
+    :param dst: path to the destination file
+    :type dst: str
+    """
+    sly.fs.silent_remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
@@ -0,0 +1,91 @@
+import threading
+
+from typing import Callable, List, Optional
+
+import supervisely as sly
+
+
+class OperationCancelled(Exception):
+    """Raised by the long operations, when the cancellation token is cancelled."""
+
+
+class CancellationToken:
+    """Cooperative cancellation of the copying, which is shared by all threads working on it.
+    Long operations check the token at the boundaries of their chunks (blocks of the downloaded
+    stream, members of the archive, batches of images, chunks of video annotations) and raise
+    OperationCancelled, so the in-flight work stops within seconds and not at the end of the task.
+    Callbacks registered with on_cancel are called once on cancellation, e.g. to terminate
+    the processes of the video encoder. All methods are thread-safe.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        """Returns True if the token is cancelled."""
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "Cancelled") -> None:
+        """Cancels the token and calls the registered callbacks.
+        Repeated calls have no effect.
+
+        :param reason: reason of the cancellation, used in the logs and errors
+        :type reason: str, optional
+        """
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        sly.logger.info(f"Cancellation requested: {reason}.")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                sly.logger.warning(f"Cancellation callback failed: {repr(e)}")
+
+    def raise_if_cancelled(self) -> None:
+        """Raises OperationCancelled if the token is cancelled.
+
+        :raises OperationCancelled: if the token is cancelled
+        """
+        if self._event.is_set():
+            raise OperationCancelled(self.reason)
+
+    def wait(self, timeout: float) -> bool:
+        """Sleeps for the given time or until the token is cancelled,
+        replaces time.sleep in the retry loops.
+
+        :param timeout: time to sleep in seconds
+        :type timeout: float
+        :return: True if the token was cancelled
+        :rtype: bool
+        """
+        return self._event.wait(timeout)
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Registers the callback, which is called on cancellation. If the token is already
+        cancelled, the callback is called immediately.
+
+        :param callback: function without arguments
+        :type callback: Callable[[], None]
+        :return: function, which unregisters the callback
+        :rtype: Callable[[], None]
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+        callback()
+        return lambda: None
+
+    def _remove_callback(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
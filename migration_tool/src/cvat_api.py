@@ -1,5 +1,8 @@
 import io
-from typing import Dict, Generator, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+from typing import Dict, Generator, List, Optional, Tuple
 from collections import namedtuple
 import supervisely as sly
 from cvat_sdk.api_client import Configuration, ApiClient, exceptions
@@ -19,6 +22,7 @@ CVATData = namedtuple(
         "owner_username",
         "labels_count",
         "url",
+        "updated_date",
     ],
 )
 
@@ -70,6 +74,107 @@ def check_connection() -> bool:
     return True
 
 
+class ListingCache:
+    """Cache of CVAT listings (projects and tasks of the projects) with time-to-live,
+    so the UI steps and the copying read the same listing from CVAT API only once.
+    Listings are keyed by the CVAT server, the user and the project ID (None for projects).
+    Concurrent requests of the same listing (e.g. prefetch and copying) make only one request
+    to CVAT API, failed requests are not cached. All methods are thread-safe.
+
+    :param ttl: time-to-live of the listing in seconds, 0 disables the cache
+    :type ttl: float
+    :param prefetch_workers: number of threads, which prefetch listings, defaults to 4
+    :type prefetch_workers: int, optional
+    """
+
+    def __init__(self, ttl: float, prefetch_workers: int = 4):
+        self.ttl = ttl
+        self.prefetch_workers = prefetch_workers
+
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple, Tuple[float, List[CVATData]]] = {}
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+        self._executor = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, project_id: Optional[int] = None) -> List[CVATData]:
+        """Returns the listing from the cache or lists it from CVAT API, if it's not cached or expired.
+
+        :param project_id: ID of the project to list its tasks, defaults to None (list projects)
+        :type project_id: Optional[int], optional
+        :return: list of CVATData objects, empty if the request failed
+        :rtype: List[CVATData]
+        """
+        key = self._key(project_id)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # * Only one thread lists the same data, others wait for the result.
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > monotonic():
+                    self.hits += 1
+                    return entry[1]
+                self.misses += 1
+
+            entities = _list_cvat_data(project_id)
+            if entities is None:
+                return []
+            if self.ttl > 0:
+                with self._lock:
+                    self._entries[key] = (monotonic() + self.ttl, entities)
+            return entities
+
+    def prefetch(self, project_ids: List[int]) -> None:
+        """Lists tasks of the projects in the background threads, while the user is working with the UI.
+        Listings, which are already cached, are not requested again.
+
+        :param project_ids: IDs of the projects to prefetch their tasks
+        :type project_ids: List[int]
+        """
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.prefetch_workers,
+                    thread_name_prefix="cvat_prefetch",
+                )
+            now = monotonic()
+            project_ids = [
+                project_id
+                for project_id in project_ids
+                if self._entries.get(self._key(project_id), (0,))[0] <= now
+            ]
+        for project_id in project_ids:
+            self._executor.submit(self.get, project_id)
+        if project_ids:
+            sly.logger.debug(f"Prefetching tasks of CVAT projects: {project_ids}.")
+
+    def invalidate(self, project_id: Optional[int] = None) -> None:
+        """Removes the listing of the project's tasks from the cache,
+        or all listings, if project_id is None.
+
+        :param project_id: ID of the project, defaults to None (all listings)
+        :type project_id: Optional[int], optional
+        """
+        with self._lock:
+            if project_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self._key(project_id), None)
+        sly.logger.debug(f"Invalidated CVAT listings cache for project {project_id}.")
+
+    @staticmethod
+    def _key(project_id: Optional[int]) -> Tuple:
+        return (g.STATE.cvat_server_address, g.STATE.cvat_username, project_id)
+
+
+listing_cache = ListingCache(g.CVAT_LISTING_TTL)
+
+
 def cvat_data(**kwargs) -> Generator[CVATData, None, None]:
     """Generator that yields CVATData objects for projects or tasks from CVAT API.
     Each yielded object is a namedtuple with the following fields:
@@ -80,20 +185,34 @@ def cvat_data(**kwargs) -> Generator[CVATData, None, None]:
         - owner_username: str (username of the owner of the project or task)
         - labels_count: int (number of labels in the project or task)
         - url: str (url of the project or task)
+        - updated_date: str (date of the last update of the project or task)
 
     If no kwargs are passed, the generator yields projects data.
     If kwargs contain project_id, the generator yields tasks data for the given project_id.
+    Listings are read through the listing_cache, so CVAT API is requested only once
+    per g.CVAT_LISTING_TTL seconds for the same listing.
 
     :yield: CVATData objects, representing projects or tasks from CVAT API
     :rtype: Generator[CVATData, None, None]
     """
-    if not kwargs:
-        # If no kwargs are passed, yield projects data.
+    yield from listing_cache.get(kwargs.get("project_id"))
+
+
+def _list_cvat_data(project_id: Optional[int] = None) -> Optional[List[CVATData]]:
+    """Lists projects or tasks of the project from CVAT API, see cvat_data.
+
+    :param project_id: ID of the project to list its tasks, defaults to None (list projects)
+    :type project_id: Optional[int], optional
+    :return: list of CVATData objects or None if the request failed
+    :rtype: Optional[List[CVATData]]
+    """
+    if project_id is None:
+        # If project_id is not passed, list projects data.
         method = "projects_api.list()"
         entity = "project"
-    if kwargs.get("project_id"):
-        # If project_id is passed, yield tasks data for the given project_id.
-        method = f"tasks_api.list(project_id={kwargs['project_id']})"
+    else:
+        # If project_id is passed, list tasks data for the given project_id.
+        method = f"tasks_api.list(project_id={project_id})"
         entity = "task"
 
     sly.logger.debug(f"Will try to retreive {method} from CVAT API.")
@@ -103,7 +222,10 @@ def cvat_data(**kwargs) -> Generator[CVATData, None, None]:
             (data, response) = eval(f"api_client.{method}")
         except exceptions.ApiException as e:
             sly.logger.error(f"Exception when calling CVAT API projects_api.list: {e}")
-            return
+            return None
+
+    if g.STATE.metrics is not None:
+        g.STATE.metrics.count("cvat_api_calls")
 
     # Unused data for debugging purposes.
     # Can be used to check the structure of the data returned by CVAT API
@@ -115,8 +237,9 @@ def cvat_data(**kwargs) -> Generator[CVATData, None, None]:
     results = data.get("results")
     if not results:
         sly.logger.debug("API reponsed with no data entries.")
-        return
+        return []
 
+    entities = []
     for result in results:
         try:
             # To avoid AttributeError if the result doesn't have the field
@@ -138,31 +261,40 @@ def cvat_data(**kwargs) -> Generator[CVATData, None, None]:
 
         data_type = result.get("data_original_chunk_type")
 
-        yield CVATData(
-            entity=entity,
-            data_type=data_type,
-            id=result.get("id"),
-            name=result.get("name"),
-            status=result.get("status"),
-            owner_username=owner_username,
-            labels_count=labels_count,
-            url=url,
+        entities.append(
+            CVATData(
+                entity=entity,
+                data_type=data_type,
+                id=result.get("id"),
+                name=result.get("name"),
+                status=result.get("status"),
+                owner_username=owner_username,
+                labels_count=labels_count,
+                url=url,
+                updated_date=str(result.get("updated_date")),
+            )
         )
 
+    return entities
+
 
-def retreive_dataset(task_id: int) -> io.BufferedReader:
+def retreive_dataset(
+    task_id: int, export_format: str = "CVAT for images 1.1"
+) -> io.BufferedReader:
     """Retreives the dataset from CVAT API for the given task_id and returns it as a bytes stream,
     which can be used to save the dataset to the disk.
 
     :param task_id: id of the task to retreive the dataset from CVAT API
     :type task_id: int
+    :param export_format: name of the CVAT export format, defaults to "CVAT for images 1.1"
+    :type export_format: str, optional
     :return: bytes stream with the dataset
     :rtype: io.BufferedReader
     """
     with ApiClient(get_configuration()) as api_client:
         try:
             (data, response) = api_client.tasks_api.retrieve_dataset(
-                format="CVAT for images 1.1",
+                format=export_format,
                 id=task_id,
                 action="download",
             )
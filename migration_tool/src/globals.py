@@ -1,10 +1,14 @@
 import os
+import threading
 
 from collections import namedtuple
 import supervisely as sly
 
 from dotenv import load_dotenv
 
+from import_cvat.src.conversion_cache import ConversionCache
+from import_cvat.src.converters import CONVERTER_VERSION
+
 ABSOLUTE_PATH = os.path.dirname(os.path.abspath(__file__))
 PARENT_DIR = os.path.dirname(ABSOLUTE_PATH)
 sly.logger.debug(f"Absolute path: {ABSOLUTE_PATH}, parent dir: {PARENT_DIR}")
@@ -40,6 +44,90 @@ sly.fs.mkdir(ARCHIVE_DIR, remove_content_if_exists=True)
 sly.fs.mkdir(UNPACKED_DIR, remove_content_if_exists=True)
 sly.logger.debug(f"Archive dir: {ARCHIVE_DIR}, unpacked dir: {UNPACKED_DIR}")
 
+# * Directory, where JSON and Prometheus summaries of the copying will be saved.
+# It's not cleaned on start, so metrics of the previous runs are kept.
+METRICS_DIR = os.path.join(SLY_APP_DATA_DIR, "metrics")
+sly.logger.debug(f"Metrics dir: {METRICS_DIR}")
+
+# * Directory for the cache of downloaded CVAT archives, it's kept between the runs,
+# so tasks, which were not changed in CVAT, are not exported and downloaded again.
+# The size limit is set with ARCHIVE_CACHE_MB in the environment, 0 disables the cache.
+ARCHIVE_CACHE_DIR = os.path.join(SLY_APP_DATA_DIR, "archive_cache")
+ARCHIVE_CACHE_MB = int(os.getenv("ARCHIVE_CACHE_MB", "10240"))
+sly.logger.debug(
+    f"Archive cache dir: {ARCHIVE_CACHE_DIR}, size limit: {ARCHIVE_CACHE_MB} MB"
+)
+
+# * Opt-in timeline of the copying stages in Chrome trace-event format.
+# To enable set TRACE_PIPELINE=1 in the environment, the trace will be saved to METRICS_DIR.
+TRACE_PIPELINE = os.getenv("TRACE_PIPELINE", "").lower() in ("1", "true")
+TRACE_PATH = os.path.join(METRICS_DIR, "migration_tool_trace.json")
+sly.logger.debug(f"Trace pipeline: {TRACE_PIPELINE}")
+
+# * Cache of converted annotations of images tasks, it's kept between the runs,
+# so if only the upload fails, the next run doesn't parse and convert the same annotations.xml again.
+# To disable set CONVERSION_CACHE=0 in the environment.
+# The size limit is set with CONVERSION_CACHE_MB in the environment, least recently used entries are evicted.
+CONVERSION_CACHE_DIR = os.path.join(SLY_APP_DATA_DIR, "conversion_cache")
+CONVERSION_CACHE_MB = int(os.getenv("CONVERSION_CACHE_MB", "2048"))
+CONVERSION_CACHE = None
+if os.getenv("CONVERSION_CACHE", "1").lower() in ("1", "true"):
+    CONVERSION_CACHE = ConversionCache(
+        CONVERSION_CACHE_DIR, CONVERTER_VERSION, CONVERSION_CACHE_MB * 1024 * 1024
+    )
+sly.logger.debug(
+    f"Conversion cache: {CONVERSION_CACHE is not None}, dir: {CONVERSION_CACHE_DIR}, "
+    f"size limit: {CONVERSION_CACHE_MB} MB"
+)
+
+# * Opt-in fast converter for images tasks, which builds annotations directly in JSON format
+# without Supervisely Label and Annotation objects. To enable set FAST_CONVERTER=1 in the environment.
+FAST_CONVERTER = os.getenv("FAST_CONVERTER", "").lower() in ("1", "true")
+sly.logger.debug(f"Fast converter: {FAST_CONVERTER}")
+
+# * Queue of the projects to copy, which is shared by several instances of the application.
+# To copy projects with several workers set WORK_QUEUE_PATH to the SQLite file on the shared
+# storage (e.g. NFS) and select the same projects in each instance, every project will be copied
+# by one of them. By default the queue is kept in memory and used only by this instance.
+# If the worker dies, its project is taken by another worker after WORK_LEASE_SECONDS,
+# each project is tried at most WORK_MAX_ATTEMPTS times.
+# Units of the queue belong to the run, instances of one run must set the same WORK_RUN_ID.
+# The run with the same ID is resumed: projects, which are done or failed in it, are not copied again.
+# If WORK_RUN_ID is not set, each start of the copying is a new run.
+WORK_QUEUE_PATH = os.getenv("WORK_QUEUE_PATH", ":memory:")
+WORK_LEASE_SECONDS = int(os.getenv("WORK_LEASE_SECONDS", "600"))
+WORK_MAX_ATTEMPTS = int(os.getenv("WORK_MAX_ATTEMPTS", "3"))
+WORK_RUN_ID = os.getenv("WORK_RUN_ID") or None
+sly.logger.debug(
+    f"Work queue: {WORK_QUEUE_PATH}, lease: {WORK_LEASE_SECONDS} s, max attempts: {WORK_MAX_ATTEMPTS}, "
+    f"run: {WORK_RUN_ID}"
+)
+
+# * Number of CVAT projects, which are copied in parallel threads, set PROJECT_WORKERS=1
+# to copy projects one by one. Downloads of task archives from CVAT and uploads of tasks
+# to Supervisely are limited globally (for all projects) by MAX_CONCURRENT_DOWNLOADS
+# and MAX_CONCURRENT_UPLOADS, so parallel projects don't overload the servers.
+PROJECT_WORKERS = max(1, int(os.getenv("PROJECT_WORKERS", "4")))
+MAX_CONCURRENT_DOWNLOADS = max(1, int(os.getenv("MAX_CONCURRENT_DOWNLOADS", "4")))
+MAX_CONCURRENT_UPLOADS = max(1, int(os.getenv("MAX_CONCURRENT_UPLOADS", "4")))
+DOWNLOAD_SLOTS = threading.BoundedSemaphore(MAX_CONCURRENT_DOWNLOADS)
+UPLOAD_SLOTS = threading.BoundedSemaphore(MAX_CONCURRENT_UPLOADS)
+sly.logger.debug(
+    f"Project workers: {PROJECT_WORKERS}, max concurrent downloads: {MAX_CONCURRENT_DOWNLOADS}, "
+    f"max concurrent uploads: {MAX_CONCURRENT_UPLOADS}"
+)
+
+# * Maximum number of pushes of the projects table to the UI per second,
+# changes of the cells between the pushes are sent together.
+TABLE_PUSHES_PER_SECOND = float(os.getenv("TABLE_PUSHES_PER_SECOND", "2"))
+sly.logger.debug(f"Table pushes per second: {TABLE_PUSHES_PER_SECOND}")
+
+# * Time-to-live in seconds of the cached listings of CVAT projects and tasks, so the UI steps
+# and the copying don't list the same projects again. Changes in CVAT, which were made after
+# the listing, are seen after this time or after reconnection. Set CVAT_LISTING_TTL=0 to disable.
+CVAT_LISTING_TTL = float(os.getenv("CVAT_LISTING_TTL", "600"))
+sly.logger.debug(f"CVAT listing TTL: {CVAT_LISTING_TTL} s")
+
 
 class State:
     def __init__(self):
@@ -62,9 +150,13 @@ class State:
         # Example: [1, 2, 3]
         self.selected_projects = None
 
-        # Will be set to False if the cancel button will be pressed.
-        # Sets to True on every click on the "Copy" button.
-        self.continue_copying = True
+        # CancellationToken of the current copying, it's cancelled by the "Stop" button.
+        # Recreated on every click on the "Copy" button.
+        self.cancel_token = None
+
+        # RunMetrics object with timings and counters of the current copying.
+        # Recreated on every click on the "Copy" button.
+        self.metrics = None
 
     def clear_cvat_credentials(self):
         """Clears the CVAT credentials and sets them to None."""
@@ -109,8 +201,16 @@ sly.logger.debug(f"Path to the local cvat.env file: {CVAT_ENV_FILE}")
 CVAT_ENV_TEAMFILES = sly.env.file(raise_not_found=False)
 sly.logger.debug(f"Path to the TeamFiles from environment: {CVAT_ENV_TEAMFILES}")
 
-CopyingStatus = namedtuple("CopyingStatus", ["copied", "error", "waiting", "working"])
-COPYING_STATUS = CopyingStatus("✅ Copied", "❌ Error", "⏳ Waiting", "🔄 Working")
+CopyingStatus = namedtuple(
+    "CopyingStatus", ["copied", "error", "waiting", "working", "cancelled"]
+)
+COPYING_STATUS = CopyingStatus(
+    "✅ Copied", "❌ Error", "⏳ Waiting", "🔄 Working", "⏹ Cancelled"
+)
+
+# * Formats, which are used to export CVAT tasks by their data type.
+# Video tasks are exported with tracks, so each tracked object becomes one VideoObject in Supervisely.
+EXPORT_FORMATS = {"imageset": "CVAT for images 1.1", "video": "CVAT for video 1.1"}
 
 if CVAT_ENV_TEAMFILES:
     sly.logger.debug(".env file is provided, will try to download it.")
@@ -0,0 +1,150 @@
+import threading
+
+from time import monotonic
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+import supervisely as sly
+from supervisely.app import DataJson
+
+
+class TableUpdater:
+    """Updates cells of the Table widget by the value of the key column without scanning the table.
+    Rows are indexed by the key once (see reindex), cells are changed in place and the changes
+    are pushed to the widget at most max_pushes_per_second times per second, so frequent updates
+    of the same or different cells are coalesced into one push. Changes, which were made after
+    the last push, are pushed by the background timer or by flush. All methods are thread-safe.
+
+    :param table: Table widget to update
+    :type table: sly.app.widgets.Table
+    :param key_column: name of the column with unique values, which identify the rows
+    :type key_column: str
+    :param max_pushes_per_second: maximum number of pushes to the widget per second, defaults to 2
+    :type max_pushes_per_second: float, optional
+    """
+
+    def __init__(
+        self,
+        table: sly.app.widgets.Table,
+        key_column: str,
+        max_pushes_per_second: float = 2,
+    ):
+        self.table = table
+        self.key_column = key_column
+        self.min_push_interval = 1 / max_pushes_per_second
+
+        self._lock = threading.RLock()
+        self._table_data: Dict[str, Any] = {}
+        self._columns: Dict[str, int] = {}
+        self._rows: Dict[Hashable, List[Any]] = {}
+        self._dirty = False
+        self._last_push = float("-inf")
+        self._timer: Optional[threading.Timer] = None
+        self.pushes = 0
+        self.updates = 0
+
+    def reindex(self) -> None:
+        """Builds the index of rows by the key column, must be called after the data
+        of the table is replaced (e.g. with read_json)."""
+        with self._lock:
+            self._table_data = self.table.get_json_data()["table_data"]
+            self._columns = {
+                column: idx for idx, column in enumerate(self._table_data["columns"])
+            }
+            key_idx = self._columns[self.key_column]
+            self._rows = {row[key_idx]: row for row in self._table_data["data"]}
+            self._dirty = False
+
+        sly.logger.debug(f"Indexed {len(self._rows)} rows of the table.")
+
+    def get(self, key: Hashable, column: str) -> Any:
+        """Returns value of the cell in the row with the given key.
+
+        :param key: value of the key column
+        :type key: Hashable
+        :param column: name of the column
+        :type column: str
+        :return: value of the cell or None if the row is not found
+        :rtype: Any
+        """
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                return None
+            return row[self._columns[column]]
+
+    def update(
+        self, key: Hashable, column: str, update_fn: Callable[[Any], Any]
+    ) -> None:
+        """Replaces value of the cell with the result of update_fn(old value) atomically
+        and schedules the push of the changes to the widget.
+
+        :param key: value of the key column
+        :type key: Hashable
+        :param column: name of the column
+        :type column: str
+        :param update_fn: function, which returns the new value of the cell from the old one
+        :type update_fn: Callable[[Any], Any]
+        :raises ValueError: if the row with the given key is not found
+        """
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                raise ValueError(
+                    f'Column "{self.key_column}" does not have value "{key}"'
+                )
+            column_idx = self._columns[column]
+            new_value = update_fn(row[column_idx])
+            if new_value == row[column_idx]:
+                return
+            row[column_idx] = new_value
+            self.updates += 1
+            self._dirty = True
+            self._schedule_push()
+
+    def set(self, key: Hashable, column: str, value: Any) -> None:
+        """Sets value of the cell and schedules the push of the changes to the widget.
+
+        :param key: value of the key column
+        :type key: Hashable
+        :param column: name of the column
+        :type column: str
+        :param value: new value of the cell
+        :type value: Any
+        :raises ValueError: if the row with the given key is not found
+        """
+        self.update(key, column, lambda _: value)
+
+    def flush(self) -> None:
+        """Pushes pending changes to the widget immediately."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._push()
+
+    def _schedule_push(self) -> None:
+        """Pushes the changes now, if the last push was long enough ago,
+        otherwise starts the timer to push them later. Must be called with the lock acquired.
+        """
+        wait = self._last_push + self.min_push_interval - monotonic()
+        if wait <= 0:
+            self._push()
+        elif self._timer is None:
+            self._timer = threading.Timer(wait, self._push_by_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _push_by_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+            self._push()
+
+    def _push(self) -> None:
+        """Sends the changed data of the table to the widget. Must be called with the lock acquired."""
+        if not self._dirty:
+            return
+        self._dirty = False
+        self._last_push = monotonic()
+        self.pushes += 1
+        DataJson()[self.table.widget_id]["table_data"] = self._table_data
+        DataJson().send_changes()
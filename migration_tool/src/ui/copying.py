@@ -1,8 +1,15 @@
 import os
-import shutil
+import threading
+import zipfile
 import supervisely as sly
-from typing import List, Tuple, Union
-from time import sleep
+from typing import Any, Dict, Generator, List, Optional, Tuple, Union
+from contextlib import contextmanager
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
 
 from supervisely.app.widgets import (
     Container,
@@ -15,14 +22,32 @@ from supervisely.app.widgets import (
 )
 import xml.etree.ElementTree as ET
 
-from migration_tool.src.cvat_api import cvat_data, retreive_dataset
+from migration_tool.src.cvat_api import CVATData, cvat_data, retreive_dataset
+from migration_tool.src.archive_cache import ArchiveCache
+from migration_tool.src.cancellation import CancellationToken, OperationCancelled
+from migration_tool.src.table_updater import TableUpdater
+from migration_tool.src.work_queue import (
+    DONE,
+    FAILED,
+    WorkQueue,
+    WorkUnit,
+    new_run_id,
+    worker_name,
+)
+from import_cvat.src.xml_index import load_index
+from import_cvat.src.metrics import ProgressTracker, RunMetrics
+from import_cvat.src.tracing import Tracer
 from import_cvat.src.converters import (
-    convert_images_annotations,
     convert_video_annotations,
-    prepare_images_for_upload,
-    upload_images_task,
+    convert_video_tracks,
+    get_frames_paths,
+    iter_images_et,
+    IMAGES_BATCH_SIZE,
     update_project_meta,
-    images_to_mp4,
+    upload_images_task_batches,
+    upload_video_annotation,
+    VideoEncoder,
+    VideoTask,
 )
 import migration_tool.src.globals as g
 
@@ -40,6 +65,20 @@ COLUMNS = [
 
 projects_table = Table(fixed_cols=3, per_page=20, sort_column_id=1)
 projects_table.hide()
+# * Cells are updated by the index of rows by project ID, changes are pushed to the UI
+# * not more often than g.TABLE_PUSHES_PER_SECOND. Thread-safe, projects are copied in parallel.
+projects_table_updater = TableUpdater(
+    projects_table, "ID", max_pushes_per_second=g.TABLE_PUSHES_PER_SECOND
+)
+
+# * Interval in seconds between refreshes of the progress bars from the progress tracker.
+PROGRESS_REFRESH_SECONDS = 1
+
+# * Size of the blocks, in which task archives are downloaded from CVAT, cancellation is checked between them.
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# * Interval between checks of the work queue, when all remaining projects are leased by other workers.
+WORK_QUEUE_POLL_SECONDS = 5
 
 copy_button = Button("Copy", icon="zmdi zmdi-copy")
 stop_button = Button("Stop", icon="zmdi zmdi-stop", button_type="danger")
@@ -48,6 +87,11 @@ stop_button.hide()
 buttons_flexbox = Flexbox([copy_button, stop_button])
 
 copying_progress = Progress()
+tasks_progress = Progress()
+images_progress = Progress()
+# * Rolling throughput and ETA of the copying.
+progress_text = Text(status="info")
+progress_text.hide()
 good_results = Text(status="success")
 bad_results = Text(status="error")
 good_results.hide()
@@ -57,7 +101,16 @@ card = Card(
     title="3️⃣ Copying",
     description="Copy selected projects from CVAT to Supervisely.",
     content=Container(
-        [projects_table, buttons_flexbox, copying_progress, good_results, bad_results]
+        [
+            projects_table,
+            buttons_flexbox,
+            copying_progress,
+            tasks_progress,
+            images_progress,
+            progress_text,
+            good_results,
+            bad_results,
+        ]
     ),
     collapsable=True,
 )
@@ -98,6 +151,7 @@ def build_projects_table() -> None:
         }
     )
 
+    projects_table_updater.reindex()
     projects_table.loading = False
     projects_table.show()
 
@@ -108,18 +162,24 @@ def build_projects_table() -> None:
 def start_copying() -> None:
     """Main function for copying projects from CVAT to Supervisely.
     1. Starts copying progress, changes state of widgets in UI.
-    2. Iterates over selected projects from CVAT.
-    3. For each project:
-        3.1. Updates the status in the projects table to "Copying...".
+    2. Adds selected projects from CVAT to the work queue and leases them one by one
+        (the queue can be shared by several instances of the application, see g.WORK_QUEUE_PATH).
+        Up to g.PROJECT_WORKERS leased projects are copied in parallel threads.
+    3. For each leased project (see copy_project):
+        3.1. Updates the status in the projects table to "Working" with the number of processed tasks.
         3.2. Iterates over tasks in the project.
         3.3. For each task:
-            3.3.1. Downloads the task data from CVAT API.
-            3.3.2. Saves the task data to the zip archive (using up to 10 retries).
+            3.3.1. Takes the archive from the archive cache, if the task was not changed in CVAT.
+            3.3.2. Otherwise downloads the task data from CVAT API.
+            3.3.3. Saves the task data to the zip archive (using up to 10 retries) and to the archive cache.
         3.4. If the archive is empty after 10 retries, updates the status in the projects table to "Error".
         3.5. Otherwise converts the task data to Supervisely format and uploads it to Supervisely.
         3.6. If the task was uploaded with errors, updates the status in the projects table to "Error".
         3.7. Otherwise updates the status in the projects table to "Copied".
-    4. Updates the status in the projects table to "Copied" or "Error" for each project.
+    4. Updates the status in the projects table to "Copied" or "Error" for each project,
+        projects, which failed with an exception, are returned to the queue until WORK_MAX_ATTEMPTS is reached.
+        When the queue is empty, final statuses of all selected projects are taken from the queue,
+        so projects copied by other workers are shown as well.
     5. Stops copying progress, changes state of widgets in UI.
     6. Shows the results of copying.
     7. Removes content from download and upload directories (if not in development mode).
@@ -131,142 +191,128 @@ def start_copying() -> None:
 
     stop_button.show()
     copy_button.text = "Copying..."
-    g.STATE.continue_copying = True
-
-    def save_task_to_zip(task_id: int, task_path: str, retry: int = 0) -> bool:
-        """Tries to download the task data from CVAT API and save it to the zip archive.
-        Functions tries to download the task data 10 times if the archive is empty and
-        returns False if it can't download the data after 10 retries. Otherwise returns True.
-
-        :param task_id: task ID in CVAT
-        :type task_id: int
-        :param task_path: path for saving task data in zip archive
-        :type task_path: str
-        :param retry: current number of retries, defaults to 0
-        :type retry: int, optional
-        :return: download status (True if the archive is not empty, False otherwise)
-        :rtype: bool
-        """
-        sly.logger.debug("Trying to retreive task data from API...")
-        task_data = retreive_dataset(task_id=task.id)
-
-        with open(task_path, "wb") as f:
-            shutil.copyfileobj(task_data, f)
-
-        sly.logger.info(f"Saved data to path: {task_path}, will check it's size...")
-
-        # Check if the archive has non-zero size.
-        if os.path.getsize(task_path) == 0:
-            sly.logger.debug(f"The archive for task {task_id} is empty, removing it...")
-            sly.fs.silent_remove(task_path)
-            sly.logger.debug(f"The archive with path {task_path} was removed.")
-            sly.logger.info(
-                f"Will retry to download task {task_id}, because the archive is empty."
-            )
-            if retry < 10:
-                # Try to download the task data again.
-                retry += 1
-                timer = 5
-                while timer > 0:
-                    sly.logger.info(f"Retry {retry} in {timer} seconds...")
-                    sleep(1)
-                    timer -= 1
-
-                sly.logger.info(f"Retry {retry} to download task {task_id}...")
-                return save_task_to_zip(task_id, task_path, retry)
-            else:
-                # If the archive is empty after 10 retries, return False.
-                sly.logger.error(f"Can't download task {task_id} after 10 retries.")
-                return False
-        else:
-            sly.logger.debug(f"Archive for task {task_id} was downloaded correctly.")
-            return True
-
-    succesfully_uploaded = 0
-    uploded_with_errors = 0
+    cancel_token = CancellationToken()
+    g.STATE.cancel_token = cancel_token
+
+    tracer = Tracer(enabled=g.TRACE_PIPELINE)
+    progress = ProgressTracker("migration_tool")
+    progress.add_total("projects", len(g.STATE.selected_projects))
+    metrics = RunMetrics("migration_tool", tracer=tracer, progress=progress)
+    metrics.track_api(g.api)
+    metrics.start()
+    g.STATE.metrics = metrics
+
+    # * Metrics and trace are saved and the widgets are restored even if the copying fails,
+    # * so the timings of the failed run are kept and the copying can be started again.
+    try:
+        archive_cache = ArchiveCache(
+            g.ARCHIVE_CACHE_DIR, g.ARCHIVE_CACHE_MB * 1024 * 1024
+        )
 
-    with copying_progress(
-        total=len(g.STATE.selected_projects), message="Copying..."
-    ) as pbar:
+        # * All instances, which share the queue, enqueue their selected projects,
+        # * each instance leases only the projects from its own table.
+        queue = WorkQueue(
+            g.WORK_QUEUE_PATH,
+            lease_seconds=g.WORK_LEASE_SECONDS,
+            max_attempts=g.WORK_MAX_ATTEMPTS,
+        )
+        worker = worker_name()
+        run_id = g.WORK_RUN_ID or new_run_id()
+        project_units = {}
         for project_id in g.STATE.selected_projects:
-            sly.logger.debug(f"Copying project with id: {project_id}")
-            update_cells(project_id, new_status=g.COPYING_STATUS.working)
-
-            task_ids_with_errors = []
-            task_archive_paths = []
+            unit_id = project_unit_id(run_id, project_id)
+            queue.enqueue(
+                unit_id,
+                "project",
+                {"id": project_id, "name": g.STATE.project_names[project_id]},
+            )
+            project_units[unit_id] = project_id
+        unit_ids = list(project_units)
+        sly.logger.info(
+            f"Worker {worker} is using the work queue {g.WORK_QUEUE_PATH}, run {run_id}."
+        )
 
-            for task in cvat_data(project_id=project_id):
-                data_type = task.data_type
+        def count_result(future: Future) -> None:
+            if future.result() is None:
+                # * The project was returned to the queue and will be copied again.
+                return
+            progress.advance("projects")
+
+        # * Projects are copied in parallel threads, the results are counted in the main thread,
+        # * so the counters are never updated concurrently.
+        # * The next project is leased only when one of the threads is free. If the rest of the projects
+        # * are leased by other workers, the queue is checked again for expired leases and retries.
+        with show_progress(progress), ThreadPoolExecutor(
+            max_workers=g.PROJECT_WORKERS, thread_name_prefix="project"
+        ) as executor:
+            in_progress = set()
+            while True:
+                while (
+                    len(in_progress) < g.PROJECT_WORKERS and not cancel_token.cancelled
+                ):
+                    unit = queue.acquire(worker, "project", unit_ids)
+                    if unit is None:
+                        break
+                    in_progress.add(
+                        executor.submit(
+                            copy_project_unit, unit, queue, worker, archive_cache
+                        )
+                    )
 
-                sly.logger.debug(
-                    f"Copying task with id: {task.id}, data type: {data_type}"
-                )
-                if not g.STATE.continue_copying:
-                    sly.logger.debug("Copying is stopped by the user.")
+                if in_progress:
+                    timeout = None
+                    if len(in_progress) < g.PROJECT_WORKERS:
+                        timeout = WORK_QUEUE_POLL_SECONDS
+                    done, in_progress = wait(
+                        in_progress, timeout=timeout, return_when=FIRST_COMPLETED
+                    )
+                    for future in done:
+                        count_result(future)
                     continue
 
-                project_name = g.STATE.project_names[project_id]
-                project_dir = os.path.join(
-                    g.ARCHIVE_DIR, f"{project_id}_{project_name}_{data_type}"
-                )
-                sly.fs.mkdir(project_dir)
-                task_filename = f"{task.id}_{task.name}_{data_type}.zip"
-
-                task_path = os.path.join(project_dir, task_filename)
-                download_status = save_task_to_zip(task.id, task_path)
-                if download_status is False:
-                    task_ids_with_errors.append(task.id)
-                else:
-                    task_archive_paths.append((task_path, data_type))
+                if cancel_token.cancelled or not queue.has_unfinished(
+                    "project", unit_ids
+                ):
+                    break
+                cancel_token.wait(WORK_QUEUE_POLL_SECONDS)
 
-            if not task_archive_paths:
-                sly.logger.warning(
-                    f"No tasks was successfully downloaded for project ID {project_id}. It will be skipped."
-                )
-                new_status = g.COPYING_STATUS.error
-                uploded_with_errors += 1
-            else:
-                upload_status = convert_and_upload(
-                    project_id, project_name, task_archive_paths
-                )
-
-                if task_ids_with_errors:
-                    sly.logger.warning(
-                        f"Project ID {project_id} was downloaded with errors. "
-                        "Task IDs with errors: {task_ids_with_errors}."
-                    )
-                    new_status = g.COPYING_STATUS.error
-                    uploded_with_errors += 1
-                elif not upload_status:
-                    sly.logger.warning(
-                        f"Project ID {project_id} was uploaded with errors."
-                    )
-                    new_status = g.COPYING_STATUS.error
-                    uploded_with_errors += 1
-                else:
-                    sly.logger.info(
-                        f"Project ID {project_id} was downloaded successfully."
-                    )
-                    new_status = g.COPYING_STATUS.copied
-                    succesfully_uploaded += 1
-
-            update_cells(project_id, new_status=new_status)
+        succesfully_uploaded, uploded_with_errors = update_final_statuses(
+            queue, project_units, cancel_token.cancelled
+        )
 
-            sly.logger.info(f"Finished processing project ID {project_id}.")
+        if succesfully_uploaded:
+            good_results.text = f"Succesfully uploaded {succesfully_uploaded} projects."
+            good_results.show()
+        if uploded_with_errors:
+            bad_results.text = f"Uploaded {uploded_with_errors} projects with errors."
+            bad_results.show()
 
-            pbar.update(1)
+        sly.logger.info(f"Finished copying {len(g.STATE.selected_projects)} projects.")
 
-    if succesfully_uploaded:
-        good_results.text = f"Succesfully uploaded {succesfully_uploaded} projects."
-        good_results.show()
-    if uploded_with_errors:
-        bad_results.text = f"Uploaded {uploded_with_errors} projects with errors."
-        bad_results.show()
+        if archive_cache.enabled:
+            cache_stats = archive_cache.stats()
+            metrics.count("archive_cache_evictions", cache_stats["evictions"])
+            sly.logger.info(
+                f"Archive cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                f"{cache_stats['evictions']} evictions, {cache_stats['archives']} archives "
+                f"({cache_stats['bytes'] / 1024 / 1024:.1f} MB) in {g.ARCHIVE_CACHE_DIR}.",
+                extra=cache_stats,
+            )
 
-    copy_button.text = "Copy"
-    stop_button.hide()
+        queue_stats = queue.stats()
+        sly.logger.info(f"Work queue: {queue_stats}.", extra=queue_stats)
+    finally:
+        projects_table_updater.flush()
+        sly.logger.debug(
+            f"Projects table: {projects_table_updater.updates} cell updates "
+            f"in {projects_table_updater.pushes} pushes."
+        )
+        copy_button.text = "Copy"
+        stop_button.hide()
 
-    sly.logger.info(f"Finished copying {len(g.STATE.selected_projects)} projects.")
+        metrics.stop()
+        metrics.dump(g.METRICS_DIR)
+        tracer.dump(g.TRACE_PATH)
 
     if sly.is_development():
         # * For debug purposes it's better to save the data from CVAT.
@@ -289,6 +335,412 @@ def start_copying() -> None:
     app.stop()
 
 
+@contextmanager
+def show_progress(progress: ProgressTracker) -> Generator[None, None, None]:
+    """Context manager, which shows the progress of projects, tasks and images in the progress bars
+    and the rolling throughput with ETA in the text widget. The widgets are refreshed from the tracker
+    in the background thread every PROGRESS_REFRESH_SECONDS, so the copying threads only advance
+    the counters of the tracker and never send changes to the UI themselves.
+
+    :param progress: progress tracker of the copying
+    :type progress: ProgressTracker
+    """
+    stop_event = threading.Event()
+    bars = {
+        "projects": copying_progress(message="Copying projects...", total=None),
+        "tasks": tasks_progress(message="Copying tasks...", total=None),
+        "images": images_progress(message="Uploading images and frames...", total=None),
+    }
+
+    def refresh():
+        snapshot = progress.snapshot()
+        for level, pbar in bars.items():
+            level_progress = snapshot["levels"].get(level)
+            if level_progress is None:
+                continue
+            total = level_progress["total"]
+            if total is not None and total != pbar.total:
+                # * Totals of tasks and images grow while the projects are downloaded,
+                # * the total of the widget is fixed on creation, so it's updated as well.
+                pbar.total = total
+                pbar.fp.total = total
+            if level_progress["done"] > pbar.n:
+                pbar.update(level_progress["done"] - pbar.n)
+            pbar.refresh()
+        progress_text.text = progress.format(snapshot)
+
+    def refresh_loop():
+        while not stop_event.wait(PROGRESS_REFRESH_SECONDS):
+            refresh()
+
+    progress_text.show()
+    thread = threading.Thread(target=refresh_loop, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop_event.set()
+        thread.join()
+        refresh()
+        for pbar in bars.values():
+            pbar.close()
+
+
+def project_unit_id(run_id: str, project_id: int) -> str:
+    """Returns ID of the project in the work queue, which is unique across runs and CVAT servers.
+
+    :param run_id: ID of the run, see g.WORK_RUN_ID
+    :type run_id: str
+    :param project_id: project ID in CVAT
+    :type project_id: int
+    :return: ID of the unit in the work queue
+    :rtype: str
+    """
+    return f"{run_id}:project:{g.STATE.cvat_server_address}:{project_id}"
+
+
+def update_final_statuses(
+    queue: WorkQueue, project_units: Dict[str, int], cancelled: bool
+) -> Tuple[int, int]:
+    """Sets the final copying status of each project in the projects table from the work queue,
+    including the projects, which were copied by other workers.
+
+    :param queue: work queue
+    :type queue: WorkQueue
+    :param project_units: dictionary with IDs of the units as keys and project IDs in CVAT as values
+    :type project_units: Dict[str, int]
+    :param cancelled: True if the copying was stopped by the user
+    :type cancelled: bool
+    :return: number of copied projects and number of projects with errors
+    :rtype: Tuple[int, int]
+    """
+    copied = 0
+    with_errors = 0
+    for unit_id, (status, result) in queue.statuses(list(project_units)).items():
+        if status == DONE:
+            new_status = (result or {}).get("status", g.COPYING_STATUS.copied)
+        elif status == FAILED:
+            new_status = g.COPYING_STATUS.error
+        elif cancelled:
+            # * Not finished projects were returned to the queue on cancellation.
+            new_status = g.COPYING_STATUS.cancelled
+        else:
+            continue
+
+        update_cells(project_units[unit_id], new_status=new_status)
+        if new_status == g.COPYING_STATUS.copied:
+            copied += 1
+        elif new_status == g.COPYING_STATUS.error:
+            with_errors += 1
+    return copied, with_errors
+
+
+def copy_project_unit(
+    unit: WorkUnit, queue: WorkQueue, worker: str, archive_cache: ArchiveCache
+) -> Optional[str]:
+    """Copies the project leased from the work queue (see copy_project), keeps the lease
+    while the project is copied and saves the result to the queue.
+    Runs in one of the PROJECT_WORKERS threads.
+
+    :param unit: leased project unit
+    :type unit: WorkUnit
+    :param queue: work queue
+    :type queue: WorkQueue
+    :param worker: name of the worker, which leased the unit
+    :type worker: str
+    :param archive_cache: cache of downloaded CVAT archives
+    :type archive_cache: ArchiveCache
+    :return: new copying status of the project or None if the project was returned to the queue
+        (after the error, which will be retried, or after the cancellation) or the lease was lost
+    :rtype: Optional[str]
+    """
+    metrics = g.STATE.metrics
+    project_id = unit.payload["id"]
+    project_name = unit.payload["name"]
+    try:
+        with queue.keep_lease(unit, worker):
+            new_status, result = copy_project(
+                project_id, project_name, archive_cache, queue, unit.id
+            )
+    except OperationCancelled:
+        sly.logger.info(f"Copying of the project ID {project_id} was cancelled.")
+        remove_project_files(project_id, project_name)
+        # * The project is returned to the queue as not started, so it will be copied
+        # * by another worker or by the next run.
+        if not queue.release(unit, worker):
+            _log_lost_lease(unit, worker)
+        metrics.count("work_units_cancelled")
+        update_cells(project_id, new_status=g.COPYING_STATUS.cancelled)
+        return None
+    except Exception as e:
+        sly.logger.error(
+            f"Copying of the project ID {project_id} failed: {repr(e)}",
+            exc_info=True,
+        )
+        if not queue.fail(unit, worker, repr(e)):
+            _log_lost_lease(unit, worker)
+            return None
+        metrics.count("work_units_failed")
+        if queue.will_retry(unit):
+            # * The project will be leased again by this or another worker.
+            update_cells(project_id, new_status=g.COPYING_STATUS.waiting)
+            return None
+        new_status = g.COPYING_STATUS.error
+    else:
+        if not queue.complete(unit, worker, result):
+            _log_lost_lease(unit, worker)
+            return None
+        metrics.count("work_units_completed")
+
+    update_cells(project_id, new_status=new_status)
+
+    sly.logger.info(f"Finished processing project ID {project_id}.")
+    return new_status
+
+
+def _log_lost_lease(unit: WorkUnit, worker: str) -> None:
+    """Logs that the lease of the unit was lost, e.g. it expired and the unit was leased
+    by another worker. The result of this worker is ignored, the status of the unit
+    is set by the worker, which holds the lease now."""
+    sly.logger.warning(
+        f"Lease of the unit {unit.id} was lost by the worker {worker}, the result is ignored."
+    )
+
+
+def copy_project(
+    project_id: int,
+    project_name: str,
+    archive_cache: ArchiveCache,
+    queue: WorkQueue,
+    unit_id: str,
+) -> Tuple[str, Dict[str, Any]]:
+    """Downloads all tasks of the project from CVAT, converts them and uploads to Supervisely.
+    Results of the tasks are recorded in the work queue as children of the project unit.
+
+    :param project_id: project ID in CVAT
+    :type project_id: int
+    :param project_name: project name in CVAT
+    :type project_name: str
+    :param archive_cache: cache of downloaded CVAT archives
+    :type archive_cache: ArchiveCache
+    :param queue: work queue, where results of the tasks are recorded
+    :type queue: WorkQueue
+    :param unit_id: ID of the project unit in the work queue
+    :type unit_id: str
+    :return: new copying status of the project and the result of the project unit
+    :rtype: Tuple[str, Dict[str, Any]]
+    :raises OperationCancelled: if the copying was stopped by the user
+    """
+    metrics = g.STATE.metrics
+    with metrics.trace(project_name, "project", project_id=project_id):
+        sly.logger.debug(f"Copying project with id: {project_id}")
+        update_cells(project_id, new_status=g.COPYING_STATUS.working)
+
+        task_ids_with_errors = []
+        task_archive_paths = []
+
+        # * Tasks of the selected projects are usually prefetched while the user is on the selection step.
+        tasks = list(cvat_data(project_id=project_id))
+        # * The project can be copied again after the error, its tasks are counted only once.
+        metrics.progress.add_total("tasks", len(tasks), key=project_id)
+        for task_idx, task in enumerate(tasks):
+            data_type = task.data_type
+            update_cells(
+                project_id,
+                new_status=f"{g.COPYING_STATUS.working} {task_idx}/{len(tasks)} tasks",
+            )
+
+            sly.logger.debug(f"Copying task with id: {task.id}, data type: {data_type}")
+            g.STATE.cancel_token.raise_if_cancelled()
+
+            project_dir = os.path.join(
+                g.ARCHIVE_DIR, f"{project_id}_{project_name}_{data_type}"
+            )
+            sly.fs.mkdir(project_dir)
+            task_filename = f"{task.id}_{task.name}_{data_type}.zip"
+
+            task_path = os.path.join(project_dir, task_filename)
+
+            # * Tasks without updated date are never taken from the cache,
+            # * because it's impossible to check if they were changed.
+            cache_key = None
+            if archive_cache.enabled and task.updated_date != "None":
+                cache_key = ArchiveCache.key(
+                    g.STATE.cvat_server_address, task.id, task.updated_date
+                )
+
+            cache_hit = False
+            if cache_key and archive_cache.get(cache_key, task_path):
+                sly.logger.info(f"Archive for task {task.id} is taken from the cache.")
+                metrics.count("archive_cache_hits")
+                cache_hit = True
+                download_status = True
+            else:
+                if cache_key:
+                    metrics.count("archive_cache_misses")
+                download_status = save_task_to_zip(task, task_path)
+                if download_status and cache_key:
+                    archive_cache.put(cache_key, task_path)
+            if download_status is False:
+                task_ids_with_errors.append(task.id)
+                metrics.progress.advance("tasks")
+            else:
+                task_archive_paths.append((task_path, data_type))
+
+            queue.record(
+                f"{unit_id}/task:{task.id}",
+                "task",
+                unit_id,
+                {"id": task.id, "name": task.name, "data_type": data_type},
+                DONE if download_status else FAILED,
+                {"archive_cache_hit": cache_hit},
+            )
+
+        if not task_archive_paths:
+            sly.logger.warning(
+                f"No tasks was successfully downloaded for project ID {project_id}. It will be skipped."
+            )
+            new_status = g.COPYING_STATUS.error
+        else:
+            upload_status = convert_and_upload(
+                project_id, project_name, task_archive_paths
+            )
+
+            if task_ids_with_errors:
+                sly.logger.warning(
+                    f"Project ID {project_id} was downloaded with errors. "
+                    f"Task IDs with errors: {task_ids_with_errors}."
+                )
+                new_status = g.COPYING_STATUS.error
+            elif not upload_status:
+                sly.logger.warning(f"Project ID {project_id} was uploaded with errors.")
+                new_status = g.COPYING_STATUS.error
+            else:
+                sly.logger.info(f"Project ID {project_id} was downloaded successfully.")
+                new_status = g.COPYING_STATUS.copied
+
+    result = {
+        "status": new_status,
+        "tasks_downloaded": len(task_archive_paths),
+        "task_ids_with_errors": task_ids_with_errors,
+    }
+    return new_status, result
+
+
+def save_task_to_zip(task: CVATData, task_path: str, retry: int = 0) -> bool:
+    """Tries to download the task data from CVAT API and save it to the zip archive.
+    Functions tries to download the task data 10 times if the archive is empty and
+    returns False if it can't download the data after 10 retries. Otherwise returns True.
+
+    :param task: task data from CVAT
+    :type task: CVATData
+    :param task_path: path for saving task data in zip archive
+    :type task_path: str
+    :param retry: current number of retries, defaults to 0
+    :type retry: int, optional
+    :return: download status (True if the archive is not empty, False otherwise)
+    :rtype: bool
+    :raises OperationCancelled: if the copying was stopped by the user, the partial archive is removed
+    """
+    metrics = g.STATE.metrics
+    cancel_token = g.STATE.cancel_token
+    task_id = task.id
+    sly.logger.debug("Trying to retreive task data from API...")
+    task_name = sly.fs.get_file_name(task_path)
+    # * Number of exports and downloads from CVAT is limited for all projects copied in parallel.
+    with g.DOWNLOAD_SLOTS:
+        cancel_token.raise_if_cancelled()
+        with metrics.stage("export", task_name):
+            task_data = retreive_dataset(
+                task_id=task_id, export_format=g.EXPORT_FORMATS[task.data_type]
+            )
+        metrics.count("cvat_api_calls")
+
+        with metrics.stage("download", task_name):
+            download_stream(task_data, task_path, cancel_token)
+    metrics.count("bytes_downloaded", os.path.getsize(task_path))
+
+    sly.logger.info(f"Saved data to path: {task_path}, will check it's size...")
+
+    # Check if the archive has non-zero size.
+    if os.path.getsize(task_path) == 0:
+        sly.logger.debug(f"The archive for task {task_id} is empty, removing it...")
+        sly.fs.silent_remove(task_path)
+        sly.logger.debug(f"The archive with path {task_path} was removed.")
+        sly.logger.info(
+            f"Will retry to download task {task_id}, because the archive is empty."
+        )
+        if retry < 10:
+            # Try to download the task data again.
+            retry += 1
+            timer = 5
+            while timer > 0:
+                sly.logger.info(f"Retry {retry} in {timer} seconds...")
+                cancel_token.wait(1)
+                cancel_token.raise_if_cancelled()
+                timer -= 1
+
+            sly.logger.info(f"Retry {retry} to download task {task_id}...")
+            return save_task_to_zip(task, task_path, retry)
+        else:
+            # If the archive is empty after 10 retries, return False.
+            sly.logger.error(f"Can't download task {task_id} after 10 retries.")
+            return False
+    else:
+        sly.logger.debug(f"Archive for task {task_id} was downloaded correctly.")
+        return True
+
+
+def download_stream(stream: Any, path: str, cancel_token: CancellationToken) -> None:
+    """Saves the stream to the file by blocks of DOWNLOAD_CHUNK_SIZE bytes and checks
+    the cancellation token between them. On cancellation the stream is closed
+    and the partial file is removed.
+
+    :param stream: readable binary stream, e.g. response of the CVAT API
+    :type stream: Any
+    :param path: path to the file to save the stream to
+    :type path: str
+    :param cancel_token: cancellation token of the copying
+    :type cancel_token: CancellationToken
+    :raises OperationCancelled: if the copying was stopped by the user
+    """
+    try:
+        with open(path, "wb") as f:
+            while True:
+                cancel_token.raise_if_cancelled()
+                chunk = stream.read(DOWNLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+    except OperationCancelled:
+        stream.close()
+        sly.fs.silent_remove(path)
+        sly.logger.info(
+            f"Download to {path} was cancelled, the partial file is removed."
+        )
+        raise
+
+
+def remove_project_files(project_id: int, project_name: str) -> None:
+    """Removes downloaded archives and unpacked tasks of the project,
+    e.g. after the copying was cancelled.
+
+    :param project_id: ID of the project in CVAT
+    :type project_id: int
+    :param project_name: name of the project in CVAT
+    :type project_name: str
+    """
+    paths = [os.path.join(g.UNPACKED_DIR, f"{project_id}_{project_name}")]
+    for data_type in g.EXPORT_FORMATS:
+        paths.append(
+            os.path.join(g.ARCHIVE_DIR, f"{project_id}_{project_name}_{data_type}")
+        )
+    for path in paths:
+        if os.path.isdir(path):
+            sly.fs.remove_dir(path)
+            sly.logger.debug(f"Removed temporary directory {path}.")
+
+
 def convert_and_upload(
     project_id: id, project_name: str, task_archive_paths: List[Tuple[str, str]]
 ) -> bool:
@@ -299,11 +751,9 @@ def convert_and_upload(
     2. Creates projects with corresponding data types in Supervisely (images or videos).
     3. For each task:
         3.1. Unpacks the task archive in a separate directory in project directory.
-        3.2. Parses annotations.xml and reads list of images.
-        3.3. Converts CVAT annotations to Supervisely format.
-        3.4. Depending on data type (images or video) creates specific annotations.
-        3.5. Uploads images or video to Supervisely.
-        3.6. Uploads annotations to Supervisely.
+        3.2. For images: parses, converts and uploads images with annotations by batches.
+        3.3. For video: parses annotations.xml, converts annotations to Supervisely format
+            and schedules encoding of the video, which is uploaded with annotations when it's ready.
     4. Updates the project in the projects table with new URLs.
     5. Returns True if the upload was successful, False otherwise.
 
@@ -316,7 +766,10 @@ def convert_and_upload(
     :type task_archive_paths: List[Tuple[str, str]]
     :return: status of the upload (True if the upload was successful, False otherwise)
     :rtype: bool
+    :raises OperationCancelled: if the copying was stopped by the user
     """
+    metrics = g.STATE.metrics
+    cancel_token = g.STATE.cancel_token
     unpacked_project_path = os.path.join(g.UNPACKED_DIR, f"{project_id}_{project_name}")
     sly.logger.debug(f"Unpacked project path: {unpacked_project_path}")
 
@@ -354,122 +807,156 @@ def convert_and_upload(
 
     succesfully_uploaded = True
 
-    for task_archive_path, task_data_type in task_archive_paths:
-        sly.logger.debug(
-            f"Processing task archive {task_archive_path} with data type {task_data_type}."
-        )
-        # * Unpacking archive, parsing annotations.xml and reading list of images.
-        images_et, images_paths, source = unpack_and_read_task(
-            task_archive_path, unpacked_project_path
-        )
-
-        sly.logger.debug(f"Parsed annotations and found {len(images_et)} images.")
-
-        # * Using archive name as dataset name.
-        dataset_name = sly.fs.get_file_name(task_archive_path)
-        sly.logger.debug(f"Will use {dataset_name} as dataset name.")
-
-        if task_data_type == "imageset":
-            # Working with Supervisely Images Project.
-            sly.logger.debug(
-                "Data type is imageset, will convert annotations to Supervisely format."
-            )
-
-            task_tags, image_objects = convert_images_annotations(
-                images_et, images_paths
-            )
-
-            # * Prepare lists of paths, names and build annotations from labels.
-            images_names, images_paths, images_anns = prepare_images_for_upload(
-                g.api, image_objects, images_project, images_project_meta
-            )
-
-            sly.logger.debug(f"Task data type is {task_data_type}, will upload images.")
-
-            upload_images_task(
-                g.api,
-                dataset_name,
-                images_project,
-                images_names,
-                images_paths,
-                images_anns,
-                task_tags,
-            )
-
-            sly.logger.info(
-                f"Finished processing task archive {task_archive_path} with data type {task_data_type}."
-            )
-        elif task_data_type == "video":
-            # Working with Supervisely Videos Project.
-            sly.logger.debug(
-                "Task data type is video, will convert annotations to Supervisely format."
-            )
-
-            (
-                video_size,
-                video_frames,
-                video_objects,
-                video_tags,
-            ) = convert_video_annotations(images_et, images_paths)
-
-            sly.logger.debug(f"Found {len(video_frames)} frames in the video.")
-
-            update_project_meta(
-                g.api,
-                videos_project_meta,
-                videos_project.id,
-                labels=video_objects,
-                tags=video_tags,
-            )
-
-            # Prepare the name for output video using source name from CVAT annotation.
-            # Prepare the path for output video using project directory and source name.
-            # Save the video to the path.
-            source_name = f"{sly.fs.get_file_name(source)}.mp4"
-            video_path = os.path.join(unpacked_project_path, source_name)
-            sly.logger.debug(f"Will save video to {video_path}.")
-            images_to_mp4(video_path, images_paths, video_size)
-
-            # Create Supervisely VideoAnnotation object using data from CVAT annotation.
-            frames = sly.FrameCollection(video_frames)
-            objects = sly.VideoObjectCollection(video_objects)
-            tag_collection = sly.VideoTagCollection(video_tags)
-
+    # * Videos are encoded in separate processes, while the next tasks are unpacked and converted.
+    # * CPUs are shared between the projects copied in parallel.
+    encoder_workers = max(1, (os.cpu_count() or 1) // g.PROJECT_WORKERS)
+    # * On cancellation the encoding processes are terminated, see VideoEncoder.terminate.
+    with VideoEncoder(
+        max_workers=encoder_workers, metrics=metrics, cancel_token=cancel_token
+    ) as encoder:
+        for task_archive_path, task_data_type in task_archive_paths:
+            cancel_token.raise_if_cancelled()
             sly.logger.debug(
-                f"Will create VideoAnnotation object with: {video_size} size, "
-                f"{len(frames)} frames, {len(objects)} objects, {len(tag_collection)} tags."
-            )
-
-            ann = sly.VideoAnnotation(
-                video_size, len(frames), objects, frames, tag_collection
+                f"Processing task archive {task_archive_path} with data type {task_data_type}."
             )
+            # * Using archive name as dataset name.
+            dataset_name = sly.fs.get_file_name(task_archive_path)
+            sly.logger.debug(f"Will use {dataset_name} as dataset name.")
+
+            with metrics.trace(dataset_name, "task"):
+                if task_data_type == "imageset":
+                    # Working with Supervisely Images Project.
+                    sly.logger.debug(
+                        "Data type is imageset, will convert and upload images by batches."
+                    )
 
-            sly.logger.debug("VideoAnnotation successfully created.")
+                    # * Images are parsed, converted and uploaded by batches,
+                    # * so the whole task is never kept in memory.
+                    unpacked_task_path = unpack_task(
+                        task_archive_path, unpacked_project_path
+                    )
+                    annotations_xml_path = os.path.join(
+                        unpacked_task_path, "annotations.xml"
+                    )
+                    # * The index gives the number of images for the progress
+                    # * and is reused to read the images.
+                    index = load_index(annotations_xml_path)
+                    metrics.progress.add_total(
+                        "images", index.count(), key=(project_id, dataset_name)
+                    )
+                    images_et = iter_images_et(annotations_xml_path, index=index)
+                    cache_entry = None
+                    if g.CONVERSION_CACHE is not None:
+                        cache_entry = g.CONVERSION_CACHE.entry(
+                            annotations_xml_path, IMAGES_BATCH_SIZE
+                        )
+                    # * Number of tasks uploaded at once is limited for all projects copied in parallel.
+                    with g.UPLOAD_SLOTS:
+                        cancel_token.raise_if_cancelled()
+                        images_project_meta = upload_images_task_batches(
+                            g.api,
+                            dataset_name,
+                            images_project,
+                            images_project_meta,
+                            images_et,
+                            os.path.join(unpacked_task_path, "images"),
+                            fast_converter=g.FAST_CONVERTER,
+                            cache_entry=cache_entry,
+                            metrics=metrics,
+                            cancel_token=cancel_token,
+                        )
+
+                    metrics.progress.advance("tasks")
+                    sly.logger.info(
+                        f"Finished processing task archive {task_archive_path} with data type {task_data_type}."
+                    )
+                elif task_data_type == "video":
+                    # Working with Supervisely Videos Project.
+                    sly.logger.debug(
+                        "Task data type is video, will convert annotations to Supervisely format."
+                    )
 
-            dataset_info = g.api.dataset.create(
-                videos_project.id, dataset_name, change_name_if_conflict=True
-            )
+                    # * Unpacking archive, parsing annotations.xml and reading list of frames.
+                    (
+                        annotations_et,
+                        images_et,
+                        images_paths,
+                        source,
+                    ) = unpack_and_read_task(task_archive_path, unpacked_project_path)
 
-            sly.logger.debug(
-                f"Created dataset {dataset_info.name} in project {videos_project.name}."
-                "Uploading video..."
-            )
+                    sly.logger.debug(
+                        f"Parsed annotations and found {len(images_et)} images."
+                    )
 
-            uploaded_video: sly.api.video_api.VideoInfo = g.api.video.upload_path(
-                dataset_info.id, source_name, video_path
-            )
+                    with metrics.stage("convert", dataset_name):
+                        if images_et:
+                            (
+                                video_size,
+                                video_frames,
+                                video_objects,
+                                video_tags,
+                            ) = convert_video_annotations(images_et, images_paths)
+                        else:
+                            # * Task in "CVAT for video 1.1" format, annotations are stored in tracks.
+                            (
+                                video_size,
+                                video_frames,
+                                video_objects,
+                                video_tags,
+                            ) = convert_video_tracks(annotations_et, images_paths)
+                    metrics.count(
+                        "labels",
+                        sum(len(video_frame.figures) for video_frame in video_frames),
+                    )
 
-            sly.logger.debug(
-                f"Uploaded video {source_name} to dataset {dataset_info.name}."
-            )
+                    sly.logger.debug(f"Found {len(video_frames)} frames in the video.")
+                    metrics.progress.add_total(
+                        "images", len(video_frames), key=(project_id, dataset_name)
+                    )
 
-            g.api.video.annotation.append(uploaded_video.id, ann)
+                    with metrics.stage("meta", dataset_name):
+                        videos_project_meta = update_project_meta(
+                            g.api,
+                            videos_project_meta,
+                            videos_project.id,
+                            labels=video_objects,
+                            tags=video_tags,
+                        )
+
+                    # Prepare the name for output video using source name from CVAT annotation.
+                    # Prepare the path for output video using task directory and source name.
+                    # Schedule encoding of the video, it will be uploaded when the file is ready.
+                    source_name = f"{sly.fs.get_file_name(source)}.mp4"
+                    unpacked_task_path = os.path.join(
+                        unpacked_project_path, dataset_name
+                    )
+                    video_path = os.path.join(unpacked_task_path, source_name)
+                    sly.logger.debug(f"Will save video to {video_path}.")
+                    encoder.submit(
+                        dataset_name,
+                        video_path,
+                        images_paths,
+                        video_size,
+                        frames_dir=os.path.join(unpacked_task_path, "images"),
+                        context=VideoTask(
+                            dataset_name,
+                            source_name,
+                            video_path,
+                            video_frames,
+                            video_tags,
+                        ),
+                    )
 
-            sly.logger.debug(f"Added annotation to video with ID {uploaded_video.id}.")
+            # * Upload videos which are already encoded, while the rest are still in progress.
+            for video_task, error in encoder.finished():
+                succesfully_uploaded &= upload_video_task(
+                    videos_project, video_task, error
+                )
+                metrics.progress.advance("tasks")
 
-            sly.logger.info(
-                f"Finished processing task archive {task_archive_path} with data type {task_data_type}."
-            )
+        for video_task, error in encoder.finished(wait_all=True):
+            succesfully_uploaded &= upload_video_task(videos_project, video_task, error)
+            metrics.progress.advance("tasks")
 
     sly.logger.info(
         f"Finished copying project {project_name} from CVAT to Supervisely."
@@ -495,12 +982,109 @@ def convert_and_upload(
     return succesfully_uploaded
 
 
+def upload_video_task(
+    videos_project: sly.ProjectInfo, video_task: VideoTask, error: Optional[str]
+) -> bool:
+    """Uploads the encoded video and its annotation to the new dataset in Supervisely.
+
+    :param videos_project: project in Supervisely where the video will be uploaded
+    :type videos_project: sly.ProjectInfo
+    :param video_task: converted video task with the path to the encoded video
+    :type video_task: VideoTask
+    :param error: error message if the video was not encoded, None otherwise
+    :type error: Optional[str]
+    :return: True if the video was uploaded, False if it was not encoded
+    :rtype: bool
+    """
+    metrics = g.STATE.metrics
+    dataset_name = video_task.dataset_name
+    if error is not None:
+        sly.logger.warning(
+            f"Video for task {dataset_name} was not encoded and will be skipped: {error}"
+        )
+        return False
+
+    with metrics.trace(dataset_name, "task"), g.UPLOAD_SLOTS:
+        g.STATE.cancel_token.raise_if_cancelled()
+        dataset_info = g.api.dataset.create(
+            videos_project.id, dataset_name, change_name_if_conflict=True
+        )
+
+        sly.logger.debug(
+            f"Created dataset {dataset_info.name} in project {videos_project.name}."
+            "Uploading video..."
+        )
+
+        with metrics.stage("upload_video", dataset_name):
+            uploaded_video: sly.api.video_api.VideoInfo = g.api.video.upload_path(
+                dataset_info.id, video_task.source_name, video_task.video_path
+            )
+        metrics.count("images", len(video_task.frames))
+        metrics.count("bytes_uploaded", os.path.getsize(video_task.video_path))
+
+        sly.logger.debug(
+            f"Uploaded video {video_task.source_name} to dataset {dataset_info.name}."
+        )
+
+        with metrics.stage("upload_anns", dataset_name):
+            # Annotation is uploaded by chunks of frames to keep requests small for long videos.
+            upload_video_annotation(
+                g.api,
+                uploaded_video.id,
+                video_task.frames,
+                video_task.tags,
+                metrics=metrics,
+                cancel_token=g.STATE.cancel_token,
+            )
+
+        sly.logger.debug(f"Added annotation to video with ID {uploaded_video.id}.")
+
+    sly.logger.info(f"Finished processing video task {dataset_name}.")
+
+    return True
+
+
+def unpack_task(task_archive_path: str, unpacked_project_path: str) -> str:
+    """Unpacks the task archive from CVAT to the directory with the name of the archive
+    in the project directory and returns path to this directory.
+
+    :param task_archive_path: path to the task archive on the local machine
+    :type task_archive_path: str
+    :param unpacked_project_path: path to the directory where the task archive will be unpacked
+    :type unpacked_project_path: str
+    :return: path to the unpacked task directory
+    :rtype: str
+    :raises OperationCancelled: if the copying was stopped by the user
+    """
+    unpacked_task_dir = sly.fs.get_file_name(task_archive_path)
+    unpacked_task_path = os.path.join(unpacked_project_path, unpacked_task_dir)
+
+    with g.STATE.metrics.stage("unpack", unpacked_task_dir):
+        if zipfile.is_zipfile(task_archive_path):
+            # * Archives from CVAT are zip files, they are unpacked file by file,
+            # * so the unpacking of the large task can be cancelled.
+            with zipfile.ZipFile(task_archive_path) as archive:
+                for member in archive.infolist():
+                    g.STATE.cancel_token.raise_if_cancelled()
+                    archive.extract(member, unpacked_task_path)
+            sly.fs.remove_junk_from_dir(unpacked_task_path)
+        else:
+            sly.fs.unpack_archive(
+                task_archive_path, unpacked_task_path, remove_junk=True
+            )
+    sly.logger.debug(f"Unpacked from {task_archive_path} to {unpacked_task_path}")
+
+    return unpacked_task_path
+
+
 def unpack_and_read_task(
     task_archive_path: str, unpacked_project_path: str
-) -> Tuple[List[ET.Element], List[str], str]:
+) -> Tuple[ET.Element, List[ET.Element], List[str], str]:
     """Unpacks the task archive from CVAT and reads it's content.
     Parses annotations.xml and reads list of images in it.
     Reads contents of the images directory and prepares a list of paths to the images.
+    For tasks in "CVAT for video 1.1" format there are no images in annotations.xml,
+    so the list of paths to the frames is read from the images directory.
     Reads the "source" parameter in annotations.xml, it's needed to retrieve the
     original name of the video file in CVAT.
 
@@ -508,14 +1092,12 @@ def unpack_and_read_task(
     :type task_archive_path: str
     :param unpacked_project_path: path to the directory where the task archive will be unpacked
     :type unpacked_project_path: str
-    :return: list of images in annotations.xml, list of paths to the images, value of the "source" parameter
-    :rtype: Tuple[List[ET.Element], List[str], str]
+    :return: root element of annotations.xml, list of images in annotations.xml,
+        list of paths to the images, value of the "source" parameter
+    :rtype: Tuple[ET.Element, List[ET.Element], List[str], str]
     """
     unpacked_task_dir = sly.fs.get_file_name(task_archive_path)
-    unpacked_task_path = os.path.join(unpacked_project_path, unpacked_task_dir)
-
-    sly.fs.unpack_archive(task_archive_path, unpacked_task_path, remove_junk=True)
-    sly.logger.debug(f"Unpacked from {task_archive_path} to {unpacked_task_path}")
+    unpacked_task_path = unpack_task(task_archive_path, unpacked_project_path)
 
     images_dir = os.path.join(unpacked_task_path, "images")
     images_list = sly.fs.list_files(images_dir)
@@ -532,7 +1114,8 @@ def unpack_and_read_task(
             f"Can't find annotations.xml file in {unpacked_task_path}, will upload images without labels."
         )
 
-    tree = ET.parse(annotations_xml_path)
+    with g.STATE.metrics.stage("parse", unpacked_task_dir):
+        tree = ET.parse(annotations_xml_path)
     sly.logger.debug(f"Parsed annotations.xml from {annotations_xml_path}.")
 
     # * Getting source parameter, which nested in "meta" -> "task" -> "source".
@@ -545,11 +1128,14 @@ def unpack_and_read_task(
     images_et = tree.findall("image")
     sly.logger.debug(f"Found {len(images_et)} images in annotations.xml.")
 
-    images_paths = [
-        os.path.join(images_dir, image_et.attrib["name"]) for image_et in images_et
-    ]
+    if images_et:
+        images_paths = [
+            os.path.join(images_dir, image_et.attrib["name"]) for image_et in images_et
+        ]
+    else:
+        images_paths = get_frames_paths(images_dir)
 
-    return images_et, images_paths, source
+    return tree.getroot(), images_et, images_paths, source
 
 
 def update_cells(project_id: int, **kwargs) -> None:
@@ -561,27 +1147,21 @@ def update_cells(project_id: int, **kwargs) -> None:
     :param project_id: project ID in CVAT for projects table to update
     :type project_id: int
     """
-    key_cell_value = project_id
-    key_column_name = "ID"
     if kwargs.get("new_status"):
-        column_name = "COPYING STATUS"
-        new_value = kwargs["new_status"]
+        projects_table_updater.set(project_id, "COPYING STATUS", kwargs["new_status"])
     elif kwargs.get("new_url"):
-        column_name = "SUPERVISELY URL"
         url = kwargs["new_url"]
 
         # When updating the cell with the URL we need to append the new URL to the old value
         # for cases when one CVAT project was converted to multiple Supervisely projects.
         # This usually happens when CVAT project contains both images and videos
         # while Supervisely supports one data type per project.
-        old_value = get_cell_value(project_id)
-        if old_value:
-            old_value += "<br>"
-        new_value = old_value + f"<a href='{url}' target='_blank'>{url}</a>"
+        def append_url(old_value: str) -> str:
+            if old_value:
+                old_value += "<br>"
+            return old_value + f"<a href='{url}' target='_blank'>{url}</a>"
 
-    projects_table.update_cell_value(
-        key_column_name, key_cell_value, column_name, new_value
-    )
+        projects_table_updater.update(project_id, "SUPERVISELY URL", append_url)
 
 
 def get_cell_value(
@@ -597,26 +1177,17 @@ def get_cell_value(
     :return: value of the cell in the projects table or None if not found
     :rtype: Union[str, None]
     """
-    table_json_data = projects_table.get_json_data()["table_data"]
-
-    # Find column index by column name.
-    cell_column_idx = None
-    for column_idx, column_name in enumerate(table_json_data["columns"]):
-        if column_name == column:
-            cell_column_idx = column_idx
-            break
-
-    for row_idx, row_content in enumerate(table_json_data["data"]):
-        if row_content[1] == project_id:
-            return row_content[cell_column_idx]
+    return projects_table_updater.get(project_id, column)
 
 
 @stop_button.click
 def stop_copying() -> None:
-    """Stops copying process by setting continue_copying flag to False."""
+    """Stops copying process by cancelling the token of the current copying,
+    in-flight downloads, unpacking, encoding and uploads are interrupted."""
     sly.logger.debug("Stop button is clicked.")
 
-    g.STATE.continue_copying = False
+    if g.STATE.cancel_token is not None:
+        g.STATE.cancel_token.cancel("Copying is stopped by the user")
     copy_button.text = "Stopping..."
 
     stop_button.hide()
@@ -5,7 +5,7 @@ from supervisely.app.widgets import Card, Text, Input, Field, Button, Container
 import migration_tool.src.globals as g
 import migration_tool.src.ui.selection as selection
 
-from migration_tool.src.cvat_api import check_connection
+from migration_tool.src.cvat_api import check_connection, listing_cache
 
 cvat_server_address_input = Input(
     minlength=10, placeholder="for example: http://localhost:8080"
@@ -122,6 +122,7 @@ def disconnected(with_error=False) -> None:
             f"Disconnected from {formatted_connection_settings()}."
         )
 
+    listing_cache.invalidate()
     g.STATE.clear_cvat_credentials()
     connection_status_text.show()
 
@@ -5,7 +5,7 @@ from supervisely.app.widgets import Card, Transfer, Button, Container
 import migration_tool.src.globals as g
 import migration_tool.src.ui.copying as copying
 
-from migration_tool.src.cvat_api import cvat_data
+from migration_tool.src.cvat_api import cvat_data, listing_cache
 
 projects_transfer = Transfer(
     filterable=True,
@@ -54,11 +54,14 @@ def project_changed(items: NamedTuple) -> None:
     """Enables or disables the select projects button depending on the selected
     projects in the transfer widget. If at least one project is selected, the button is enabled.
     Otherwise, the button is disabled.
+    Tasks of the selected projects are listed from CVAT API in the background,
+    so the copying doesn't wait for the listings.
 
     :param items: namedtuple containing two lists (transferred_items and untransferred_items)
     :type items: NamedTuple
     """
     if items.transferred_items:
+        listing_cache.prefetch(items.transferred_items)
         select_projects_button.enable()
     else:
         select_projects_button.disable()
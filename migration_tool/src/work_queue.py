@@ -0,0 +1,383 @@
+import os
+import json
+import socket
+import sqlite3
+import threading
+
+from uuid import uuid4
+from time import time
+from contextlib import contextmanager
+from collections import namedtuple
+from typing import Any, Dict, Generator, List, Optional, Tuple
+
+import supervisely as sly
+
+# * Unit of work in the queue: project or task.
+# * Example: WorkUnit("project:1", "project", None, {"id": 1, "name": "project1"}, 1)
+WorkUnit = namedtuple("WorkUnit", ["id", "kind", "parent", "payload", "attempts"])
+
+# * Statuses of the units in the queue.
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    parent TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS units_status ON units (kind, status);
+"""
+
+
+def worker_name() -> str:
+    """Returns unique name of the current worker: host name, process ID and random suffix."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+
+def new_run_id() -> str:
+    """Returns unique ID of the new run, which is a part of the IDs of its units."""
+    return uuid4().hex[:12]
+
+
+class WorkQueue:
+    """Durable queue of projects and tasks to copy, which is stored in the SQLite file.
+    Several workers (processes on one or several nodes, sharing the file e.g. over NFS)
+    pull units from the same queue. The unit is leased by the worker for lease_seconds,
+    the lease is extended while the unit is processed (see keep_lease). If the worker dies,
+    the lease expires and the unit is picked up by another worker, until max_attempts is reached.
+    Units are never removed from the queue, so IDs of the units include the ID of the run
+    (see new_run_id), the units of the next run are queued again with the new IDs.
+    All methods are thread-safe.
+
+    :param path: path to the SQLite file, ":memory:" for the queue of the current process only
+    :type path: str
+    :param lease_seconds: duration of the lease in seconds, defaults to 600
+    :type lease_seconds: float, optional
+    :param max_attempts: maximum number of attempts to process the unit, defaults to 3
+    :type max_attempts: int, optional
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 600, max_attempts: int = 3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            sly.fs.mkdir(os.path.dirname(os.path.abspath(path)))
+        # * Autocommit mode, transactions are started explicitly with BEGIN IMMEDIATE,
+        # * so the write lock of the file is taken before reading the units.
+        # * WAL mode is not used, because it doesn't work on network file systems.
+        self._connection = sqlite3.connect(
+            path, timeout=60, isolation_level=None, check_same_thread=False
+        )
+        with self._lock:
+            self._connection.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self) -> Generator[sqlite3.Cursor, None, None]:
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+
+    def enqueue(
+        self,
+        unit_id: str,
+        kind: str,
+        payload: Dict[str, Any],
+        parent: Optional[str] = None,
+    ) -> bool:
+        """Adds the unit to the queue, if the unit with the same ID is not in the queue yet.
+        So several workers of the same run can enqueue the same units safely. Done and failed
+        units are kept as they are, so the unit ID must include the ID of the run.
+
+        :param unit_id: unique ID of the unit, e.g. "<run ID>:project:1"
+        :type unit_id: str
+        :param kind: kind of the unit, e.g. "project" or "task"
+        :type kind: str
+        :param payload: JSON-serializable data of the unit
+        :type payload: Dict[str, Any]
+        :param parent: ID of the parent unit, defaults to None
+        :type parent: Optional[str], optional
+        :return: True if the unit was added, False if it was already in the queue
+        :rtype: bool
+        """
+        with self._transaction() as cursor:
+            cursor.execute(
+                "INSERT OR IGNORE INTO units (id, kind, parent, payload, status, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (unit_id, kind, parent, json.dumps(payload), PENDING, time()),
+            )
+            return cursor.rowcount > 0
+
+    def acquire(
+        self, worker: str, kind: str, unit_ids: Optional[List[str]] = None
+    ) -> Optional[WorkUnit]:
+        """Leases the next pending unit of the given kind or the unit with expired lease.
+        Units with expired leases, which reached max_attempts, are marked as failed.
+
+        :param worker: name of the worker, see worker_name
+        :type worker: str
+        :param kind: kind of the unit, e.g. "project"
+        :type kind: str
+        :param unit_ids: IDs of the units, which can be leased by the worker, defaults to None (any unit)
+        :type unit_ids: Optional[List[str]], optional
+        :return: leased unit or None if there are no available units
+        :rtype: Optional[WorkUnit]
+        """
+        now = time()
+        ids_filter, ids_params = _ids_filter(unit_ids)
+        with self._transaction() as cursor:
+            cursor.execute(
+                "UPDATE units SET status = ?, error = ?, updated_at = ? "
+                "WHERE kind = ? AND status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, "Lease expired", now, kind, LEASED, now, self.max_attempts),
+            )
+            row = cursor.execute(
+                "SELECT id, kind, parent, payload, attempts FROM units "
+                "WHERE kind = ? AND (status = ? OR (status = ? AND lease_expires < ?))"
+                f"{ids_filter} ORDER BY rowid LIMIT 1",
+                (kind, PENDING, LEASED, now, *ids_params),
+            ).fetchone()
+            if row is None:
+                return None
+
+            unit_id, kind, parent, payload, attempts = row
+            cursor.execute(
+                "UPDATE units SET status = ?, attempts = ?, lease_owner = ?, lease_expires = ?, "
+                "updated_at = ? WHERE id = ?",
+                (LEASED, attempts + 1, worker, now + self.lease_seconds, now, unit_id),
+            )
+
+        if attempts:
+            sly.logger.info(f"Unit {unit_id} is leased again, attempt {attempts + 1}.")
+        return WorkUnit(unit_id, kind, parent, json.loads(payload), attempts + 1)
+
+    def extend_lease(self, unit: WorkUnit, worker: str) -> bool:
+        """Extends the lease of the unit, if it's still leased by the worker.
+
+        :return: True if the lease was extended, False if it was lost
+        :rtype: bool
+        """
+        now = time()
+        with self._transaction() as cursor:
+            cursor.execute(
+                "UPDATE units SET lease_expires = ?, updated_at = ? "
+                "WHERE id = ? AND status = ? AND lease_owner = ?",
+                (now + self.lease_seconds, now, unit.id, LEASED, worker),
+            )
+            return cursor.rowcount > 0
+
+    @contextmanager
+    def keep_lease(self, unit: WorkUnit, worker: str) -> Generator[None, None, None]:
+        """Context manager, which extends the lease of the unit in the background thread
+        while the unit is processed.
+
+        :param unit: leased unit
+        :type unit: WorkUnit
+        :param worker: name of the worker
+        :type worker: str
+        """
+        stop_event = threading.Event()
+
+        def heartbeat():
+            while not stop_event.wait(self.lease_seconds / 3):
+                if not self.extend_lease(unit, worker):
+                    sly.logger.warning(f"Lease of the unit {unit.id} was lost.")
+                    return
+
+        thread = threading.Thread(target=heartbeat, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop_event.set()
+            thread.join()
+
+    def complete(
+        self, unit: WorkUnit, worker: str, result: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Marks the unit as done and saves the result, if it's still leased by the worker.
+
+        :param unit: leased unit
+        :type unit: WorkUnit
+        :param worker: name of the worker
+        :type worker: str
+        :param result: JSON-serializable result of the unit, defaults to None
+        :type result: Optional[Dict[str, Any]], optional
+        :return: True if the unit was marked as done, False if the lease was lost
+            (e.g. it expired and the unit was leased by another worker)
+        :rtype: bool
+        """
+        with self._transaction() as cursor:
+            cursor.execute(
+                "UPDATE units SET status = ?, result = ?, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND status = ? AND lease_owner = ?",
+                (DONE, json.dumps(result), time(), unit.id, LEASED, worker),
+            )
+            return cursor.rowcount > 0
+
+    def will_retry(self, unit: WorkUnit) -> bool:
+        """Returns True if the unit will be retried after the error, see fail.
+
+        :param unit: leased unit
+        :type unit: WorkUnit
+        :rtype: bool
+        """
+        return unit.attempts < self.max_attempts
+
+    def fail(self, unit: WorkUnit, worker: str, error: str) -> bool:
+        """Releases the unit after the error, if it's still leased by the worker.
+        The unit will be retried by any worker, until it reaches max_attempts,
+        then it's marked as failed (see will_retry).
+
+        :param unit: leased unit
+        :type unit: WorkUnit
+        :param worker: name of the worker
+        :type worker: str
+        :param error: description of the error
+        :type error: str
+        :return: True if the unit was released, False if the lease was lost
+        :rtype: bool
+        """
+        status = PENDING if self.will_retry(unit) else FAILED
+        with self._transaction() as cursor:
+            cursor.execute(
+                "UPDATE units SET status = ?, error = ?, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND status = ? AND lease_owner = ?",
+                (status, error, time(), unit.id, LEASED, worker),
+            )
+            return cursor.rowcount > 0
+
+    def release(self, unit: WorkUnit, worker: str) -> bool:
+        """Returns the unit to the queue without counting the attempt,
+        e.g. when the processing was cancelled by the user.
+
+        :param unit: leased unit
+        :type unit: WorkUnit
+        :param worker: name of the worker
+        :type worker: str
+        :return: True if the unit was returned to the queue, False if the lease was lost
+        :rtype: bool
+        """
+        with self._transaction() as cursor:
+            cursor.execute(
+                "UPDATE units SET status = ?, attempts = attempts - 1, lease_owner = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+                (PENDING, time(), unit.id, LEASED, worker),
+            )
+            return cursor.rowcount > 0
+
+    def record(
+        self,
+        unit_id: str,
+        kind: str,
+        parent: str,
+        payload: Dict[str, Any],
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Saves the child unit, which is processed as a part of the parent unit
+        (e.g. task of the project), with its status and result.
+
+        :param unit_id: unique ID of the unit, e.g. "task:1"
+        :type unit_id: str
+        :param kind: kind of the unit, e.g. "task"
+        :type kind: str
+        :param parent: ID of the parent unit
+        :type parent: str
+        :param payload: JSON-serializable data of the unit
+        :type payload: Dict[str, Any]
+        :param status: status of the unit, DONE or FAILED
+        :type status: str
+        :param result: JSON-serializable result of the unit, defaults to None
+        :type result: Optional[Dict[str, Any]], optional
+        """
+        with self._transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO units (id, kind, parent, payload, status, attempts, result, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET status = excluded.status, attempts = attempts + 1, "
+                "result = excluded.result, updated_at = excluded.updated_at",
+                (
+                    unit_id,
+                    kind,
+                    parent,
+                    json.dumps(payload),
+                    status,
+                    json.dumps(result),
+                    time(),
+                ),
+            )
+
+    def has_unfinished(self, kind: str, unit_ids: Optional[List[str]] = None) -> bool:
+        """Returns True if there are pending or leased units of the given kind."""
+        ids_filter, ids_params = _ids_filter(unit_ids)
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT COUNT(*) FROM units WHERE kind = ? AND status IN (?, ?){ids_filter}",
+                (kind, PENDING, LEASED, *ids_params),
+            ).fetchone()
+        return row[0] > 0
+
+    def statuses(
+        self, unit_ids: List[str]
+    ) -> Dict[str, Tuple[str, Optional[Dict[str, Any]]]]:
+        """Returns status and result of the units with the given IDs,
+        including the units processed by other workers.
+
+        :param unit_ids: IDs of the units
+        :type unit_ids: List[str]
+        :return: dictionary with unit IDs as keys and tuples of status and result as values
+        :rtype: Dict[str, Tuple[str, Optional[Dict[str, Any]]]]
+        """
+        ids_filter, ids_params = _ids_filter(unit_ids)
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT id, status, result FROM units WHERE 1 = 1{ids_filter}",
+                ids_params,
+            ).fetchall()
+        return {
+            unit_id: (status, json.loads(result) if result else None)
+            for unit_id, status, result in rows
+        }
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Returns number of units of each kind by status.
+
+        :return: dictionary with kinds as keys and dictionaries of counts by status as values
+        :rtype: Dict[str, Dict[str, int]]
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT kind, status, COUNT(*) FROM units GROUP BY kind, status"
+            ).fetchall()
+        stats = {}
+        for kind, status, count in rows:
+            stats.setdefault(kind, {})[status] = count
+        return stats
+
+
+def _ids_filter(unit_ids: Optional[List[str]]) -> Tuple[str, List[str]]:
+    """Returns SQL condition and its parameters to select only the units with the given IDs."""
+    if unit_ids is None:
+        return "", []
+    placeholders = ", ".join("?" for _ in unit_ids) or "NULL"
+    return f" AND id IN ({placeholders})", list(unit_ids)
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# * Modules of the apps are imported by the package path, e.g. migration_tool.src.work_queue,
+# * so the root of the repository must be importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
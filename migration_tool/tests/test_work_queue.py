@@ -0,0 +1,23 @@
+import time
+
+from migration_tool.src.work_queue import DONE, WorkQueue
+
+
+def test_expired_lease_is_not_completed_by_previous_worker(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), lease_seconds=0.1)
+    queue.enqueue("run:project:1", "project", {"id": 1, "name": "project1"})
+
+    first_unit = queue.acquire("first", "project")
+    time.sleep(0.2)
+    # * The lease of the first worker expired, the unit is leased by the second worker.
+    second_unit = queue.acquire("second", "project")
+    assert second_unit.id == first_unit.id
+
+    assert not queue.complete(first_unit, "first", {"status": "first"})
+    assert not queue.fail(first_unit, "first", "error")
+    assert not queue.release(first_unit, "first")
+
+    assert queue.complete(second_unit, "second", {"status": "second"})
+    assert queue.statuses(["run:project:1"]) == {
+        "run:project:1": (DONE, {"status": "second"})
+    }